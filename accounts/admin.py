@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User, Game
+from .mail import requeue
+from .models import OutboundEmail, User, Game
 
 
 # 관리자에서 Game 마스터 데이터를 관리함.
@@ -26,4 +27,18 @@ class CustomUserAdmin(UserAdmin):
     list_filter = ("gender", "is_staff", "is_active")
     ordering = ("-id",)
 
-    filter_horizontal = ("main_games", "groups", "user_permissions")
\ No newline at end of file
+    filter_horizontal = ("main_games", "groups", "user_permissions")
+
+# 메일 대기열 상태를 확인하고, 발송 실패(DEAD) 메일을 다시 대기열에 넣음.
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ("id", "status", "subject", "attempts", "next_attempt_at", "created_at", "sent_at")
+    list_filter = ("status",)
+    search_fields = ("subject",)
+    readonly_fields = ("attempts", "last_error", "created_at", "sent_at")
+    ordering = ("-id",)
+    actions = ("requeue_selected",)
+
+    @admin.action(description="선택한 메일 다시 보내기")
+    def requeue_selected(self, request, queryset):
+        self.message_user(request, f"{requeue(queryset)}건을 다시 대기열에 넣었습니다.")
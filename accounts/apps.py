@@ -5,3 +5,7 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    # 닉네임/게임 변경 시 표시 이름 디렉터리와 게임 카탈로그를 갱신하는 receiver를 등록함.
+    def ready(self):
+        import accounts.signals
@@ -0,0 +1,170 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+import unicodedata
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# 회원가입 화면의 닉네임/전화번호 실시간 중복 확인임.
+# 워커마다 사용 중인 값의 Bloom filter를 메모리에 두고, "확실히 없음"이면 DB 없이 바로 사용 가능으로 답함.
+# "있을 수도 있음"일 때만 가입 폼 검증과 같은 조건으로 DB를 확인하므로 입력할 때마다 쿼리가 나가지 않음.
+# 다른 워커에서 생긴 가입/닉네임 변경은 공유 캐시의 변경 로그(순번 + 순번별 값)로 전달되고,
+# 요청마다 순번만 확인해 밀린 변경을 필터에 더함. 로그가 끊기거나 너무 밀렸으면 DB에서 다시 만듦.
+# (필터는 지울 수 없으므로 탈퇴/변경 전 값은 "있을 수도 있음"으로 남고 DB 확인에서 걸러짐)
+
+FIELDS = ("nickname", "phone")
+SEQ_KEY = "accounts:availability:seq"
+CHANGE_KEY = "accounts:availability:change:{}"
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate):
+        self.capacity = max(1, capacity)
+        self.size = max(64, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    # 128비트 해시 하나를 둘로 나눠 h1 + i*h2로 k개 위치를 만듦. (double hashing)
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + index * h2) % self.size for index in range(self.hashes)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+    @property
+    def is_full(self):
+        return self.count > self.capacity
+
+
+# 필터 키임. 닉네임은 대소문자/전각을 맞춰 넣어, DB 콜레이션이 대소문자를 무시해도 "확실히 없음"이 틀리지 않게 함.
+def normalize(field, value):
+    value = (value or "").strip()
+    if field == "phone":
+        return "".join(ch for ch in value if ch.isdigit())
+    return unicodedata.normalize("NFKC", value).lower()
+
+
+class TakenSet:
+    def __init__(self, filters, seq):
+        self.filters = filters
+        self.seq = seq
+
+    def add(self, field, value):
+        if value:
+            self.filters[field].add(normalize(field, value))
+
+    def might_contain(self, field, value):
+        return normalize(field, value) in self.filters[field]
+
+    @property
+    def is_full(self):
+        return any(bloom.is_full for bloom in self.filters.values())
+
+
+_lock = threading.Lock()
+_state = {"taken": None}
+
+
+def _current_seq():
+    return cache.get(SEQ_KEY) or 0
+
+
+def build():
+    from .models import User
+
+    started = time.perf_counter()
+    # 순번을 먼저 읽어, 만드는 동안 생긴 변경은 다음 동기화 때 다시 더해지게 함. (중복 추가는 무해함)
+    seq = _current_seq()
+    rows = list(User.objects.values_list("nickname", "phone"))
+    capacity = max(settings.AVAILABILITY_MIN_CAPACITY, len(rows) * 2)
+    taken = TakenSet({field: BloomFilter(capacity, settings.AVAILABILITY_ERROR_RATE) for field in FIELDS}, seq)
+    for nickname, phone in rows:
+        taken.add("nickname", nickname)
+        taken.add("phone", phone)
+    logger.info("availability filters built: %s users in %.1fms", len(rows), (time.perf_counter() - started) * 1000)
+    return taken
+
+
+def _sync(taken):
+    seq = _current_seq()
+    if seq == taken.seq:
+        return taken
+    if seq < taken.seq or seq - taken.seq > settings.AVAILABILITY_LOG_MAX or taken.is_full:
+        return build()
+    keys = [CHANGE_KEY.format(number) for number in range(taken.seq + 1, seq + 1)]
+    changes = cache.get_many(keys)
+    if len(changes) < len(keys):
+        # 만료/유실된 변경이 있으면 더할 수 없으므로 DB에서 다시 만듦.
+        return build()
+    for key in keys:
+        for field, value in changes[key].items():
+            taken.add(field, value)
+    taken.seq = seq
+    return taken
+
+
+def get_taken():
+    with _lock:
+        taken = _state["taken"]
+        _state["taken"] = taken = build() if taken is None else _sync(taken)
+        return taken
+
+
+def reset():
+    with _lock:
+        _state["taken"] = None
+
+
+# 사용자 저장 커밋 후 호출함. 변경 로그에 남겨 다른 워커에 알리고 이 워커의 필터에는 바로 더함.
+def record(nickname, phone):
+    change = {"nickname": nickname, "phone": phone}
+    cache.add(SEQ_KEY, 0, None)
+    seq = cache.incr(SEQ_KEY)
+    cache.set(CHANGE_KEY.format(seq), change, timeout=settings.AVAILABILITY_LOG_TTL)
+    with _lock:
+        taken = _state["taken"]
+        if taken is not None:
+            taken.add("nickname", nickname)
+            taken.add("phone", phone)
+
+
+def _exists(field, value):
+    from .models import User
+
+    # 가입 폼 clean_nickname/clean_phone과 같은 조건으로 확인함.
+    return User.objects.filter(**{field: value}).exists()
+
+
+# 사용 가능 여부를 반환함. 필터가 "없음"이라고 하면 DB를 보지 않음.
+def is_available(field, value):
+    if field == "phone":
+        value = normalize("phone", value)
+    if not get_taken().might_contain(field, value):
+        return True
+    return not _exists(field, value)
+
+
+# IP별 고정 구간 요청 수 제한임. 제한을 넘으면 False.
+def allow_request(ip):
+    window = int(time.time() // settings.AVAILABILITY_RATE_WINDOW_SECONDS)
+    key = f"accounts:availability:rate:{ip}:{window}"
+    cache.add(key, 0, timeout=settings.AVAILABILITY_RATE_WINDOW_SECONDS * 2)
+    try:
+        count = cache.incr(key)
+    except ValueError:
+        count = 1
+    return count <= settings.AVAILABILITY_RATE_LIMIT
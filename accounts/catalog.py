@@ -0,0 +1,159 @@
+import logging
+import threading
+import time
+
+from django import forms
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.forms.models import ModelChoiceIterator
+
+logger = logging.getLogger(__name__)
+
+# 게임 목록(Game)의 프로세스 로컬 캐시임.
+# 게임은 관리자만 드물게 바꾸므로 워커마다 전체 목록을 메모리에 두고, 폼 선택지/로비 카드/카운터가 쿼리 없이 읽음.
+# 관리자 저장/삭제는 캐시 버전을 올리고, 각 워커는 GAME_CATALOG_CHECK_SECONDS마다 버전만 확인해 바뀌었을 때 다시 읽음.
+# (금칙어 필터와 같은 방식이며, 저장한 워커는 바로 버림)
+
+VERSION_CACHE_KEY = "accounts:games:version"
+
+
+class Catalog:
+    def __init__(self, games, version):
+        self.games = tuple(games)
+        self.by_id = {game.pk: game for game in self.games}
+        self.version = version
+
+    def __len__(self):
+        return len(self.games)
+
+    def get(self, game_id):
+        return self.by_id.get(game_id)
+
+
+def bump_version():
+    cache.set(VERSION_CACHE_KEY, time.time_ns(), None)
+
+
+_lock = threading.Lock()
+_state = {"catalog": None, "checked_at": None}
+
+
+def _load(version):
+    from .models import Game
+
+    return Catalog(Game.objects.all(), version)
+
+
+# 현재 카탈로그를 반환함. 확인 주기가 지났을 때(또는 check=True)만 캐시 버전을 읽고, 버전이 바뀌었으면 DB에서 다시 만듦.
+def get_catalog(check=False):
+    catalog = _state["catalog"]
+    checked_at = _state["checked_at"]
+    if not check and catalog is not None and time.monotonic() - checked_at < settings.GAME_CATALOG_CHECK_SECONDS:
+        return catalog
+    with _lock:
+        catalog = _state["catalog"]
+        version = cache.get(VERSION_CACHE_KEY)
+        if version is None:
+            # 아직 아무도 버전을 올리지 않았다면 지금 기준으로 하나 만들어 워커 간에 공유함.
+            cache.add(VERSION_CACHE_KEY, time.time_ns(), None)
+            version = cache.get(VERSION_CACHE_KEY)
+        if catalog is None or catalog.version != version:
+            catalog = _load(version)
+            logger.info("game catalog loaded: %s games (version %s)", len(catalog), version)
+        _state.update(catalog=catalog, checked_at=time.monotonic())
+        return catalog
+
+
+def reset():
+    with _lock:
+        _state.update(catalog=None, checked_at=None)
+
+
+def all_games():
+    return get_catalog().games
+
+
+# 목록에 없는 id면 다른 워커에서 방금 추가된 게임일 수 있으므로 주기를 기다리지 않고 버전을 한 번 확인함.
+def get(game_id):
+    game = get_catalog().get(game_id)
+    if game is None:
+        game = get_catalog(check=True).get(game_id)
+    return game
+
+
+def name(game_id, default=""):
+    game = get(game_id)
+    return game.name if game is not None else default
+
+
+# game FK를 가진 객체들에 카탈로그의 Game을 붙여 game 접근 시 쿼리가 없게 함. (없는 게임은 기존처럼 지연 로딩)
+def attach(objects):
+    for obj in objects:
+        game = get(obj.game_id)
+        if game is not None:
+            obj.game = game
+    return objects
+
+
+# 게임 저장/삭제 커밋 후 호출함. 다른 워커에는 버전으로 알리고 이 워커의 목록은 바로 버림.
+def games_changed():
+    bump_version()
+    reset()
+
+
+class CatalogChoiceIterator(ModelChoiceIterator):
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        for game in all_games():
+            yield self.choice(game)
+
+    def __len__(self):
+        return len(all_games()) + (1 if self.field.empty_label is not None else 0)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(all_games())
+
+
+def _resolve(field, value):
+    try:
+        game = get(int(value))
+    except (TypeError, ValueError):
+        game = None
+    if game is None:
+        raise ValidationError(field.error_messages["invalid_choice"], code="invalid_choice", params={"value": value})
+    return game
+
+
+# Game 선택 필드임. 선택지 렌더링과 입력 검증 모두 카탈로그에서 처리해 쿼리가 없음.
+class GameChoiceField(forms.ModelChoiceField):
+    iterator = CatalogChoiceIterator
+
+    def __init__(self, **kwargs):
+        from .models import Game
+
+        super().__init__(queryset=Game.objects.all(), **kwargs)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        return _resolve(self, value)
+
+
+class GameMultipleChoiceField(forms.ModelMultipleChoiceField):
+    iterator = CatalogChoiceIterator
+
+    def __init__(self, **kwargs):
+        from .models import Game
+
+        super().__init__(queryset=Game.objects.all(), **kwargs)
+
+    def _check_values(self, value):
+        if not isinstance(value, (list, tuple, set, frozenset)):
+            raise ValidationError(self.error_messages["invalid_list"], code="invalid_list")
+        games = {}
+        for item in value:
+            game = _resolve(self, item)
+            games[game.pk] = game
+        return list(games.values())
@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+# 사용자 id -> 표시 이름(닉네임, 없으면 username) 디렉터리임.
+# 브로드캐스트/시그널/컨슈머가 이름 하나를 찍으려고 user를 JOIN하거나 지연 로딩하지 않도록
+# 프로세스 로컬 LRU -> 공유 캐시 -> DB(id IN 한 번) 순서로 찾고, 찾은 값은 위 단계에 채워 둠.
+# 이름이 바뀌면 User 저장 시그널이 공유 캐시를 새 값으로 덮어쓰고 그 워커의 LRU 항목을 지움.
+# 다른 워커의 LRU는 DISPLAY_NAME_LOCAL_TTL초 안에 만료되어 공유 캐시에서 다시 읽음.
+
+KEY = "user:name:{}"
+
+
+def display_name(user):
+    return user.nickname if user.nickname else user.username
+
+
+class LocalNameCache:
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    # 찾은 이름 {user_id: name}을 반환함. 만료된 항목은 지움.
+    def get_many(self, user_ids, now=None):
+        now = time.monotonic() if now is None else now
+        found = {}
+        with self._lock:
+            for user_id in user_ids:
+                entry = self._entries.get(user_id)
+                if entry is None:
+                    continue
+                name, expires_at = entry
+                if expires_at <= now:
+                    del self._entries[user_id]
+                    continue
+                self._entries.move_to_end(user_id)
+                found[user_id] = name
+        return found
+
+    def set_many(self, names, now=None):
+        expires_at = (time.monotonic() if now is None else now) + self.ttl
+        with self._lock:
+            for user_id, name in names.items():
+                self._entries[user_id] = (name, expires_at)
+                self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_local = None
+_local_lock = threading.Lock()
+
+
+def _get_local():
+    global _local
+    if _local is None:
+        with _local_lock:
+            if _local is None:
+                _local = LocalNameCache(settings.DISPLAY_NAME_LRU_SIZE, settings.DISPLAY_NAME_LOCAL_TTL)
+    return _local
+
+
+def reset():
+    global _local
+    with _local_lock:
+        _local = None
+
+
+# 여러 사용자의 표시 이름을 {user_id: name}으로 반환함. 없는 사용자는 결과에 없음.
+def get_names(user_ids):
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if not user_ids:
+        return {}
+    local = _get_local()
+    names = local.get_many(user_ids)
+    missing = user_ids - names.keys()
+    if not missing:
+        return names
+
+    shared = cache.get_many([KEY.format(user_id) for user_id in missing])
+    found = {user_id: shared[KEY.format(user_id)] for user_id in missing if KEY.format(user_id) in shared}
+    missing -= found.keys()
+    if missing:
+        from .models import User
+
+        loaded = {
+            user_id: nickname or username
+            for user_id, nickname, username in User.objects.filter(pk__in=missing).values_list("id", "nickname", "username")
+        }
+        cache.set_many({KEY.format(user_id): name for user_id, name in loaded.items()}, timeout=settings.DISPLAY_NAME_CACHE_TTL)
+        found.update(loaded)
+    local.set_many(found)
+    names.update(found)
+    return names
+
+
+def get_name(user_id, default=""):
+    return get_names((user_id,)).get(user_id, default)
+
+
+# User 저장/삭제 후 호출함. 공유 캐시는 새 이름으로 덮어쓰고(삭제면 지움) 이 워커의 LRU 항목은 버림.
+def user_changed(user, deleted=False):
+    _get_local().discard(user.pk)
+    if deleted:
+        cache.delete(KEY.format(user.pk))
+    else:
+        cache.set(KEY.format(user.pk), display_name(user), timeout=settings.DISPLAY_NAME_CACHE_TTL)
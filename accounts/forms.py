@@ -2,7 +2,8 @@ import datetime
 from django import forms
 from django.core.exceptions import ValidationError
 from allauth.account.forms import SignupForm
-from .models import User, Game
+from .catalog import GameMultipleChoiceField
+from .models import User
 from allauth.account.models import EmailAddress
 
 # 회원가입 입력값 검증과 사용자 생성 후 추가 필드 저장을 처리하는 폼
@@ -23,8 +24,8 @@ class CustomSignupForm(SignupForm):
         widget=forms.NumberInput(attrs={'placeholder': '예: 2002'})
     )
     
-    main_games = forms.ModelMultipleChoiceField(
-        queryset=Game.objects.all(),
+    # 선택지는 게임 카탈로그 캐시에서 만들어 가입 화면 렌더링에 Game 조회가 없음.
+    main_games = GameMultipleChoiceField(
         required=False,
         widget=forms.CheckboxSelectMultiple,
         label="주로 하는 게임",
@@ -80,6 +81,12 @@ class CustomSignupForm(SignupForm):
 
 # 프로필 수정 시 허용 필드와 닉네임 중복 검증을 처리하는 폼
 class ProfileUpdateForm(forms.ModelForm):
+    main_games = GameMultipleChoiceField(
+        required=False,
+        widget=forms.CheckboxSelectMultiple(),
+        label='주로 하는 게임 (다중 선택)',
+    )
+
     class Meta:
         model = User
         fields = ['nickname', 'mic_enabled', 'main_games']
@@ -87,7 +94,6 @@ class ProfileUpdateForm(forms.ModelForm):
         labels = {
             'nickname': '닉네임',
             'mic_enabled': '마이크 사용 여부',
-            'main_games': '주로 하는 게임 (다중 선택)',
         }
         
         widgets = {
@@ -100,7 +106,6 @@ class ProfileUpdateForm(forms.ModelForm):
                 'id': 'mic_toggle', 
                 'class': 'mic-checkbox-input' 
             }),
-            'main_games': forms.CheckboxSelectMultiple(),
         }
 
     # 본인 계정을 제외한 닉네임 중복 여부를 검증함.
@@ -0,0 +1,179 @@
+import logging
+import smtplib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import connection as db_connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+# 메일 발송 대기열(outbox)임.
+# EMAIL_BACKEND인 OutboxBackend는 SMTP에 붙지 않고 OutboundEmail 행만 넣으므로, 인증 메일을 보내는 요청은
+# 메일 서버 상태와 무관하게 끝나고 요청 트랜잭션이 롤백되면 메일도 함께 사라짐.
+# 실제 발송은 send_queued_email 워커가 EMAIL_DELIVERY_BACKEND 연결 하나를 열어 두고 배치 단위로 처리함.
+# 실패한 메일은 EMAIL_OUTBOX_RETRY_SECONDS부터 두 배씩 늘린 간격으로 다시 시도하고,
+# EMAIL_OUTBOX_MAX_ATTEMPTS번 실패하면 DEAD로 남겨 관리자 화면에서 확인/재시도함. (첨부 파일은 지원하지 않음)
+
+# 다시 연결하면 보낼 수 있는 오류. (오래 열어 둔 SMTP 연결이 서버 쪽에서 끊긴 경우)
+RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError)
+
+
+class OutboxBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        rows = []
+        for message in email_messages:
+            if not message.recipients():
+                continue
+            if message.attachments:
+                if self.fail_silently:
+                    continue
+                raise ValueError("outbox does not queue attachments")
+            rows.append(to_row(message))
+        OutboundEmail.objects.bulk_create(rows)
+        return len(rows)
+
+
+def to_row(message):
+    body, html_body = message.body, ""
+    if getattr(message, "content_subtype", "plain") == "html":
+        body, html_body = "", message.body
+    for content, mimetype in getattr(message, "alternatives", ()):
+        if mimetype == "text/html":
+            html_body = content
+    return OutboundEmail(
+        subject=message.subject,
+        body=body,
+        html_body=html_body,
+        from_email=message.from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients={"to": message.to, "cc": message.cc, "bcc": message.bcc, "reply_to": message.reply_to},
+        headers=message.extra_headers,
+        next_attempt_at=timezone.now(),
+    )
+
+
+def to_message(row, connection=None):
+    options = {
+        "to": row.recipients.get("to", []),
+        "cc": row.recipients.get("cc", []),
+        "bcc": row.recipients.get("bcc", []),
+        "reply_to": row.recipients.get("reply_to", []),
+        "headers": row.headers,
+        "connection": connection,
+    }
+    if not row.body and row.html_body:
+        message = EmailMessage(row.subject, row.html_body, row.from_email, **options)
+        message.content_subtype = "html"
+        return message
+    message = EmailMultiAlternatives(row.subject, row.body, row.from_email, **options)
+    if row.html_body:
+        message.attach_alternative(row.html_body, "text/html")
+    return message
+
+
+def retry_delay(attempts):
+    return min(settings.EMAIL_OUTBOX_RETRY_SECONDS * 2 ** (attempts - 1), settings.EMAIL_OUTBOX_MAX_RETRY_SECONDS)
+
+
+# 발송할 차례가 된 행을 가져가고 next_attempt_at을 EMAIL_OUTBOX_LEASE_SECONDS 뒤로 미뤄,
+# 워커가 여러 개여도 같은 메일을 동시에 보내지 않게 함. (워커가 죽으면 임대 시간이 지난 뒤 다른 워커가 가져감)
+def claim_batch(limit):
+    now = timezone.now()
+    with transaction.atomic():
+        due = OutboundEmail.objects.filter(status=OutboundEmail.Status.PENDING, next_attempt_at__lte=now).order_by(
+            "next_attempt_at", "id"
+        )
+        if db_connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        rows = list(due[:limit])
+        OutboundEmail.objects.filter(pk__in=[row.pk for row in rows]).update(
+            next_attempt_at=now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS)
+        )
+    return rows
+
+
+class OutboxWorker:
+    def __init__(self, backend=None):
+        self.backend = backend or settings.EMAIL_DELIVERY_BACKEND
+        self.connection = None
+
+    def _connection(self):
+        if self.connection is None:
+            self.connection = get_connection(self.backend, fail_silently=False)
+            self.connection.open()
+        return self.connection
+
+    def close(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Exception:
+                logger.warning("closing mail connection failed", exc_info=True)
+            self.connection = None
+
+    def _send(self, row):
+        reused = self.connection is not None
+        try:
+            return self._connection().send_messages([to_message(row)])
+        except RECONNECT_ERRORS:
+            self.close()
+            if not reused:
+                raise
+            # 열어 둔 연결이 끊겼다면 새 연결로 한 번만 다시 보냄.
+            return self._connection().send_messages([to_message(row)])
+
+    # 한 배치를 보내고 {"sent", "retried", "dead"} 개수를 반환함. 보낼 메일이 없으면 연결을 닫음.
+    def run_once(self, batch_size=None):
+        rows = claim_batch(batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE)
+        if not rows:
+            self.close()
+            return {"sent": 0, "retried": 0, "dead": 0}
+
+        sent, retried, dead = 0, 0, 0
+        for row in rows:
+            try:
+                self._send(row)
+            except Exception as exc:
+                self.close()
+                if self._fail(row, exc):
+                    dead += 1
+                else:
+                    retried += 1
+            else:
+                # 보낸 즉시 SENT로 남겨, 배치 도중 워커가 죽어도 임대가 풀린 뒤 이미 보낸 메일을 다시 보내지 않게 함.
+                self._mark_sent(row)
+                sent += 1
+        return {"sent": sent, "retried": retried, "dead": dead}
+
+    def _mark_sent(self, row):
+        OutboundEmail.objects.filter(pk=row.pk).update(
+            status=OutboundEmail.Status.SENT, sent_at=timezone.now(), attempts=F("attempts") + 1, last_error=""
+        )
+
+    # 실패 횟수를 올리고 다음 시도 시각을 정함. 한도를 넘으면 DEAD로 바꾸고 True를 반환함.
+    def _fail(self, row, exc):
+        attempts = row.attempts + 1
+        error = f"{type(exc).__name__}: {exc}"
+        if attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            status, next_attempt_at = OutboundEmail.Status.DEAD, timezone.now()
+            logger.error("email %s dead after %s attempts: %s", row.pk, attempts, error)
+        else:
+            status = OutboundEmail.Status.PENDING
+            next_attempt_at = timezone.now() + timedelta(seconds=retry_delay(attempts))
+            logger.warning("email %s failed (attempt %s): %s", row.pk, attempts, error)
+        OutboundEmail.objects.filter(pk=row.pk).update(
+            status=status, attempts=attempts, next_attempt_at=next_attempt_at, last_error=error[:2000]
+        )
+        return status == OutboundEmail.Status.DEAD
+
+
+# DEAD/대기 중인 메일을 지금 바로 다시 보내도록 되돌림. (관리자 액션)
+def requeue(queryset):
+    return queryset.exclude(status=OutboundEmail.Status.SENT).update(
+        status=OutboundEmail.Status.PENDING, attempts=0, next_attempt_at=timezone.now(), last_error=""
+    )
@@ -0,0 +1,35 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from accounts.mail import OutboxWorker
+
+
+# 메일 대기열(OutboundEmail)을 EMAIL_DELIVERY_BACKEND로 보내는 워커 커맨드임.
+# 대기열이 차 있는 동안은 SMTP 연결 하나를 계속 재사용하고, 비면 연결을 닫고 EMAIL_OUTBOX_POLL_SECONDS 쉬었다가 다시 확인함.
+# 예: python manage.py send_queued_email --loop
+class Command(BaseCommand):
+    help = "대기 중인 메일을 배치로 발송하고 실패한 메일은 재시도 일정을 잡습니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="종료하지 않고 대기열을 계속 처리")
+        parser.add_argument("--batch-size", type=int, default=None, help="한 번에 가져와 보낼 메일 수")
+
+    def handle(self, *args, **options):
+        worker = OutboxWorker()
+        try:
+            while True:
+                counts = worker.run_once(options["batch_size"])
+                if any(counts.values()):
+                    self.stdout.write(
+                        self.style.SUCCESS(f"sent={counts['sent']} retried={counts['retried']} dead={counts['dead']}")
+                    )
+                    continue
+                if not options["loop"]:
+                    return
+                close_old_connections()
+                time.sleep(settings.EMAIL_OUTBOX_POLL_SECONDS)
+        finally:
+            worker.close()
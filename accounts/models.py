@@ -60,3 +60,33 @@ class User(AbstractUser):
 
     def __str__(self):
         return self.username
+
+
+# 보낼 메일 대기열(outbox)임. accounts.mail.OutboxBackend가 요청 트랜잭션 안에서 행을 넣고,
+# send_queued_email 워커가 SMTP 연결 하나로 묶어 보냄. 실패하면 지수 간격으로 다시 시도하고 한도를 넘으면 DEAD로 남김.
+class OutboundEmail(models.Model):
+    class Status(models.TextChoices):
+        PENDING = "PENDING", "대기"
+        SENT = "SENT", "발송됨"
+        DEAD = "DEAD", "발송 실패"
+
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    subject = models.CharField(max_length=998)
+    body = models.TextField(blank=True)
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=254)
+    # to/cc/bcc/reply_to 주소 목록과 추가 헤더
+    recipients = models.JSONField(default=dict)
+    headers = models.JSONField(default=dict, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField()
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        # 워커는 발송할 차례가 된 PENDING 행만 오래된 순으로 읽음.
+        indexes = [models.Index(fields=["status", "next_attempt_at"], name="outbox_due")]
+
+    def __str__(self):
+        return f"[{self.status}] {self.subject[:30]}"
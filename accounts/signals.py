@@ -0,0 +1,36 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import availability, catalog, directory
+from .models import Game, User
+
+
+# 닉네임이 바뀌면 커밋 후 표시 이름 디렉터리를 새 값으로 맞춤.
+@receiver(post_save, sender=User)
+def refresh_display_name(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not {"nickname", "username"} & set(update_fields):
+        return
+    transaction.on_commit(partial(directory.user_changed, instance))
+
+
+# 가입/닉네임·전화번호 변경을 커밋 후 중복 확인 필터에 더하고 다른 워커에도 알림.
+@receiver(post_save, sender=User)
+def record_taken_identity(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not {"nickname", "phone"} & set(update_fields):
+        return
+    transaction.on_commit(partial(availability.record, instance.nickname, instance.phone))
+
+
+@receiver(post_delete, sender=User)
+def forget_display_name(sender, instance, **kwargs):
+    transaction.on_commit(partial(directory.user_changed, instance, deleted=True))
+
+
+# 관리자가 게임을 추가/수정/삭제하면 커밋 후 카탈로그 버전을 올려 모든 워커가 다음 확인 때 다시 읽게 함.
+@receiver(post_save, sender=Game)
+@receiver(post_delete, sender=Game)
+def invalidate_game_catalog(sender, **kwargs):
+    transaction.on_commit(catalog.games_changed)
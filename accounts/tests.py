@@ -1,3 +1,278 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# accounts 앱 테스트를 추가할 때 사용하는 기본 모듈임.
+from django.core import mail
+from django.core.mail import EmailMultiAlternatives
+from django.core.mail.backends.locmem import EmailBackend as LocmemBackend
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts import availability, catalog, directory
+from accounts.mail import OutboxWorker
+from accounts.models import Game, OutboundEmail
+from core.testing import make_game, make_user
+from parties import stats
+from parties.forms import PartyForm
+from parties.models import ArchivedParty, ArchivedPartyMember, BlackList, Party, PartyMember, PlayerGameStats
+
+IN_MEMORY_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYERS)
+class ProfileHistoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.game = make_game()
+        cls.host = make_user(1)
+        cls.player = make_user(2)
+        now = timezone.now()
+        # 핫/콜드 이력이 시간순으로 섞이도록 번갈아 만듦. (같은 시각 항목도 하나 둬서 id로 순서가 갈리는지 확인)
+        for index in range(6):
+            joined_at = now - timedelta(hours=index // 2 * 2 + (index % 2))
+            if index % 2:
+                archived = ArchivedParty.objects.create(
+                    id=1000 + index, host=cls.host, game=cls.game, mode=f"지난 판 {index}", max_members=4, created_at=joined_at
+                )
+                ArchivedPartyMember.objects.create(id=5000 + index, party=archived, user=cls.player, joined_at=joined_at)
+            else:
+                party = Party.objects.create(host=cls.host, game=cls.game, mode=f"이번 판 {index}", max_members=5)
+                member = PartyMember.objects.create(party=party, user=cls.player)
+                PartyMember.objects.filter(pk=member.pk).update(joined_at=joined_at)
+        same_time = PartyMember.objects.filter(user=cls.player).order_by("joined_at").first().joined_at
+        party = Party.objects.create(host=cls.host, game=cls.game, mode="동시 입장", max_members=5)
+        member = PartyMember.objects.create(party=party, user=cls.player)
+        PartyMember.objects.filter(pk=member.pk).update(joined_at=same_time)
+
+    def test_history_pages_cover_hot_and_cold_matches_once(self):
+        self.client.force_login(self.player)
+        response = self.client.get(reverse("profile"))
+        self.assertEqual(len(response.context["recent_matches"]), 5)
+        cursor = response.context["history_cursor"]
+        seen = [(match.joined_at.isoformat(), match.party.mode) for match in response.context["recent_matches"]]
+
+        while cursor:
+            data = self.client.get(reverse("profile_history"), {"cursor": cursor, "limit": 1}).json()
+            seen += [(match["joined_at"], match["mode"]) for match in data["matches"]]
+            cursor = data["next_cursor"]
+
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(len({mode for _, mode in seen}), 7)
+        self.assertEqual(seen, sorted(seen, key=lambda match: match[0], reverse=True))
+
+    def test_history_rejects_a_malformed_cursor(self):
+        self.client.force_login(self.player)
+        response = self.client.get(reverse("profile_history"), {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYERS)
+class PlayerGameStatsTests(TestCase):
+    def test_signals_keep_rollup_in_line_with_rebuild(self):
+        game = make_game()
+        host, player = make_user(1), make_user(2)
+        for max_members in (4, 6):
+            party = Party.objects.create(host=host, game=game, mode="랭크", max_members=max_members)
+            PartyMember.objects.create(party=party, user=host)
+            PartyMember.objects.create(party=party, user=player)
+
+        membership = PartyMember.objects.get(party=party, user=player)
+        membership._kicked = True
+        membership.save()
+        BlackList.objects.create(party=party, user=player)
+
+        row = PlayerGameStats.objects.get(user=player, game=game)
+        self.assertEqual((row.joined_count, row.hosted_count, row.kicked_count, row.blacklisted_count), (2, 0, 1, 1))
+        self.assertEqual(row.average_party_size, 5)
+        self.assertEqual(PlayerGameStats.objects.get(user=host, game=game).hosted_count, 2)
+
+        def snapshot():
+            return list(
+                PlayerGameStats.objects.order_by("user_id").values_list(
+                    "user_id", "joined_count", "hosted_count", "kicked_count", "blacklisted_count", "party_size_total"
+                )
+            )
+
+        before = snapshot()
+        self.assertEqual(stats.rebuild(), {"created": 0, "updated": 2})
+        self.assertEqual(snapshot(), before)
+
+
+class DisplayNameDirectoryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        directory.reset()
+
+    def test_names_load_in_one_query_and_follow_nickname_changes(self):
+        users = [make_user(index) for index in range(1, 4)]
+        users[2].nickname = ""
+        users[2].save(update_fields=["nickname"])
+        cache.clear()
+        directory.reset()
+
+        with self.assertNumQueries(1):
+            names = directory.get_names(user.pk for user in users)
+        self.assertEqual(names, {users[0].pk: "nick1", users[1].pk: "nick2", users[2].pk: "user3"})
+        with self.assertNumQueries(0):
+            directory.get_names(user.pk for user in users)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            users[0].nickname = "새닉"
+            users[0].save(update_fields=["nickname"])
+        with self.assertNumQueries(0):
+            self.assertEqual(directory.get_name(users[0].pk), "새닉")
+
+
+class GameCatalogTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        catalog.reset()
+
+    def test_forms_use_the_catalog_until_a_game_changes(self):
+        lol = make_game()
+        catalog.get_catalog()
+
+        with self.assertNumQueries(0):
+            form = PartyForm(data={"game": lol.pk, "mode": "랭크", "max_members": 5, "join_policy": "INSTANT"})
+            self.assertIn("LoL", str(form["game"]))
+            self.assertTrue(form.is_valid(), form.errors)
+            self.assertEqual(form.cleaned_data["game"], lol)
+            self.assertFalse(PartyForm(data={"game": 999, "mode": "랭크", "max_members": 5}).is_valid())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Game.objects.create(code="val", name="발로란트")
+        self.assertEqual([game.name for game in catalog.all_games()], ["LoL", "발로란트"])
+
+
+# 정해진 횟수만큼 실패한 뒤 locmem처럼 동작하는 발송 백엔드임. (SMTP 장애 흉내)
+class FlakyBackend(LocmemBackend):
+    failures = 0
+
+    def send_messages(self, messages):
+        if FlakyBackend.failures:
+            FlakyBackend.failures -= 1
+            raise ConnectionRefusedError("smtp down")
+        return super().send_messages(messages)
+
+
+# 첫 메일을 보낸 뒤 워커 프로세스가 죽은 것처럼 멈추는 백엔드임.
+class CrashAfterOneBackend(LocmemBackend):
+    def send_messages(self, messages):
+        if mail.outbox:
+            raise SystemExit("worker killed")
+        return super().send_messages(messages)
+
+
+@override_settings(
+    EMAIL_BACKEND="accounts.mail.OutboxBackend",
+    EMAIL_DELIVERY_BACKEND="accounts.tests.FlakyBackend",
+    EMAIL_OUTBOX_MAX_ATTEMPTS=3,
+)
+class EmailOutboxTests(TestCase):
+    def queue(self):
+        message = EmailMultiAlternatives("인증", "본문", "noreply@example.com", ["a@example.com"])
+        message.attach_alternative("<p>본문</p>", "text/html")
+        message.send()
+        return OutboundEmail.objects.latest("id")
+
+    def test_mail_is_queued_then_sent_by_the_worker(self):
+        FlakyBackend.failures = 0
+        row = self.queue()
+        self.assertEqual(mail.outbox, [])
+
+        self.assertEqual(OutboxWorker().run_once(), {"sent": 1, "retried": 0, "dead": 0})
+        row.refresh_from_db()
+        self.assertEqual(row.status, OutboundEmail.Status.SENT)
+        self.assertEqual(mail.outbox[0].to, ["a@example.com"])
+        self.assertEqual(mail.outbox[0].alternatives, [("<p>본문</p>", "text/html")])
+
+    @override_settings(EMAIL_DELIVERY_BACKEND="accounts.tests.CrashAfterOneBackend")
+    def test_rows_are_marked_sent_as_soon_as_they_go_out(self):
+        first, second = self.queue(), self.queue()
+        with self.assertRaises(SystemExit):
+            OutboxWorker().run_once()
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.status, OutboundEmail.Status.SENT)
+        self.assertEqual(second.status, OutboundEmail.Status.PENDING)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_failures_back_off_and_end_in_dead_letter(self):
+        FlakyBackend.failures = 3
+        row = self.queue()
+        worker = OutboxWorker()
+
+        with self.assertLogs("accounts.mail", "WARNING"):
+            for attempt in (1, 2):
+                self.assertEqual(worker.run_once(), {"sent": 0, "retried": 1, "dead": 0})
+                row.refresh_from_db()
+                self.assertEqual(row.attempts, attempt)
+                self.assertGreater(row.next_attempt_at, timezone.now())
+                # 다음 시도 시각이 될 때까지는 가져가지 않음.
+                self.assertEqual(worker.run_once(), {"sent": 0, "retried": 0, "dead": 0})
+                OutboundEmail.objects.filter(pk=row.pk).update(next_attempt_at=timezone.now())
+
+            self.assertEqual(worker.run_once(), {"sent": 0, "retried": 0, "dead": 1})
+        row.refresh_from_db()
+        self.assertEqual(row.status, OutboundEmail.Status.DEAD)
+        self.assertIn("smtp down", row.last_error)
+        self.assertEqual(mail.outbox, [])
+
+
+@override_settings(AVAILABILITY_RATE_LIMIT=5)
+class AvailabilityTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        availability.reset()
+
+    def check(self, field, value):
+        return self.client.get(reverse("signup_availability"), {"field": field, "value": value})
+
+    def test_free_values_skip_the_database_and_new_users_become_taken(self):
+        user = make_user(1)
+        availability.get_taken()
+
+        with self.assertNumQueries(0):
+            self.assertTrue(self.check("nickname", "처음보는닉").json()["available"])
+        with self.assertNumQueries(1):
+            self.assertFalse(self.check("nickname", "nick1").json()["available"])
+        self.assertFalse(self.check("phone", user.phone).json()["available"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_user(2)
+        self.assertTrue(availability.get_taken().might_contain("nickname", "nick2"))
+
+    def test_changes_from_other_workers_are_replayed_from_the_log(self):
+        taken = availability.get_taken()
+        # 다른 워커가 남긴 변경 로그만 있고 이 워커의 필터에는 아직 없는 상태
+        cache.add(availability.SEQ_KEY, 0, None)
+        seq = cache.incr(availability.SEQ_KEY)
+        cache.set(availability.CHANGE_KEY.format(seq), {"nickname": "다른워커", "phone": "01099998888"})
+        self.assertFalse(taken.might_contain("nickname", "다른워커"))
+
+        with self.assertNumQueries(0):
+            self.assertIs(availability.get_taken(), taken)
+        self.assertTrue(taken.might_contain("nickname", "다른워커"))
+        self.assertTrue(taken.might_contain("phone", "010-9999-8888"))
+
+    def test_requests_are_rate_limited_per_ip(self):
+        statuses = [self.check("nickname", f"후보{index}").status_code for index in range(6)]
+        self.assertEqual(statuses, [200] * 5 + [429])
+
+    @override_settings(TRUSTED_PROXY_COUNT=1)
+    def test_rate_limit_uses_the_client_ip_behind_a_proxy(self):
+        def check_from(forwarded, index):
+            return self.client.get(
+                reverse("signup_availability"),
+                {"field": "nickname", "value": f"후보{index}"},
+                REMOTE_ADDR="10.0.0.1",
+                HTTP_X_FORWARDED_FOR=forwarded,
+            ).status_code
+
+        # 클라이언트가 X-Forwarded-For 왼쪽에 아무 값을 넣어도 프록시가 붙인 마지막 홉으로 셈.
+        statuses = [check_from(f"198.51.100.{index}, 203.0.113.5", index) for index in range(6)]
+        self.assertEqual(statuses, [200] * 5 + [429])
+        # 같은 프록시를 거친 다른 사용자는 따로 셈.
+        self.assertEqual(check_from("203.0.113.6", 6), 200)
@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import ProfileView
+from .views import AvailabilityView, MatchHistoryView, ProfileView
 from django.views.generic import TemplateView
 from .views import ResendVerificationEmailView
 from .views import ProfileUpdateView
@@ -9,7 +9,9 @@ from .views import EmailChangeView
 # allauth 기본 URL과는 websocket_project/urls.py에서 함께 include 됨.
 urlpatterns = [
     path("profile/", ProfileView.as_view(), name="profile"),
+    path("profile/history/", MatchHistoryView.as_view(), name="profile_history"),
     path("profile/edit/", ProfileUpdateView.as_view(), name="profile_edit"),
+    path("signup/availability/", AvailabilityView.as_view(), name="signup_availability"),
     path("resend-email/", ResendVerificationEmailView.as_view(), name="resend-email"),
     path('email-sent/', TemplateView.as_view(template_name="account/email_sent.html"), name='email_sent_page'),
     path('email-confirmation-done/', TemplateView.as_view(template_name="account/email_confirm_done.html"), name='account_email_confirmation_done'),
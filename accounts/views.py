@@ -1,8 +1,16 @@
+import logging
+
 from django.views.generic import TemplateView, View
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import transaction
+from django.http import JsonResponse
 from django.shortcuts import redirect
 from allauth.account.models import EmailAddress
-from parties.models import PartyMember
+from core.http import client_ip
+from core.mixins import ReplicaReadMixin
+from parties import stats
+from . import availability
+from parties.history import match_page
 from django.contrib.auth.models import User
 from django.views.generic.edit import UpdateView
 from .forms import ProfileUpdateForm
@@ -12,18 +20,56 @@ from django.views.generic.edit import FormView
 from .forms import EmailChangeForm
 from allauth.account.models import EmailAddress, EmailConfirmation
 
+logger = logging.getLogger(__name__)
+
 # 프로필 페이지와 최근 참여 파티 목록을 제공하는 뷰
-class ProfileView(LoginRequiredMixin, TemplateView):
+class ProfileView(ReplicaReadMixin, LoginRequiredMixin, TemplateView):
     template_name = "account/profile.html"
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        # PartyMember 역참조를 통해 최근 참여 파티 히스토리를 노출함.
-        context['recent_matches'] = PartyMember.objects.filter(user=self.request.user) \
-                                    .select_related('party__game') \
-                                    .order_by('-joined_at')[:5]
+        # 핫/콜드 참여 이력을 함께 읽어 최근 참여 파티 히스토리를 노출함. 이후 페이지는 profile_history가 커서로 이어 줌.
+        context['recent_matches'], context['history_cursor'] = match_page(self.request.user, limit=5)
+        # 게임별 통계는 롤업 테이블에서 게임 수만큼만 읽음.
+        context['game_stats'] = stats.for_user(self.request.user)
         return context
 
+
+def _match_data(match):
+    return {
+        "party_id": match.party_id,
+        "game": match.party.game.name,
+        "mode": match.party.mode,
+        "status": match.party.status,
+        "is_host": match.party.host_id == match.user_id,
+        "joined_at": match.joined_at.isoformat(),
+    }
+
+
+# 프로필 매칭 히스토리 다음 페이지 (JSON). cursor는 이전 응답/프로필 페이지의 next_cursor.
+class MatchHistoryView(LoginRequiredMixin, View):
+    def get(self, request):
+        try:
+            limit = min(max(int(request.GET.get("limit", 20)), 1), 100)
+            matches, next_cursor = match_page(request.user, cursor=request.GET.get("cursor") or None, limit=limit)
+        except (ValueError, OverflowError):
+            return JsonResponse({"ok": False, "error": "잘못된 페이지 요청입니다."}, status=400)
+        return JsonResponse({"ok": True, "matches": [_match_data(match) for match in matches], "next_cursor": next_cursor})
+
+
+# 가입 화면 닉네임/전화번호 실시간 중복 확인 (JSON). 예: ?field=nickname&value=포도
+class AvailabilityView(View):
+    def get(self, request):
+        # 프록시 뒤에서는 REMOTE_ADDR이 프록시 주소라 모든 사용자가 한 한도를 나눠 쓰게 되므로 신뢰 홉 기준 IP로 셈.
+        if not availability.allow_request(client_ip(request) or ""):
+            return JsonResponse({"ok": False, "error": "요청이 너무 많습니다. 잠시 후 다시 시도해 주세요."}, status=429)
+        field = request.GET.get("field")
+        value = (request.GET.get("value") or "").strip()
+        if field not in availability.FIELDS or not value or len(value) > 15:
+            return JsonResponse({"ok": False, "error": "잘못된 요청입니다."}, status=400)
+        return JsonResponse({"ok": True, "field": field, "available": availability.is_available(field, value)})
+
+
 # 인증 메일 재발송을 처리하는 뷰
 class ResendVerificationEmailView(LoginRequiredMixin, View):
     def get(self, request, *args, **kwargs):
@@ -64,31 +110,33 @@ class EmailChangeView(LoginRequiredMixin, FormView):
         new_email = form.cleaned_data['email']
 
         try:
-            # 기존 EmailAddress를 비우고 새 이메일을 단일 primary로 교체함.
-            EmailAddress.objects.filter(user=user).delete()
+            # 이메일 교체와 인증 메일 대기열 등록을 한 트랜잭션으로 묶어, 실패하면 메일도 남지 않게 함.
+            with transaction.atomic():
+                # 기존 EmailAddress를 비우고 새 이메일을 단일 primary로 교체함.
+                EmailAddress.objects.filter(user=user).delete()
 
-            new_email_obj = EmailAddress.objects.create(
-                user=user,
-                email=new_email,
-                primary=True,
-                verified=False
-            )
+                new_email_obj = EmailAddress.objects.create(
+                    user=user,
+                    email=new_email,
+                    primary=True,
+                    verified=False
+                )
 
-            # User.email도 같이 맞춰야 템플릿/관리자 화면에서 값이 일관됨.
-            user.email = new_email
-            user.save()
+                # User.email도 같이 맞춰야 템플릿/관리자 화면에서 값이 일관됨.
+                user.email = new_email
+                user.save()
 
-            # allauth의 확인 토큰을 직접 발급해 인증 메일을 보냄.
-            confirmation = EmailConfirmation.create(new_email_obj)
-            confirmation.send(self.request, signup=False)
+                # allauth의 확인 토큰을 직접 발급해 인증 메일을 보냄. (EMAIL_BACKEND가 대기열에 넣고 워커가 발송함)
+                confirmation = EmailConfirmation.create(new_email_obj)
+                confirmation.send(self.request, signup=False)
 
-            print(f"✅ [성공] {new_email}로 인증 메일 강제 발송 완료!")
+            logger.info("email change queued confirmation for user %s", user.pk)
 
             messages.success(self.request, f"이메일이 {new_email}로 변경되었습니다! 📩 인증 메일을 꼭 확인해주세요.")
             
             return redirect('main')
             
         except Exception as e:
-            print(f"❌ [오류] 이메일 변경 중 에러 발생: {e}")
+            logger.exception("email change failed for user %s", user.pk)
             messages.error(self.request, f"오류가 발생했습니다: {str(e)}")
             return self.form_invalid(form)
\ No newline at end of file
@@ -1,5 +1,10 @@
+from django.conf import settings
 from django.contrib import admin
-from .models import ChatMessage
+from django.db.models import Q
+
+from parties import search
+from parties.models import SearchPosting
+from .models import BannedTerm, ChatMessage
 
 
 # 관리자에서 채팅 로그를 탐색/검색하기 위한 설정
@@ -7,11 +12,29 @@ from .models import ChatMessage
 class ChatMessageAdmin(admin.ModelAdmin):
     list_display = ("id", "party", "user", "short_content", "created_at")
     list_filter = ("party", "created_at")
-    search_fields = ("content", "party__title", "user__username", "user__nickname")
+    search_fields = ("content", "user__username", "user__nickname")
     ordering = ("-id",)
     autocomplete_fields = ("party", "user")
 
+    # 본문은 검색 색인으로, 작성자는 아이디/닉네임 정확 일치로 찾음.
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        ids = search.search_ids(SearchPosting.Kind.MESSAGE, search_term, limit=settings.SEARCH_ADMIN_LIMIT)
+        matches = Q(pk__in=ids) | Q(user__username=search_term) | Q(user__nickname=search_term)
+        return queryset.filter(matches), False
+
     # 리스트에서 너무 긴 본문이 깨지지 않도록 축약 표시
     def short_content(self, obj):
         return obj.content[:30]
-    short_content.short_description = "내용"
\ No newline at end of file
+    short_content.short_description = "내용"
+
+
+# 금칙어 관리. 변경 내용은 워커 재시작 없이 MODERATION_RELOAD_INTERVAL 안에 반영됨.
+@admin.register(BannedTerm)
+class BannedTermAdmin(admin.ModelAdmin):
+    list_display = ("term", "is_active", "note", "updated_at")
+    list_editable = ("is_active",)
+    list_filter = ("is_active",)
+    search_fields = ("term", "note")
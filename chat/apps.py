@@ -5,3 +5,7 @@ from django.apps import AppConfig
 class ChatConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'chat'
+
+    # 금칙어 변경 시 필터 캐시 버전을 올리는 receiver를 등록함.
+    def ready(self):
+        import chat.signals
@@ -0,0 +1,218 @@
+import gzip
+import json
+import logging
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from accounts import directory
+from parties.models import Party
+from parties.search import remove_messages
+
+from .models import ChatMessage
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = "index.json"
+
+
+# 아카이브 파일에서 읽어온 메시지를 템플릿이 ChatMessage처럼 다룰 수 있게 감싸는 객체임.
+# user는 로드하지 않으므로 템플릿에서는 user_id/sender_name을 사용해야 함.
+class ArchivedMessage:
+    is_archived = True
+    user = None
+
+    def __init__(self, row):
+        self.id = row["id"]
+        self.party_id = row["party_id"]
+        self.user_id = row.get("user_id")
+        self.is_system = row.get("is_system", False)
+        self.sender_name = row.get("sender_name") or ""
+        self.content = row.get("content", "")
+        self.created_at = parse_datetime(row["created_at"]) if row.get("created_at") else None
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "party_id": self.party_id,
+            "user_id": self.user_id,
+            "is_system": self.is_system,
+            "sender_name": self.sender_name,
+            "content": self.content,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
+
+def archive_root():
+    return Path(getattr(settings, "CHAT_ARCHIVE_DIR", Path(settings.BASE_DIR) / "chat_archive"))
+
+
+def party_archive_dir(party_id):
+    return archive_root() / f"party_{party_id}"
+
+
+# 파티별 인덱스 파일을 읽음. 아카이브가 없으면 None을 반환함.
+def read_index(party_id):
+    path = party_archive_dir(party_id) / INDEX_FILENAME
+    try:
+        with open(path, encoding="utf-8") as fp:
+            return json.load(fp)
+    except FileNotFoundError:
+        return None
+
+
+# 인덱스는 임시 파일에 쓴 뒤 rename해 중간 상태가 읽히지 않게 함.
+def _write_index(party_id, index):
+    directory = party_archive_dir(party_id)
+    tmp_path = directory / f".{INDEX_FILENAME}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fp:
+        json.dump(index, fp, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, directory / INDEX_FILENAME)
+
+
+def _message_row(message):
+    # values()로 가져온 dict를 JSONL 한 줄로 직렬화 가능한 형태로 바꿈.
+    return {
+        "id": message["id"],
+        "party_id": message["party_id"],
+        "user_id": message["user_id"],
+        "is_system": message["is_system"],
+        "sender_name": message["sender_name"] or message["user__nickname"] or message["user__username"] or "",
+        "content": message["content"],
+        "created_at": message["created_at"].isoformat(),
+    }
+
+
+# 실행마다 일자별로 새 gzip JSONL 파일(<일자>-<첫 id>.jsonl.gz)을 임시 이름으로 쓰고, 다 쓴 뒤 rename함.
+# 중간에 죽어도 완성되지 않은 파일은 임시 이름으로만 남아 읽히지 않고, 기존 파일은 건드리지 않음.
+# 인덱스의 last_id까지는 이미 파일에 기록된 것으로 보고, 인덱스 기록 전에 중단됐다면 다음 실행이 같은 첫 id로
+# 같은 파일 이름을 다시 쓰므로 중복 기록되지 않음.
+def archive_party_messages(party, batch_size=1000):
+    directory = party_archive_dir(party.pk)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    index = read_index(party.pk) or {"party_id": party.pk, "total": 0, "last_id": 0, "days": {}}
+    queryset = (
+        ChatMessage.objects.filter(party_id=party.pk, id__gt=index["last_id"])
+        .order_by("id")
+        .values(
+            "id", "party_id", "user_id", "is_system", "sender_name", "content", "created_at",
+            "user__nickname", "user__username",
+        )
+    )
+
+    open_files = {}
+    written = 0
+    try:
+        for message in queryset.iterator(chunk_size=batch_size):
+            day = timezone.localdate(message["created_at"]).isoformat()
+            if day not in open_files:
+                filename = f"{day}-{message['id']}.jsonl.gz"
+                tmp_path = directory / f".{filename}.tmp"
+                open_files[day] = (gzip.open(tmp_path, "wt", encoding="utf-8"), tmp_path, filename, {"count": 0})
+            fp, _, filename, run = open_files[day]
+            fp.write(json.dumps(_message_row(message), ensure_ascii=False) + "\n")
+            run["count"] += 1
+            run["last_id"] = message["id"]
+            index["last_id"] = message["id"]
+            written += 1
+    except BaseException:
+        for fp, tmp_path, _, _ in open_files.values():
+            fp.close()
+            tmp_path.unlink(missing_ok=True)
+        raise
+
+    for day, (fp, tmp_path, filename, run) in open_files.items():
+        fp.close()
+        os.replace(tmp_path, directory / filename)
+        entry = index["days"].setdefault(day, {"files": [], "count": 0})
+        if filename not in entry["files"]:
+            entry["files"].append(filename)
+        entry["count"] += run["count"]
+        entry["last_id"] = run["last_id"]
+
+    index["total"] += written
+    index["closed_at"] = party.closed_at.isoformat() if party.closed_at else None
+    index["archived_at"] = timezone.now().isoformat()
+    _write_index(party.pk, index)
+
+    deleted = _delete_archived_rows(party, index["last_id"], batch_size)
+    logger.info("party %s chat archived: written=%s deleted=%s", party.pk, written, deleted)
+    return {"written": written, "deleted": deleted}
+
+
+def _delete_archived_rows(party, last_id, batch_size):
+    if party.pinned_message_id:
+        Party.objects.filter(pk=party.pk).update(pinned_message=None)
+
+    deleted = 0
+    while True:
+        ids = list(
+            ChatMessage.objects.filter(party_id=party.pk, id__lte=last_id)
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        remove_messages(party.pk, ids)
+        ChatMessage.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
+    return deleted
+
+
+# 아카이브된 메시지를 오래된 순으로 순회함. 파일은 일자, 첫 id 순이고 파일 안은 id 순임.
+def iter_archived_messages(party_id, index=None):
+    index = index or read_index(party_id)
+    if not index:
+        return
+
+    directory = party_archive_dir(party_id)
+    for day in sorted(index["days"]):
+        for filename in index["days"][day]["files"]:
+            path = directory / filename
+            if not path.exists():
+                logger.warning("archive file missing: %s", path)
+                continue
+            with gzip.open(path, "rt", encoding="utf-8") as fp:
+                for line in fp:
+                    if not line.strip():
+                        continue
+                    yield ArchivedMessage(json.loads(line))
+
+
+def load_archived_messages(party_id, limit=None, index=None):
+    messages = []
+    for message in iter_archived_messages(party_id, index=index):
+        messages.append(message)
+        if limit and len(messages) >= limit:
+            break
+    return messages
+
+
+def _fill_sender_names(messages):
+    unnamed = [message for message in messages if not message.sender_name and message.user_id]
+    if unnamed:
+        names = directory.get_names(message.user_id for message in unnamed)
+        for message in unnamed:
+            message.sender_name = names.get(message.user_id, "")
+
+
+# 파티 상세 화면용 채팅 기록을 오래된 순으로 최대 limit개 반환함.
+# 종료 파티에 아카이브가 있으면 파일의 메시지를 먼저 읽고, 아직 DB에 남은 이후 메시지(last_id 초과)를 이어 붙임.
+# 보낸 사람 이름은 sender_name 스냅샷을 쓰고, 스냅샷이 없는 예전 메시지만 디렉터리에서 한 번에 채움.
+def party_chat_history(party, limit=50):
+    index = read_index(party.pk) if party.status == Party.Status.CLOSED else None
+    archived = load_archived_messages(party.pk, limit=limit, index=index) if index else []
+    remaining = limit - len(archived)
+    if remaining <= 0:
+        return archived
+
+    queryset = party.messages.order_by("created_at")
+    if index:
+        queryset = queryset.filter(id__gt=index["last_id"])
+    messages = list(queryset[:remaining])
+    _fill_sender_names(messages)
+    return archived + messages
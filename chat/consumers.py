@@ -1,16 +1,35 @@
 import json
 import re
 
-from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
-
+from django.db import IntegrityError
+
+from accounts import directory
+from core.profiling import ProfilerConsumerMixin
+from core.realtime import (
+    MetricsConsumerMixin,
+    OutboundQueueConsumerMixin,
+    TracedConsumerMixin,
+    database_sync_to_async,
+    group_send,
+)
+from core.tracing import span
 from parties.models import Party, PartyMember
+from websocket_project.db_router import pin_primary, replica_reads
 
+from . import moderation, spam
 from .models import ChatMessage
 
 
-class ChatConsumer(AsyncWebsocketConsumer):
+class ChatConsumer(
+    MetricsConsumerMixin, TracedConsumerMixin, OutboundQueueConsumerMixin, ProfilerConsumerMixin, AsyncWebsocketConsumer
+):
     mention_pattern = re.compile(r"@([^\s@]{1,30})")
+    # 멤버/인원/대기열/파티 정보/고정 공지는 최신 스냅샷만 보내면 되고, 채팅은 최근 것부터 상한까지만 보냄.
+    coalesce_events = frozenset(
+        {"member_list_update", "count_update", "waitlist_update", "party_meta_update", "pinned_notice_update"}
+    )
+    capped_events = frozenset({"chat_message", "system_message"})
 
     async def connect(self):
         self.room_name = self.scope["url_route"]["kwargs"]["party_id"]
@@ -38,46 +57,79 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
     @database_sync_to_async
     def get_initial_state(self):
-        try:
-            party = Party.objects.select_related("host").get(id=self.room_name)
-            members = (
-                PartyMember.objects.filter(party=party, is_active=True)
-                .select_related("user")
-                .order_by("joined_at")
-            )
-            members_data = [
-                {
-                    "id": m.user.id,
-                    "nickname": m.user.nickname if m.user.nickname else m.user.username,
-                    "is_host": m.user_id == party.host_id,
-                }
-                for m in members
-            ]
-            return members_data, party.current_member_count
-        except Party.DoesNotExist:
-            return [], 0
+        # 접속 직후 스냅샷은 읽기 전용이므로 replica에서 읽음. (방금 입장한 사용자는 primary 고정)
+        with replica_reads(self.user.id):
+            try:
+                party = Party.objects.only("id", "host_id", "current_member_count").get(id=self.room_name)
+                member_ids = list(
+                    PartyMember.objects.filter(party=party, is_active=True)
+                    .order_by("joined_at")
+                    .values_list("user_id", flat=True)
+                )
+                names = directory.get_names(member_ids)
+                members_data = [
+                    {
+                        "id": user_id,
+                        "nickname": names.get(user_id, ""),
+                        "is_host": user_id == party.host_id,
+                    }
+                    for user_id in member_ids
+                ]
+                return members_data, party.current_member_count
+            except Party.DoesNotExist:
+                return [], 0
 
     async def disconnect(self, close_code):
         await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
 
     async def receive(self, text_data):
         data = json.loads(text_data)
+        if data.get("command") == "profile":
+            await self.handle_profile_command(data)
+            return
         message = (data.get("message") or "").replace("\r", "").replace("\n", "").strip()
         if not message:
             return
 
-        if not await self.can_chat():
+        with span("chat.can_chat"):
+            allowed = await self.can_chat()
+        if not allowed:
             await self.send(text_data=json.dumps({"type": "chat_error", "message": "파티 참여자만 채팅할 수 있습니다."}))
             return
 
-        mention_user_ids = await self.resolve_mentions(message)
-        nickname = getattr(self.user, "nickname", None) or self.user.username
+        with span("chat.moderation"):
+            # 필터 갱신 확인(캐시/DB 접근)은 주기마다 한 번만 하고, 검사는 이벤트 루프에서 바로 실행함.
+            if moderation.reload_due():
+                await database_sync_to_async(moderation.refresh_filter)()
+            banned_term = moderation.current_filter().find(message)
+        if banned_term:
+            await self.send(text_data=json.dumps({"type": "chat_error", "message": "금칙어가 포함된 메시지는 보낼 수 없습니다."}))
+            return
+
+        nickname = directory.display_name(self.user)
+        with span("chat.spam") as current:
+            verdict, reason = await spam.get_detector().acheck(self.user.id, message)
+            if current is not None:
+                current.attrs["verdict"] = verdict
+        if verdict == spam.REJECT:
+            await self.send(text_data=json.dumps({"type": "chat_error", "message": "같은 메시지를 너무 자주 보내고 있습니다. 잠시 후 다시 시도해 주세요."}))
+            return
+        if verdict == spam.SHADOW:
+            # 저장/전파 없이 보낸 사람에게만 평소처럼 보여 도배 계정이 걸러진 것을 알아채기 어렵게 함.
+            await self.chat_message(
+                {"message_id": None, "message": message, "sender": nickname, "sender_id": self.user.id}
+            )
+            return
 
-        saved = await self.save_message(message, nickname)
+        with span("chat.resolve_mentions"):
+            mention_user_ids = await self.resolve_mentions(message)
+
+        with span("chat.save_message"):
+            saved = await self.save_message(message, nickname)
         if not saved:
             return
 
-        await self.channel_layer.group_send(
+        await group_send(
             self.room_group_name,
             {
                 "type": "chat_message",
@@ -87,21 +139,23 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 "sender_id": self.user.id,
                 "mention_user_ids": mention_user_ids,
             },
+            self.channel_layer,
         )
 
     @database_sync_to_async
     def save_message(self, message, sender_name):
+        # can_chat()에서 활성 멤버임을 이미 확인했으므로 파티를 다시 조회하지 않고 id로 저장함.
         try:
-            party = Party.objects.get(id=self.room_name)
             created = ChatMessage.objects.create(
-                party=party,
+                party_id=self.room_name,
                 user=self.user,
                 content=message,
                 sender_name=sender_name,
             )
-            return {"id": created.id}
-        except Party.DoesNotExist:
+        except IntegrityError:
             return None
+        pin_primary(self.user.id)
+        return {"id": created.id}
 
     @database_sync_to_async
     def can_chat(self):
@@ -113,12 +167,11 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
     @database_sync_to_async
     def resolve_mentions(self, message):
-        try:
-            party = Party.objects.get(id=self.room_name)
-        except Party.DoesNotExist:
+        aliases = self.mention_pattern.findall(message)
+        if not aliases:
             return []
 
-        active_members = PartyMember.objects.filter(party=party, is_active=True).select_related("user")
+        active_members = PartyMember.objects.filter(party_id=self.room_name, is_active=True).select_related("user")
 
         alias_to_user_id = {}
         for member in active_members:
@@ -127,7 +180,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
             alias_to_user_id[member.user.username.lower()] = member.user_id
 
         mentioned_ids = set()
-        for alias in self.mention_pattern.findall(message):
+        for alias in aliases:
             user_id = alias_to_user_id.get(alias.lower())
             if user_id:
                 mentioned_ids.add(user_id)
@@ -200,6 +253,20 @@ class ChatConsumer(AsyncWebsocketConsumer):
             )
         )
 
+    async def entries_expired(self, event):
+        await self.send(
+            text_data=json.dumps(
+                {
+                    "type": "entries_expired",
+                    "request_ids": event["request_ids"],
+                    "request_user_ids": event["request_user_ids"],
+                    "pending_count": event["pending_count"],
+                    "waitlist_user_ids": event["waitlist_user_ids"],
+                    "waitlist": event["waitlist"],
+                }
+            )
+        )
+
     async def waitlist_update(self, event):
         await self.send(
             text_data=json.dumps(
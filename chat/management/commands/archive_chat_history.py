@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from chat.archive import archive_party_messages
+from chat.models import ChatMessage
+from parties.models import Party
+
+
+# 보존 기간이 지난 종료 파티의 채팅을 로컬 디스크(gzip JSONL)로 옮기고 DB에서 삭제하는 커맨드임.
+# 예: python manage.py archive_chat_history --days 30
+class Command(BaseCommand):
+    help = "보존 기간이 지난 CLOSED 파티의 채팅 메시지를 일자별 압축 파일로 아카이브합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=None, help="종료 후 DB에 남겨둘 일수")
+        parser.add_argument("--batch-size", type=int, default=None, help="조회/삭제 배치 크기")
+        parser.add_argument("--limit", type=int, default=None, help="한 번에 처리할 최대 파티 수")
+
+    def handle(self, *args, **options):
+        days = options["days"] if options["days"] is not None else settings.CHAT_ARCHIVE_RETENTION_DAYS
+        batch_size = options["batch_size"] or settings.CHAT_ARCHIVE_BATCH_SIZE
+        cutoff = timezone.now() - timedelta(days=days)
+
+        # closed_at 도입 전에 종료된 파티는 생성 시각으로 보존 기간을 판단함.
+        parties = (
+            Party.objects.filter(status=Party.Status.CLOSED, teardown_pending=False)
+            .filter(Q(closed_at__lte=cutoff) | Q(closed_at__isnull=True, created_at__lte=cutoff))
+            .filter(Exists(ChatMessage.objects.filter(party_id=OuterRef("pk"))))
+            .order_by("pk")
+        )
+        if options["limit"]:
+            parties = parties[: options["limit"]]
+
+        total_parties = 0
+        total_messages = 0
+        for party in parties:
+            result = archive_party_messages(party, batch_size=batch_size)
+            total_parties += 1
+            total_messages += result["written"]
+            self.stdout.write(f"  party={party.pk} written={result['written']} deleted={result['deleted']}")
+
+        self.stdout.write(self.style.SUCCESS(f"archived parties={total_parties} messages={total_messages}"))
@@ -0,0 +1,92 @@
+import random
+import re
+import time
+
+from django.core.management.base import BaseCommand
+
+from chat.moderation import BannedTermFilter, load_terms
+from core.benchmarks import latency_summary, write_results
+
+HANGUL_SYLLABLES = [chr(code) for code in range(0xAC00, 0xD7A4)]
+ASCII_LETTERS = "abcdefghijklmnopqrstuvwxyz"
+FILLER_WORDS = ["같이", "랭크", "돌릴", "사람", "구해요", "마이크", "있어요", "ㅋㅋㅋ", "gg", "ready", "go", "5인큐", "칼바람"]
+
+
+# 금칙어 필터의 단일 코어 처리량(메시지/초)과 메시지당 검사 지연을 측정하는 커맨드임.
+# 금칙어 수를 늘려도 메시지당 시간이 거의 그대로인지, 순진한 정규식 방식과 비교해 확인할 수 있음.
+# 예: python manage.py bench_moderation --terms 5000 --messages 20000 --compare-regex
+class Command(BaseCommand):
+    help = "채팅 금칙어 필터(Aho-Corasick)의 처리량을 측정합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--terms", type=int, default=5000, help="생성할 금칙어 수")
+        parser.add_argument("--messages", type=int, default=20000, help="검사할 메시지 수")
+        parser.add_argument("--length", type=int, default=40, help="메시지 평균 글자 수")
+        parser.add_argument("--hit-ratio", type=float, default=0.05, help="금칙어가 들어간 메시지 비율")
+        parser.add_argument("--use-db", action="store_true", help="생성 대신 실제 BannedTerm/파일 목록 사용")
+        parser.add_argument("--compare-regex", action="store_true", help="금칙어별 정규식 방식도 함께 측정")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--output", default=None)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        terms = load_terms() if options["use_db"] else self.generate_terms(rng, options["terms"])
+        messages = self.generate_messages(rng, terms, options["messages"], options["length"], options["hit_ratio"])
+
+        started = time.perf_counter()
+        term_filter = BannedTermFilter(terms)
+        build_seconds = time.perf_counter() - started
+
+        results = {
+            "terms": len(term_filter),
+            "build_ms": round(build_seconds * 1000.0, 3),
+            "aho_corasick": self.measure(term_filter.find, messages),
+        }
+        if options["compare_regex"]:
+            patterns = [re.compile(re.escape(term), re.IGNORECASE) for term in terms]
+            results["regex_per_term"] = self.measure(
+                lambda text: next((pattern.pattern for pattern in patterns if pattern.search(text)), None),
+                messages[: max(1, len(messages) // 20)],
+            )
+
+        params = {key: options[key] for key in ("terms", "messages", "length", "hit_ratio", "seed", "use_db")}
+        self.stdout.write(write_results("moderation", params, results, options["output"]))
+
+    def generate_terms(self, rng, count):
+        terms = set()
+        while len(terms) < count:
+            if rng.random() < 0.6:
+                terms.add("".join(rng.choice(HANGUL_SYLLABLES) for _ in range(rng.randint(2, 4))))
+            else:
+                terms.add("".join(rng.choice(ASCII_LETTERS) for _ in range(rng.randint(4, 8))))
+        return sorted(terms)
+
+    def generate_messages(self, rng, terms, count, length, hit_ratio):
+        messages = []
+        for _ in range(count):
+            words = []
+            while sum(len(word) + 1 for word in words) < length:
+                words.append(rng.choice(FILLER_WORDS))
+            if terms and rng.random() < hit_ratio:
+                # 띄어쓰기를 섞어 정규화 경로도 함께 측정함.
+                words.insert(rng.randrange(len(words) + 1), " ".join(rng.choice(terms)))
+            messages.append(" ".join(words))
+        return messages
+
+    def measure(self, check, messages):
+        latencies = []
+        hits = 0
+        started = time.perf_counter()
+        for message in messages:
+            before = time.perf_counter()
+            if check(message):
+                hits += 1
+            latencies.append(time.perf_counter() - before)
+        elapsed = time.perf_counter() - started
+        return {
+            "messages": len(messages),
+            "hits": hits,
+            "elapsed_s": round(elapsed, 3),
+            "messages_per_s": round(len(messages) / elapsed, 1) if elapsed else None,
+            "latency_ms": latency_summary(latencies),
+        }
@@ -1,5 +1,6 @@
 from django.conf import settings
 from django.db import models
+from accounts import directory
 from parties.models import Party
 
 # 파티 채팅 메시지(일반/시스템)를 저장하는 모델
@@ -25,5 +26,20 @@ class ChatMessage(models.Model):
     def __str__(self) -> str:
         if self.is_system:
             return f"[SYSTEM] {self.content[:20]}"
-        sender = self.sender_name or (self.user.nickname if self.user else "알 수 없음")
-        return f"{sender}: {self.content[:20]}"
\ No newline at end of file
+        sender = self.sender_name or (directory.get_name(self.user_id) if self.user_id else "알 수 없음")
+        return f"{sender}: {self.content[:20]}"
+
+# 채팅 금칙어임. 저장/삭제 시 chat.signals가 캐시 버전을 올려 모든 워커의 필터가 다시 만들어짐.
+# 파일(MODERATION_TERMS_FILE)로 관리하는 목록과 합쳐서 사용함.
+class BannedTerm(models.Model):
+    term = models.CharField(max_length=100, unique=True)
+    is_active = models.BooleanField(default=True)
+    note = models.CharField(max_length=200, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["term"]
+
+    def __str__(self) -> str:
+        return self.term
@@ -0,0 +1,298 @@
+import logging
+import threading
+import time
+import unicodedata
+from collections import deque
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# 채팅 금칙어 필터임.
+# 금칙어 수천 개를 정규식으로 하나씩 검사하지 않도록 Aho-Corasick 오토마톤을 미리 만들어 두고,
+# 메시지는 정규화 후 한 번만 훑어 길이에 비례하는 시간으로 검사함.
+# 금칙어는 BannedTerm(관리자)과 MODERATION_TERMS_FILE을 합쳐 쓰며, 관리자 수정은 캐시 버전,
+# 파일 수정은 mtime으로 감지해 워커 재시작 없이 MODERATION_RELOAD_INTERVAL 간격으로 다시 만듦.
+
+VERSION_CACHE_KEY = "chat:banned_terms:version"
+
+_HANGUL_BASE = 0xAC00
+_HANGUL_LAST = 0xD7A3
+_CHOSEONG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+_JUNGSEONG = "ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ"
+_JONGSEONG = ("", "ㄱ", "ㄲ", "ㄳ", "ㄴ", "ㄵ", "ㄶ", "ㄷ", "ㄹ", "ㄺ", "ㄻ", "ㄼ", "ㄽ", "ㄾ", "ㄿ", "ㅀ",
+              "ㅁ", "ㅂ", "ㅄ", "ㅅ", "ㅆ", "ㅇ", "ㅈ", "ㅊ", "ㅋ", "ㅌ", "ㅍ", "ㅎ")
+# 겹받침은 구성 자모로 풀어 "ㄳ"과 "ㄱㅅ"이 같게 취급되도록 함.
+_COMPOUND_JAMO = {
+    "ㄳ": "ㄱㅅ", "ㄵ": "ㄴㅈ", "ㄶ": "ㄴㅎ", "ㄺ": "ㄹㄱ", "ㄻ": "ㄹㅁ", "ㄼ": "ㄹㅂ", "ㄽ": "ㄹㅅ",
+    "ㄾ": "ㄹㅌ", "ㄿ": "ㄹㅍ", "ㅀ": "ㄹㅎ", "ㅄ": "ㅂㅅ",
+}
+
+
+# NFKC는 호환 자모(ㅆ)를 조합형 자모(U+1100대)로 바꾸므로 다시 호환 자모로 돌려 음절 분해 결과와 맞춤.
+_CONJOINING_TO_COMPAT = {
+    **{chr(0x1100 + index): jamo for index, jamo in enumerate(_CHOSEONG)},
+    **{chr(0x1161 + index): jamo for index, jamo in enumerate(_JUNGSEONG)},
+    **{chr(0x11A8 + index): jamo for index, jamo in enumerate(_JONGSEONG[1:])},
+}
+
+
+# 정규화 결과에서 단어 경계를 나타내는 글자임. 정규화된 본문에는 글자/숫자만 남으므로 겹치지 않음.
+BOUNDARY = " "
+
+
+def _is_bare_jamo(char):
+    return "\u3131" <= char <= "\u318e" or "\u1100" <= char <= "\u11ff"
+
+
+def _decompose(char):
+    code = ord(char)
+    if _HANGUL_BASE <= code <= _HANGUL_LAST:
+        offset = code - _HANGUL_BASE
+        jong = _JONGSEONG[offset % 28]
+        return _CHOSEONG[offset // 588] + _JUNGSEONG[(offset % 588) // 28] + _COMPOUND_JAMO.get(jong, jong)
+    char = _CONJOINING_TO_COMPAT.get(char, char)
+    return _COMPOUND_JAMO.get(char, char)
+
+
+def _kind(char):
+    if _is_bare_jamo(char):
+        return "jamo"
+    if _HANGUL_BASE <= ord(char) <= _HANGUL_LAST:
+        return "syllable"
+    return "word"
+
+
+# NFKC(전각/호환 문자 정리) -> 소문자 -> 한글 음절을 자모로 분해하고, 단어 사이는 BOUNDARY 하나로 모음.
+# - 한글: 같은 자모 반복을 하나로 줄이고("씨이이발"), 띄어쓰기/기호는 낱자모 옆에서만 무시함("ㅆ ㅣ발", "ㅅ.ㅂ").
+#   음절 사이의 띄어쓰기는 경계로 남겨 "다시 발표"가 "시발"로 읽히지 않게 함.
+# - 그 외(영문/숫자 등): 글자를 그대로 두고 경계로만 나눠 단어 단위로 비교함. ("class"에서 "ass"를 찾지 않음)
+def normalize(text):
+    text = unicodedata.normalize("NFKC", text).lower()
+    out = [BOUNDARY]
+    last = None
+    prev = None
+    gap = False
+    for char in text:
+        if not char.isalnum():
+            gap = True
+            continue
+        kind = _kind(char)
+        if prev is not None:
+            if kind == "word" or prev == "word":
+                joined = kind == prev and not gap
+            else:
+                joined = not gap or "jamo" in (kind, prev)
+            if not joined:
+                out.append(BOUNDARY)
+                last = None
+        prev, gap = kind, False
+
+        if kind == "word":
+            out.append(char)
+            last = None
+            continue
+        jamos = _decompose(char)
+        # "씨이" 처럼 앞 모음을 늘이는 묵음 ㅇ 음절은 모음 반복으로 보고 ㅇ을 건너뜀.
+        if len(jamos) > 1 and jamos[0] == "ㅇ" and jamos[1] == last:
+            jamos = jamos[1:]
+        for jamo in jamos:
+            if jamo != last:
+                out.append(jamo)
+                last = jamo
+    out.append(BOUNDARY)
+    return "".join(out)
+
+
+# 금칙어의 검색 키임. 영문 등 단어 글자로 시작/끝나는 쪽은 경계를 남겨 단어 단위로만 매칭하고,
+# 한글로 시작/끝나는 쪽은 경계를 떼어 "시발놈"처럼 붙여 쓴 경우도 매칭함.
+def term_key(term):
+    key = normalize(term)
+    if len(key) <= 2:
+        return ""
+    if _kind(key[1]) != "word":
+        key = key[1:]
+    if _kind(key[-2]) != "word":
+        key = key[:-1]
+    return key
+
+
+# 우회 표기가 잦은 금칙어 표시임. "~시발"처럼 앞에 붙이면(관리자/파일 모두) 경계 기준 비교에 더해
+# 띄어쓰기/기호/숫자를 모두 지우고 반복 글자를 줄인 형태로도 비교함. ("시 발", "시1발", "f u c k", "fuuuck")
+# 단어 경계를 보지 않으므로 "다시 발표"처럼 걸리는 문장이 생길 수 있어 금칙어마다 골라서 씀.
+EVASION_PREFIX = "~"
+
+
+# 글자만 남기고(띄어쓰기/기호/숫자 제거) 한글은 자모로 풀어 같은 글자 반복을 하나로 줄임. 영문도 줄임.
+def squeeze(text):
+    text = unicodedata.normalize("NFKC", text).lower()
+    out = []
+    last = None
+    for char in text:
+        if not char.isalpha():
+            continue
+        jamos = _decompose(char)
+        if len(jamos) > 1 and jamos[0] == "ㅇ" and jamos[1] == last:
+            jamos = jamos[1:]
+        for jamo in jamos:
+            if jamo != last:
+                out.append(jamo)
+                last = jamo
+    return "".join(out)
+
+
+# Aho-Corasick 오토마톤임. 키는 이미 정규화된 문자열이고, 매칭되면 등록할 때 준 인덱스를 돌려줌.
+class _Automaton:
+    def __init__(self):
+        # goto[state]는 다음 글자 -> 상태, fail[state]는 실패 링크, output[state]는 끝나는 금칙어 인덱스
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+
+    def __bool__(self):
+        return len(self._goto) > 1
+
+    def insert(self, key, index):
+        state = 0
+        for char in key:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+                self._goto[state][char] = next_state
+            state = next_state
+        self._output[state] = self._output[state] + (index,)
+
+    def build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                # 실패 링크 쪽에서 끝나는 금칙어도 이 상태에서 함께 매칭되도록 미리 합쳐 둠.
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def scan(self, normalized):
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for char in normalized:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                yield from output[state]
+
+
+class BannedTermFilter:
+    def __init__(self, terms):
+        self.terms = []
+        self._words = _Automaton()
+        self._squeezed = _Automaton()
+        seen = {}
+        for term in terms:
+            evasive = term.startswith(EVASION_PREFIX)
+            if evasive:
+                term = term[len(EVASION_PREFIX):].strip()
+            key = term_key(term)
+            if not key:
+                continue
+            index = seen.get(key)
+            if index is None:
+                index = seen[key] = len(self.terms)
+                self._words.insert(key, index)
+                self.terms.append(term)
+            if evasive and squeeze(term):
+                self._squeezed.insert(squeeze(term), index)
+        self._words.build()
+        self._squeezed.build()
+
+    def __len__(self):
+        return len(self.terms)
+
+    def _scan(self, text):
+        yield from self._words.scan(normalize(text))
+        if self._squeezed:
+            yield from self._squeezed.scan(squeeze(text))
+
+    # 처음 발견된 금칙어(원문 표기)를 반환함. 없으면 None.
+    def find(self, text):
+        for index in self._scan(text):
+            return self.terms[index]
+        return None
+
+    def find_all(self, text):
+        return sorted({self.terms[index] for index in self._scan(text)})
+
+
+def _terms_file():
+    path = settings.MODERATION_TERMS_FILE
+    return Path(path) if path else None
+
+
+def _file_mtime():
+    path = _terms_file()
+    try:
+        return path.stat().st_mtime if path else None
+    except OSError:
+        return None
+
+
+def load_terms():
+    from .models import BannedTerm
+
+    terms = list(BannedTerm.objects.filter(is_active=True).values_list("term", flat=True))
+    path = _terms_file()
+    if path and path.exists():
+        for line in path.read_text(encoding="utf-8").splitlines():
+            line = line.strip()
+            if line and not line.startswith("#"):
+                terms.append(line)
+    return terms
+
+
+def bump_version():
+    cache.set(VERSION_CACHE_KEY, time.time_ns(), None)
+
+
+_lock = threading.Lock()
+_state = {"filter": BannedTermFilter([]), "version": None, "mtime": None, "checked_at": None}
+
+
+def current_filter():
+    return _state["filter"]
+
+
+def reload_due():
+    checked_at = _state["checked_at"]
+    return checked_at is None or time.monotonic() - checked_at >= settings.MODERATION_RELOAD_INTERVAL
+
+
+# 캐시 버전이나 파일 mtime이 바뀐 경우에만 DB/파일을 다시 읽어 오토마톤을 새로 만듦. (DB 접근이 있어 동기 함수)
+def refresh_filter(force=False):
+    with _lock:
+        version = cache.get(VERSION_CACHE_KEY)
+        mtime = _file_mtime()
+        _state["checked_at"] = time.monotonic()
+        if not force and _state["version"] == version and _state["mtime"] == mtime and _state["version"] is not None:
+            return _state["filter"]
+
+        if version is None:
+            # 아직 아무도 버전을 올리지 않았다면 지금 기준으로 하나 만들어 워커 간에 공유함.
+            version = time.time_ns()
+            cache.add(VERSION_CACHE_KEY, version, None)
+            version = cache.get(VERSION_CACHE_KEY, version)
+
+        started = time.perf_counter()
+        new_filter = BannedTermFilter(load_terms())
+        _state.update(filter=new_filter, version=version, mtime=mtime)
+        logger.info("banned term filter rebuilt: %s terms in %.1fms", len(new_filter), (time.perf_counter() - started) * 1000)
+        return new_filter
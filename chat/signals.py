@@ -0,0 +1,21 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from parties import search
+from .models import BannedTerm, ChatMessage
+from .moderation import bump_version
+
+
+# 금칙어가 바뀌면 커밋 후 캐시 버전을 올려 각 워커가 다음 확인 주기에 필터를 다시 만들게 함.
+@receiver(post_save, sender=BannedTerm)
+@receiver(post_delete, sender=BannedTerm)
+def invalidate_banned_terms(sender, **kwargs):
+    transaction.on_commit(bump_version)
+
+
+# 새 채팅을 커밋 후 검색 색인에 넣음. 삭제는 리퍼/아카이브가 메시지를 지울 때 함께 정리함.
+@receiver(post_save, sender=ChatMessage)
+def index_chat_message(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: search.index_message(instance))
@@ -0,0 +1,146 @@
+import threading
+import time
+from collections import OrderedDict
+from hashlib import blake2b
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from core.metrics import registry
+
+from .moderation import BOUNDARY, normalize
+
+# 같은 메시지를 여러 파티에 붙여 넣거나 짧은 시간에 쏟아내는 도배를 save_message 전에 걸러내는 탐지기임.
+# 사용자별로 최근 메시지 지문(정규화 본문 해시 + simhash) SPAM_HISTORY_SIZE개만 들고 있으므로
+# 메시지당 비교 횟수가 상수이고, 프로세스 로컬 저장소는 SPAM_MAX_USERS명 LRU로 메모리가 제한됨.
+# SPAM_BACKEND=cache면 Django 캐시(운영에서는 Redis)에 저장해 워커 간에 공유함.
+
+OK = "ok"
+REJECT = "reject"
+SHADOW = "shadow"
+
+spam_verdicts = registry.counter("liveparty_chat_spam_total", "도배 탐지로 걸러진 채팅 메시지 수", ("reason", "action"))
+
+
+def _hash64(text):
+    return int.from_bytes(blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+# 글자 3-gram 기반 64비트 simhash. 몇 글자만 바꾼 복붙도 해밍 거리가 작게 나옴.
+# 비트별 가중치 합산은 이진 문자열을 열 단위로 묶어 count하는 방식으로 파이썬 루프를 줄임.
+def simhash(normalized):
+    shingles = {normalized[index:index + 3] for index in range(max(1, len(normalized) - 2))}
+    rows = [f"{_hash64(shingle):064b}" for shingle in shingles]
+    half = len(rows) / 2
+    return int("".join("1" if column.count("1") > half else "0" for column in zip(*rows)), 2)
+
+
+def fingerprint(normalized):
+    return _hash64(normalized), simhash(normalized)
+
+
+def _window_seconds():
+    return max(settings.SPAM_WINDOW_SECONDS, settings.SPAM_FLOOD_WINDOW_SECONDS)
+
+
+def _is_near_duplicate(a, b):
+    return a[1] == b[1] or bin(a[2] ^ b[2]).count("1") <= settings.SPAM_SIMHASH_DISTANCE
+
+
+# 사용자별 최근 지문 목록 [(시각, 해시, simhash), ...]을 보관하는 프로세스 로컬 LRU임.
+class LocalSpamStore:
+    def __init__(self, max_users):
+        self.max_users = max_users
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            history = self._entries.get(user_id)
+            if history is not None:
+                self._entries.move_to_end(user_id)
+            return list(history) if history else []
+
+    def set(self, user_id, history):
+        with self._lock:
+            self._entries[user_id] = history
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class CacheSpamStore:
+    key_prefix = "chat:spam:"
+
+    def get(self, user_id):
+        return [tuple(item) for item in cache.get(f"{self.key_prefix}{user_id}") or []]
+
+    def set(self, user_id, history):
+        cache.set(f"{self.key_prefix}{user_id}", history, timeout=int(_window_seconds()) + 1)
+
+
+class SpamDetector:
+    def __init__(self, store):
+        self.store = store
+        self.is_local = isinstance(store, LocalSpamStore)
+
+    # 판정 결과(OK/REJECT/SHADOW)와 사유를 반환함. 걸러진 메시지도 기록해 도배가 이어지면 계속 걸리게 함.
+    def check(self, user_id, text, now=None):
+        now = time.time() if now is None else now
+        window = _window_seconds()
+        history = [entry for entry in self.store.get(user_id) if now - entry[0] <= window]
+        # 도배 비교에는 단어 경계가 필요 없으므로 빼서 띄어쓰기만 바꾼 복붙도 같은 지문이 되게 함.
+        normalized = normalize(text).replace(BOUNDARY, "")
+        current = (now, *fingerprint(normalized))
+
+        reason = None
+        recent = [entry for entry in history if now - entry[0] <= settings.SPAM_FLOOD_WINDOW_SECONDS]
+        if len(recent) + 1 > settings.SPAM_FLOOD_LIMIT:
+            reason = "flood"
+        elif len(normalized) >= settings.SPAM_MIN_LENGTH:
+            # "ㅋㅋ", "gg" 같은 짧은 반응은 반복이 자연스러우므로 도배 속도 제한만 적용함.
+            duplicates = sum(
+                1
+                for entry in history
+                if now - entry[0] <= settings.SPAM_WINDOW_SECONDS and _is_near_duplicate(entry, current)
+            )
+            if duplicates + 1 > settings.SPAM_DUPLICATE_LIMIT:
+                reason = "duplicate"
+
+        history.append(current)
+        self.store.set(user_id, history[-max(settings.SPAM_HISTORY_SIZE, settings.SPAM_FLOOD_LIMIT):])
+
+        if reason is None:
+            return OK, None
+        action = SHADOW if settings.SPAM_ACTION == SHADOW else REJECT
+        spam_verdicts.inc(reason, action)
+        return action, reason
+
+    async def acheck(self, user_id, text):
+        if self.is_local:
+            return self.check(user_id, text)
+        return await sync_to_async(self.check)(user_id, text)
+
+
+_detector = None
+_detector_lock = threading.Lock()
+
+
+def get_detector():
+    global _detector
+    if _detector is None:
+        with _detector_lock:
+            if _detector is None:
+                store = CacheSpamStore() if settings.SPAM_BACKEND == "cache" else LocalSpamStore(settings.SPAM_MAX_USERS)
+                _detector = SpamDetector(store)
+    return _detector
+
+
+def reset_detector():
+    global _detector
+    with _detector_lock:
+        _detector = None
@@ -1,3 +1,281 @@
-from django.test import TestCase
+import inspect
+import tempfile
+from unittest import mock
+from pathlib import Path
 
-# chat 앱 테스트를 추가할 때 사용하는 기본 모듈임.
+from asgiref.sync import async_to_sync
+from channels.generic.websocket import AsyncWebsocketConsumer
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core.testing import QueryBudgetMixin, make_game, make_user
+from parties.models import Party, PartyMember
+
+from . import archive, moderation, spam
+from .archive import archive_party_messages, party_archive_dir, party_chat_history, read_index
+from .consumers import ChatConsumer
+from .models import BannedTerm, ChatMessage
+from .routing import websocket_urlpatterns
+
+IN_MEMORY_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+
+# ChatConsumer 단계별 최대 쿼리 수임. ":" 뒤는 같은 핸들러의 다른 분기임.
+# 그룹 이벤트 핸들러는 전달받은 payload만 내려보내야 하므로 예산이 0임.
+CONSUMER_QUERY_BUDGETS = {
+    "connect": 2,
+    "receive": 4,
+    "receive:mention": 5,
+    "receive:not_member": 1,
+    "receive:banned": 1,
+    "receive:spam": 1,
+    "disconnect": 0,
+    "event": 0,
+}
+
+# 그룹 이벤트 핸들러별 샘플 payload임. 핸들러를 추가하면 여기에도 추가해야 테스트가 통과함.
+EVENT_SAMPLES = {
+    "chat_message": {"message_id": 1, "message": "hi", "sender": "nick", "sender_id": 1, "mention_user_ids": []},
+    "system_message": {"message": "공지", "sender": "시스템"},
+    "party_killed": {},
+    "user_kicked": {"kicked_user_id": 999, "kicked_user_name": "nick"},
+    "count_update": {"count": 2},
+    "member_list_update": {"members": []},
+    "join_request_update": {"action": "created", "pending_count": 1, "request": {"id": 1, "nickname": "nick"}},
+    "join_request_result": {"target_user_id": 999, "status": "APPROVED", "message": "승인"},
+    "entries_expired": {
+        "request_ids": [1], "request_user_ids": [999], "pending_count": 0, "waitlist_user_ids": [], "waitlist": None
+    },
+    "waitlist_update": {"count": 0, "entries": []},
+    "party_meta_update": {"party": {"id": 1}},
+    "pinned_notice_update": {"pinned": None},
+}
+
+# 코루틴이지만 그룹 이벤트로 호출되지 않는 메서드임. (receive/connect 안에서 직접 부르는 헬퍼)
+NON_EVENT_HANDLERS = {"can_chat", "get_initial_state", "handle_profile_command", "resolve_mentions", "save_message"}
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYERS)
+class ChatConsumerQueryBudgetTests(QueryBudgetMixin, TransactionTestCase):
+    # database_sync_to_async는 호출 전후로 오래된 연결을 닫기 때문에 TransactionTestCase를 사용함.
+
+    def setUp(self):
+        self.game = make_game()
+        self.host = make_user(1)
+        self.member = make_user(2)
+        self.outsider = make_user(3)
+        self.party = Party.objects.create(host=self.host, game=self.game, mode="랭크")
+        PartyMember.objects.create(party=self.party, user=self.host)
+        PartyMember.objects.create(party=self.party, user=self.member)
+        BannedTerm.objects.create(term="씨발")
+        # 필터는 확인 주기마다 다시 만들어지므로 미리 만들어 두어 쿼리 수가 흔들리지 않게 함.
+        moderation.refresh_filter(force=True)
+        spam.reset_detector()
+
+    def run_scenario(self, scenario):
+        with self.capturingQueries():
+            async_to_sync(scenario)()
+
+    def budget(self, key):
+        return self.assertQueryBudget(CONSUMER_QUERY_BUDGETS[key], key)
+
+    async def connect(self, user):
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f"/ws/chat/{self.party.pk}/")
+        communicator.scope["user"] = user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual((await communicator.receive_json_from())["type"], "member_list_update")
+        self.assertEqual((await communicator.receive_json_from())["type"], "count_update")
+        return communicator
+
+    def test_every_event_handler_has_a_sample(self):
+        # 믹스인에서 상속한 핸들러도 포함하도록 MRO 전체를 보고, channels 기본 컨슈머의 메서드만 뺌.
+        framework = {name for klass in AsyncWebsocketConsumer.__mro__ for name in vars(klass)}
+        handlers = {
+            name
+            for name, _ in inspect.getmembers(ChatConsumer, inspect.iscoroutinefunction)
+            if not name.startswith("_") and name not in framework | NON_EVENT_HANDLERS
+        }
+        self.assertEqual(handlers, set(EVENT_SAMPLES))
+
+    def test_connect_and_disconnect(self):
+        async def scenario():
+            with self.budget("connect"):
+                communicator = await self.connect(self.member)
+            with self.budget("disconnect"):
+                await communicator.disconnect()
+
+        self.run_scenario(scenario)
+
+    def test_receive(self):
+        async def scenario():
+            communicator = await self.connect(self.member)
+            with self.budget("receive"):
+                await communicator.send_json_to({"message": "안녕하세요"})
+                self.assertEqual((await communicator.receive_json_from())["type"], "chat_message")
+            with self.budget("receive:mention"):
+                await communicator.send_json_to({"message": "@nick1 시작해요"})
+                payload = await communicator.receive_json_from()
+            self.assertEqual(payload["mention_user_ids"], [self.host.pk])
+            await communicator.disconnect()
+
+        self.run_scenario(scenario)
+
+    def test_receive_from_non_member(self):
+        async def scenario():
+            communicator = await self.connect(self.outsider)
+            with self.budget("receive:not_member"):
+                await communicator.send_json_to({"message": "hi"})
+                self.assertEqual((await communicator.receive_json_from())["type"], "chat_error")
+            await communicator.disconnect()
+
+        self.run_scenario(scenario)
+
+    def test_event_handlers(self):
+        async def scenario():
+            communicator = await self.connect(self.member)
+            channel_layer = get_channel_layer()
+            for event_type, sample in EVENT_SAMPLES.items():
+                with self.subTest(event_type), self.assertQueryBudget(CONSUMER_QUERY_BUDGETS["event"], event_type):
+                    await channel_layer.group_send(f"chat_{self.party.pk}", {"type": event_type, **sample})
+                    await communicator.receive_output()
+            await communicator.disconnect()
+
+        self.run_scenario(scenario)
+
+    def test_banned_term_is_rejected_before_save(self):
+        async def scenario():
+            communicator = await self.connect(self.member)
+            with self.budget("receive:banned"):
+                await communicator.send_json_to({"message": "ㅆ ㅣ 발"})
+                self.assertEqual((await communicator.receive_json_from())["type"], "chat_error")
+            await communicator.disconnect()
+
+        self.run_scenario(scenario)
+
+    def test_near_duplicate_flood_is_shadow_dropped(self):
+        async def scenario():
+            communicator = await self.connect(self.member)
+            for _ in range(3):
+                await communicator.send_json_to({"message": "롤 5인큐 구합니다 디코 abc123"})
+                self.assertIsNotNone((await communicator.receive_json_from())["message_id"])
+            with self.budget("receive:spam"):
+                await communicator.send_json_to({"message": "롤 5인큐 구합니다!! 디코 abc124"})
+                payload = await communicator.receive_json_from()
+            self.assertEqual(payload["type"], "chat_message")
+            self.assertIsNone(payload["message_id"])
+            await communicator.disconnect()
+
+        self.run_scenario(scenario)
+
+    @override_settings(SPAM_ACTION=spam.REJECT, SPAM_FLOOD_LIMIT=3)
+    def test_flood_is_rejected(self):
+        async def scenario():
+            communicator = await self.connect(self.member)
+            for index in range(3):
+                await communicator.send_json_to({"message": f"ㅋㅋ {index}"})
+                self.assertEqual((await communicator.receive_json_from())["type"], "chat_message")
+            await communicator.send_json_to({"message": "ㅋㅋ"})
+            self.assertEqual((await communicator.receive_json_from())["type"], "chat_error")
+            await communicator.disconnect()
+
+        self.run_scenario(scenario)
+
+
+class ChatArchiveTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        override = override_settings(CHAT_ARCHIVE_DIR=Path(tmp.name))
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.host = make_user(1)
+        self.party = Party.objects.create(
+            host=self.host, game=make_game(), mode="랭크", status=Party.Status.CLOSED, closed_at=timezone.now()
+        )
+        self.say("첫 메시지", "두 번째")
+
+    def say(self, *contents):
+        for content in contents:
+            ChatMessage.objects.create(party=self.party, user=self.host, content=content, sender_name="nick1")
+
+    def contents(self):
+        return [message.content for message in party_chat_history(self.party)]
+
+    def test_each_run_writes_its_own_file(self):
+        self.assertEqual(archive_party_messages(self.party), {"written": 2, "deleted": 2})
+        self.say("세 번째")
+        archive_party_messages(self.party)
+
+        index = read_index(self.party.pk)
+        files = [name for entry in index["days"].values() for name in entry["files"]]
+        self.assertEqual((index["total"], len(files)), (3, 2))
+        self.assertFalse(list(party_archive_dir(self.party.pk).glob(".*.gz.tmp")))
+        self.assertFalse(ChatMessage.objects.filter(party=self.party).exists())
+        self.assertEqual(self.contents(), ["첫 메시지", "두 번째", "세 번째"])
+
+    def test_failed_run_leaves_earlier_files_readable(self):
+        archive_party_messages(self.party)
+        self.say("세 번째", "네 번째")
+        real_row = archive._message_row
+        calls = []
+
+        def flaky_row(message):
+            calls.append(message["id"])
+            if len(calls) == 2:
+                raise OSError("disk full")
+            return real_row(message)
+
+        with mock.patch.object(archive, "_message_row", flaky_row), self.assertRaises(OSError):
+            archive_party_messages(self.party)
+
+        # 실패한 실행의 임시 파일은 지워지고, 이전 실행의 파일과 DB 행은 그대로 남음.
+        self.assertFalse(list(party_archive_dir(self.party.pk).glob(".*.tmp")))
+        self.assertEqual(read_index(self.party.pk)["total"], 2)
+        self.assertEqual(self.contents(), ["첫 메시지", "두 번째", "세 번째", "네 번째"])
+
+    def test_history_joins_archive_and_remaining_rows(self):
+        archive_party_messages(self.party)
+        # 아카이브 이후 DB에 남은 메시지도 잘리지 않고 이어서 보여야 함.
+        self.say("남은 메시지")
+        self.assertEqual(self.contents(), ["첫 메시지", "두 번째", "남은 메시지"])
+        self.assertEqual([message.content for message in party_chat_history(self.party, limit=2)], ["첫 메시지", "두 번째"])
+
+
+class BannedTermFilterTests(SimpleTestCase):
+    def setUp(self):
+        self.filter = moderation.BannedTermFilter(["씨발", "시발", "ㅅㅂ", "ass", "sex", "fuck you"])
+
+    def test_catches_hangul_evasion(self):
+        for text in ("씨발", "씨이이발", "ㅆ ㅣ발", "ㅆ.ㅣ.ㅂㅏㄹ", "시발놈아", "ㅅ ㅂ", "Ｓｅｘ", "you ASS!", "fuck   you"):
+            with self.subTest(text=text):
+                self.assertIsNotNone(self.filter.find(text))
+
+    def test_ignores_words_that_merely_contain_a_term(self):
+        for text in ("I was there", "class", "passes", "essex", "sussex", "sex123", "다시 발표", "정시 발매", "fuckyou"):
+            with self.subTest(text=text):
+                self.assertIsNone(self.filter.find(text))
+
+    def test_evasion_prone_terms_also_match_without_spacing_or_repeats(self):
+        strict = moderation.BannedTermFilter(["~시발", "~병신", "~fuck", "ass"])
+        for text in ("시 발", "병 신", "시1발", "시~~발", "f u c k", "fuuuck", "F.U.C.K", "시발점"):
+            with self.subTest(text=text):
+                self.assertIsNotNone(strict.find(text))
+        self.assertEqual(strict.find_all("병 신 fuuuck"), ["fuck", "병신"])
+
+    def test_evasion_matching_is_opt_in_per_term(self):
+        for text in ("시 발", "시1발", "f u c k", "fuuuck"):
+            with self.subTest(text=text):
+                self.assertIsNone(moderation.BannedTermFilter(["시발", "fuck"]).find(text))
+        # 표시하지 않은 금칙어는 여전히 단어 단위로만 비교함.
+        strict = moderation.BannedTermFilter(["~fuck", "ass"])
+        for text in ("class", "a s s", "passes"):
+            with self.subTest(text=text):
+                self.assertIsNone(strict.find(text))
+
+    def test_latin_letters_are_not_collapsed(self):
+        self.assertNotEqual(moderation.normalize("assess"), moderation.normalize("ases"))
+        self.assertEqual(self.filter.find_all("ass 시발 sex"), ["ass", "sex", "시발"])
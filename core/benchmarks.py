@@ -0,0 +1,102 @@
+import json
+import math
+import platform
+import subprocess
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+
+
+# 벤치마크 커맨드들이 공통으로 쓰는 측정/저장 유틸리티임.
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    # nearest-rank 방식: ceil(pct/100 * N)번째 값이라 표본이 적어도 실제 관측값 중 하나를 반환함.
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def latency_summary(seconds):
+    ms = [value * 1000.0 for value in seconds]
+    return {
+        "count": len(ms),
+        "p50": _round(percentile(ms, 50)),
+        "p95": _round(percentile(ms, 95)),
+        "p99": _round(percentile(ms, 99)),
+        "max": _round(max(ms) if ms else None),
+    }
+
+
+def _round(value):
+    return None if value is None else round(value, 3)
+
+
+# 모든 스레드의 DB 연결에서 실행된 쿼리 수를 세는 카운터임.
+# database_sync_to_async 스레드는 연결을 나중에 만들기 때문에 connection_created 시그널로도 등록함.
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self._lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+    def _on_connection_created(self, sender, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+    @contextmanager
+    def installed(self):
+        connection_created.connect(self._on_connection_created, weak=False)
+        for conn in connections.all():
+            conn.execute_wrappers.append(self)
+        try:
+            yield self
+        finally:
+            connection_created.disconnect(self._on_connection_created)
+            for conn in connections.all():
+                if self in conn.execute_wrappers:
+                    conn.execute_wrappers.remove(self)
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+# 커밋 간 비교가 가능하도록 실행 환경 메타데이터와 함께 JSON으로 저장함.
+def write_results(name, params, results, output=None):
+    payload = {
+        "benchmark": name,
+        "created_at": timezone.now().isoformat(),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connections["default"].vendor,
+        "params": params,
+        "results": results,
+    }
+    text = json.dumps(payload, ensure_ascii=False, indent=2)
+    if output:
+        path = Path(output)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text + "\n", encoding="utf-8")
+    return text
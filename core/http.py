@@ -0,0 +1,16 @@
+from django.conf import settings
+
+
+# 요청을 보낸 실제 클라이언트 IP를 반환함.
+# 앞단 프록시가 TRUSTED_PROXY_COUNT개라면 X-Forwarded-For의 오른쪽에서 그 수만큼 떨어진 주소가 클라이언트임.
+# 그보다 왼쪽 값은 클라이언트가 마음대로 넣을 수 있으므로 보지 않고, 홉 수가 모자라면 None을 반환함.
+def client_ip(request):
+    proxies = settings.TRUSTED_PROXY_COUNT
+    if proxies <= 0:
+        return request.META.get("REMOTE_ADDR") or None
+
+    forwarded = request.META.get("HTTP_X_FORWARDED_FOR", "")
+    hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+    if len(hops) < proxies:
+        return None
+    return hops[-proxies]
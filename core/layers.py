@@ -0,0 +1,429 @@
+import asyncio
+import bisect
+import fnmatch
+import logging
+import random
+import re
+import string
+from hashlib import blake2b
+
+from channels.exceptions import ChannelFull
+from channels.layers import BaseChannelLayer
+from django.utils.module_loading import import_string
+
+from .metrics import layer_envelopes, layer_local_deliveries, layer_shard_ops
+
+logger = logging.getLogger(__name__)
+
+# 워커(프로세스) 단위로 그룹 메시지를 한 번만 받아 로컬 소켓들에 메모리로 나눠 주는 채널 레이어임.
+# channels_redis(4.x)도 group_send 때 같은 프로세스 채널을 묶어 프로세스당 Redis 메시지 하나만 보내지만,
+# 그룹 zset에는 소켓마다 채널이 들어가 group_send마다 멤버 전체를 읽고 메시지에 채널 목록을 싣고,
+# 소켓 연결/종료마다 group_add/discard 명령이 나감. 이 레이어는 워커마다 내부 레이어 채널(inbox) 하나만
+# 그룹에 가입시키므로 그룹 크기와 메시지의 채널 목록이 소켓 수가 아니라 워커 수에 비례함.
+# (group_add는 만료 갱신을 위해 소켓마다 그대로 보내고, group_discard는 워커의 마지막 소켓이 나갈 때만 보냄)
+# inbox 하나가 워커의 모든 그룹 메시지를 받으므로 내부 레이어의 inbox 용량은 inbox_capacity로 따로 잡음.
+#
+# CHANNEL_LAYERS = {"default": {
+#     "BACKEND": "core.layers.GroupMultiplexChannelLayer",
+#     "CONFIG": {"inner": {"BACKEND": "channels_redis.core.RedisChannelLayer", "CONFIG": {...}}},
+# }}
+
+GROUP_ENVELOPE = "mux.group"
+DIRECT_ENVELOPE = "mux.direct"
+INBOX_PREFIX = "mux"
+INBOX_CAPACITY_PATTERN = f"{INBOX_PREFIX}.*"
+SOCKET_TOKEN_PREFIX = "mx"
+
+
+# 설정 dict({"BACKEND", "CONFIG"})로 레이어를 만듦. 이미 만든 레이어 인스턴스는 그대로 씀. (벤치마크/테스트에서 공유용)
+def build_layer(config):
+    if isinstance(config, BaseChannelLayer):
+        return config
+    return import_string(config["BACKEND"])(**config.get("CONFIG", {}))
+
+
+class GroupMultiplexChannelLayer(BaseChannelLayer):
+    extensions = ["groups", "flush"]
+
+    def __init__(self, inner=None, expiry=60, capacity=100, channel_capacity=None, inbox_capacity=10000):
+        super().__init__(expiry=expiry, capacity=capacity, channel_capacity=channel_capacity)
+        self.channel_capacity = self.compile_capacities(channel_capacity or {})
+        self.inbox_capacity = inbox_capacity
+        self.inner = build_layer(inner or {"BACKEND": "channels.layers.InMemoryChannelLayer"})
+        self._reserve_inbox_capacity(self.inner)
+        self._reset()
+
+    # 내부 레이어 기본 용량(channels 기본 100)은 소켓 하나 기준이라 워커 전체가 쓰는 inbox에는 금방 차서
+    # 순간적으로 몰린 그룹 메시지가 버려짐. inbox 채널에만 inbox_capacity를 적용하고,
+    # 내부 레이어 channel_capacity에 inbox 패턴이 이미 있으면(명시 설정) 그대로 둠. 샤드 레이어는 샤드마다 적용함.
+    def _reserve_inbox_capacity(self, layer):
+        for shard in getattr(layer, "shards", {}).values():
+            self._reserve_inbox_capacity(shard)
+        compiled = getattr(layer, "channel_capacity", None)
+        if compiled is None:
+            return
+        # InMemoryChannelLayer는 설정 dict를 컴파일하지 않고 들고 있으므로 여기서 맞춰 줌.
+        if isinstance(compiled, dict):
+            compiled = self.compile_capacities(compiled)
+        if any(pattern.match(f"{INBOX_PREFIX}.x!y") for pattern, _ in compiled):
+            layer.channel_capacity = compiled
+            return
+        layer.channel_capacity = self.compile_capacities({INBOX_CAPACITY_PATTERN: self.inbox_capacity}) + compiled
+
+    # 이벤트 루프가 바뀌면(테스트의 async_to_sync 등) 이전 루프에 묶인 큐/태스크를 버리고 새로 시작함.
+    def _reset(self):
+        self.inbox = None
+        # channel -> asyncio.Queue. realtime.pending_messages가 대기열 길이를 읽을 수 있도록 이름을 channels로 둠.
+        self.channels = {}
+        # group -> 이 워커에 있는 소켓 채널 집합
+        self.groups = {}
+        self._loop = None
+        self._reader = None
+        self._inbox_lock = None
+
+    async def _ensure_inbox(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._reset()
+            self._loop = loop
+            self._inbox_lock = asyncio.Lock()
+        if self.inbox is None:
+            async with self._inbox_lock:
+                if self.inbox is None:
+                    self.inbox = await self.inner.new_channel(INBOX_PREFIX)
+        if self._reader is None or self._reader.done():
+            self._reader = loop.create_task(self._read_inbox(self.inbox))
+        return self.inbox
+
+    # 소켓 채널은 "<inbox>.mx<token>" 형태라 이름만으로 소유 워커의 inbox를 알 수 있음.
+    def _owner_inbox(self, channel):
+        owner, _, token = channel.rpartition(".")
+        if token.startswith(SOCKET_TOKEN_PREFIX) and "!" in owner:
+            return owner
+        return None
+
+    # ------------------------------------------------------------------ inbox
+
+    async def _read_inbox(self, inbox):
+        while True:
+            try:
+                envelope = await self.inner.receive(inbox)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("multiplex inbox receive failed: %s", inbox)
+                await asyncio.sleep(0.5)
+                continue
+            kind = envelope.get("type")
+            layer_envelopes.inc("in", kind)
+            if kind == GROUP_ENVELOPE:
+                for channel in list(self.groups.get(envelope["group"], ())):
+                    self._deliver(channel, envelope["message"])
+            elif kind == DIRECT_ENVELOPE:
+                self._deliver(envelope["channel"], envelope["message"])
+
+    # 그룹 전송은 channels와 같이 가득 찬 소켓만 건너뜀. 소켓마다 얕은 복사본을 넘겨 서로 영향이 없게 함.
+    def _deliver(self, channel, message):
+        queue = self.channels.get(channel)
+        if queue is None:
+            layer_local_deliveries.inc("missing")
+            return False
+        try:
+            queue.put_nowait(dict(message))
+        except asyncio.QueueFull:
+            layer_local_deliveries.inc("dropped")
+            return False
+        layer_local_deliveries.inc("delivered")
+        return True
+
+    # ------------------------------------------------------------------ channel API
+
+    async def new_channel(self, prefix="specific"):
+        inbox = await self._ensure_inbox()
+        token = "".join(random.choice(string.ascii_letters) for _ in range(12))
+        channel = f"{inbox}.{SOCKET_TOKEN_PREFIX}{token}"
+        self.channels[channel] = asyncio.Queue(maxsize=self.get_capacity(channel))
+        return channel
+
+    async def send(self, channel, message):
+        assert isinstance(message, dict), "message is not a dict"
+        self.require_valid_channel_name(channel)
+        inbox = await self._ensure_inbox()
+        owner = self._owner_inbox(channel)
+        if owner is None:
+            await self.inner.send(channel, message)
+            return
+        if owner == inbox:
+            queue = self.channels.get(channel)
+            if queue is None:
+                return
+            if queue.full():
+                raise ChannelFull(channel)
+            queue.put_nowait(dict(message))
+            return
+        layer_envelopes.inc("out", DIRECT_ENVELOPE)
+        await self.inner.send(owner, {"type": DIRECT_ENVELOPE, "channel": channel, "message": message})
+
+    async def receive(self, channel):
+        self.require_valid_channel_name(channel)
+        await self._ensure_inbox()
+        if self._owner_inbox(channel) is None:
+            return await self.inner.receive(channel)
+        queue = self.channels.get(channel)
+        if queue is None:
+            queue = self.channels[channel] = asyncio.Queue(maxsize=self.get_capacity(channel))
+        try:
+            return await queue.get()
+        except asyncio.CancelledError:
+            # 컨슈머가 끝나면 receive가 취소됨. 남은 그룹 가입을 정리해 워커 구독이 새지 않게 함.
+            await self._forget(channel)
+            raise
+
+    async def _forget(self, channel):
+        self.channels.pop(channel, None)
+        for group in [group for group, members in self.groups.items() if channel in members]:
+            await self.group_discard(group, channel)
+
+    # ------------------------------------------------------------------ groups
+
+    async def group_add(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        inbox = await self._ensure_inbox()
+        if self._owner_inbox(channel) != inbox:
+            # 다른 워커/일반 채널은 내부 레이어 그룹에 직접 가입시킴.
+            await self.inner.group_add(group, channel)
+            return
+        self.groups.setdefault(group, set()).add(channel)
+        # 첫 가입이 아니어도 다시 호출해 내부 레이어의 그룹 만료 시간을 갱신함.
+        await self.inner.group_add(group, inbox)
+
+    async def group_discard(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        inbox = await self._ensure_inbox()
+        if self._owner_inbox(channel) != inbox:
+            await self.inner.group_discard(group, channel)
+            return
+        members = self.groups.get(group)
+        if members is None:
+            return
+        members.discard(channel)
+        if not members:
+            del self.groups[group]
+            await self.inner.group_discard(group, inbox)
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), "message is not a dict"
+        self.require_valid_group_name(group)
+        layer_envelopes.inc("out", GROUP_ENVELOPE)
+        await self.inner.group_send(group, {"type": GROUP_ENVELOPE, "group": group, "message": message})
+
+    async def flush(self):
+        if self._reader is not None:
+            self._reader.cancel()
+        self._reset()
+        await self.inner.flush()
+
+    async def close(self):
+        if self._reader is not None:
+            self._reader.cancel()
+        close = getattr(self.inner, "close", None)
+        if close is not None:
+            await close()
+
+
+# 이름 -> 샤드 이름을 정하는 consistent hash ring임. 샤드를 추가/제거해도 대부분의 그룹은 같은 샤드에 남음.
+class HashRing:
+    def __init__(self, names, replicas=100):
+        self._points = sorted(
+            (self._hash(f"{name}#{index}"), name) for name in names for index in range(replicas)
+        )
+        self._keys = [point for point, _ in self._points]
+
+    @staticmethod
+    def _hash(value):
+        return int.from_bytes(blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+    def get(self, key):
+        index = bisect.bisect(self._keys, self._hash(key)) % len(self._keys)
+        return self._points[index][1]
+
+
+SHARD_CHANNEL_PREFIX = "shard-"
+SHARD_NAME = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+# 그룹/채널을 여러 채널 레이어(샤드)에 나눠 두는 레이어임.
+# - 그룹은 pins(fnmatch 패턴 -> 샤드)에 걸리면 그 샤드, 아니면 hash ring으로 정한 샤드 하나에만 존재함.
+# - new_channel로 만든 채널은 "shard-<홈 샤드>.<홈 샤드 실제 채널>" 이름을 가짐. 다른 프로세스의 직접 전송은
+#   홈 샤드로 가고, 다른 샤드 그룹에 가입하면 그 샤드에 실제 채널을 하나 더 만들어 여러 샤드에서 받은 메시지를
+#   로컬 큐 하나로 모음.
+#
+# CHANNEL_LAYERS = {"default": {
+#     "BACKEND": "core.layers.ShardedChannelLayer",
+#     "CONFIG": {"shards": {"a": {...}, "b": {...}, "lobby": {...}}, "pins": {"lobby": "lobby", "chat_42": "b"}},
+# }}
+class ShardedChannelLayer(BaseChannelLayer):
+    extensions = ["groups", "flush"]
+
+    def __init__(self, shards, pins=None, replicas=100, expiry=60, capacity=100, channel_capacity=None):
+        super().__init__(expiry=expiry, capacity=capacity, channel_capacity=channel_capacity)
+        self.channel_capacity = self.compile_capacities(channel_capacity or {})
+        invalid = [name for name in shards if not SHARD_NAME.match(name)]
+        if invalid:
+            raise ValueError(f"invalid shard name(s): {', '.join(invalid)}")
+        self.shards = {name: build_layer(config) for name, config in shards.items()}
+        self.pins = list((pins or {}).items())
+        unknown = {shard for _, shard in self.pins} - set(self.shards)
+        if unknown:
+            raise ValueError(f"pinned to unknown shard(s): {', '.join(sorted(unknown))}")
+        # 고정된 그룹 전용 샤드에는 다른 그룹이 몰리지 않도록 ring에서 뺌. (모두 고정용이면 전체 사용)
+        pinned_only = {shard for _, shard in self.pins}
+        ring_names = [name for name in self.shards if name not in pinned_only] or list(self.shards)
+        self.ring = HashRing(ring_names, replicas)
+        self._reset()
+
+    def _reset(self):
+        self._loop = None
+        # 이 프로세스가 만든 채널 -> 로컬 큐 / 샤드별 실제 채널 / 샤드별 수신 태스크 / 가입한 그룹
+        self.channels = {}
+        self._real = {}
+        self._readers = {}
+        self._groups = {}
+
+    def _check_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._reset()
+            self._loop = loop
+
+    def shard_for_group(self, group):
+        for pattern, shard in self.pins:
+            if fnmatch.fnmatchcase(group, pattern):
+                return shard
+        return self.ring.get(group)
+
+    # 샤드 채널이면 (홈 샤드, 홈 샤드 실제 이름), 아니면 hash ring 기준 샤드와 원래 이름을 반환함.
+    def _route_channel(self, channel):
+        if channel.startswith(SHARD_CHANNEL_PREFIX):
+            shard, _, real = channel[len(SHARD_CHANNEL_PREFIX):].partition(".")
+            if shard in self.shards and real:
+                return shard, real
+        return self.ring.get(channel), channel
+
+    # ------------------------------------------------------------------ channel API
+
+    async def new_channel(self, prefix="specific"):
+        self._check_loop()
+        home = self.ring.get(f"{prefix}.{random.random()}")
+        real = await self.shards[home].new_channel(prefix)
+        channel = f"{SHARD_CHANNEL_PREFIX}{home}.{real}"
+        self.channels[channel] = asyncio.Queue(maxsize=self.get_capacity(channel))
+        self._real[channel] = {home: real}
+        self._readers[channel] = {}
+        self._groups[channel] = set()
+        return channel
+
+    async def send(self, channel, message):
+        assert isinstance(message, dict), "message is not a dict"
+        self.require_valid_channel_name(channel)
+        shard, real = self._route_channel(channel)
+        layer_shard_ops.inc(shard, "send")
+        await self.shards[shard].send(real, message)
+
+    async def receive(self, channel):
+        self.require_valid_channel_name(channel)
+        self._check_loop()
+        if channel not in self.channels:
+            shard, real = self._route_channel(channel)
+            return await self.shards[shard].receive(real)
+        self._start_readers(channel)
+        try:
+            return await self.channels[channel].get()
+        except asyncio.CancelledError:
+            await self._forget(channel)
+            raise
+
+    def _start_readers(self, channel):
+        readers = self._readers[channel]
+        for shard, real in self._real[channel].items():
+            task = readers.get(shard)
+            if task is None or task.done():
+                readers[shard] = self._loop.create_task(self._read_shard(channel, shard, real))
+
+    async def _read_shard(self, channel, shard, real):
+        queue = self.channels[channel]
+        while True:
+            try:
+                message = await self.shards[shard].receive(real)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("shard receive failed: %s on %s", real, shard)
+                await asyncio.sleep(0.5)
+                continue
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                layer_local_deliveries.inc("dropped")
+
+    async def _forget(self, channel):
+        for group in list(self._groups.get(channel, ())):
+            await self.group_discard(group, channel)
+        for task in self._readers.pop(channel, {}).values():
+            task.cancel()
+        self.channels.pop(channel, None)
+        self._real.pop(channel, None)
+        self._groups.pop(channel, None)
+
+    # ------------------------------------------------------------------ groups
+
+    async def group_add(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        self._check_loop()
+        shard = self.shard_for_group(group)
+        layer_shard_ops.inc(shard, "group_add")
+        if channel not in self.channels:
+            await self.shards[shard].group_add(group, channel)
+            return
+        real = self._real[channel].get(shard)
+        if real is None:
+            real = self._real[channel][shard] = await self.shards[shard].new_channel("specific")
+            self._start_readers(channel)
+        self._groups[channel].add(group)
+        await self.shards[shard].group_add(group, real)
+
+    async def group_discard(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        shard = self.shard_for_group(group)
+        layer_shard_ops.inc(shard, "group_discard")
+        real = self._real.get(channel, {}).get(shard, channel)
+        self._groups.get(channel, set()).discard(group)
+        await self.shards[shard].group_discard(group, real)
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), "message is not a dict"
+        self.require_valid_group_name(group)
+        shard = self.shard_for_group(group)
+        layer_shard_ops.inc(shard, "group_send")
+        await self.shards[shard].group_send(group, message)
+
+    async def flush(self):
+        for readers in self._readers.values():
+            for task in readers.values():
+                task.cancel()
+        self._reset()
+        for layer in self.shards.values():
+            await layer.flush()
+
+    async def close(self):
+        for readers in self._readers.values():
+            for task in readers.values():
+                task.cancel()
+        for layer in self.shards.values():
+            close = getattr(layer, "close", None)
+            if close is not None:
+                await close()
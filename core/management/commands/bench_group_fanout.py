@@ -0,0 +1,181 @@
+import asyncio
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.benchmarks import latency_summary, write_results
+from core.layers import GroupMultiplexChannelLayer, build_layer
+
+MODES = ("direct", "multiplex")
+
+
+# 내부 레이어 receive()가 돌려준 메시지 수를 셈. 채널 단위 전달 수라서 Redis 트래픽과는 다름.
+# (channels_redis 4.x는 같은 프로세스 채널을 묶어 받으므로 direct 모드에서도 Redis 메시지는 프로세스당 하나임)
+# Redis 부하는 --redis-url을 줬을 때 RedisCommandStats로 따로 잼.
+class ReceiveCounter:
+    def __init__(self, layer):
+        self.layer = layer
+        self.count = 0
+        self._receive = layer.receive
+        layer.receive = self.receive
+
+    async def receive(self, channel):
+        message = await self._receive(channel)
+        self.count += 1
+        return message
+
+
+# 내부 레이어에 나간 group_add 호출 수와, 그룹마다 서로 다른 멤버 수(Redis라면 그룹 zset 크기)의 합을 셈.
+class GroupAddCounter:
+    def __init__(self, layer):
+        self.calls = 0
+        self.members = set()
+        self._group_add = layer.group_add
+        layer.group_add = self.group_add
+
+    async def group_add(self, group, channel):
+        self.calls += 1
+        self.members.add((group, channel))
+        return await self._group_add(group, channel)
+
+
+# 측정 구간 동안 Redis 서버가 처리한 명령 수를 INFO commandstats 차이로 셈. (INFO 자체 호출은 뺌)
+# 같은 Redis를 쓰는 다른 클라이언트가 있으면 그 명령도 섞이므로 전용 인스턴스에서 돌려야 함.
+class RedisCommandStats:
+    def __init__(self, url):
+        import redis.asyncio
+
+        self.client = redis.asyncio.Redis.from_url(url)
+
+    async def snapshot(self):
+        stats = await self.client.info("commandstats")
+        return {
+            name.removeprefix("cmdstat_"): values["calls"]
+            for name, values in stats.items()
+            if name != "cmdstat_info"
+        }
+
+    @staticmethod
+    def diff(before, after):
+        calls = {name: count - before.get(name, 0) for name, count in after.items()}
+        return {name: count for name, count in sorted(calls.items()) if count}
+
+    async def close(self):
+        await self.client.aclose()
+
+
+# 워커 W개 x 그룹 G개 x 그룹당 소켓 M개를 한 프로세스에 띄우고 group_send 이벤트를 흘려
+# 소켓마다 채널을 쓰는 방식(direct)과 워커 단위 멀티플렉스(multiplex)의 전체 전달 완료 지연,
+# 내부 레이어 receive 수, 내부 레이어 그룹 가입 수를 비교하는 커맨드임.
+# 워커를 한 프로세스 안에서 흉내 내므로 프로세스 간 Redis 트래픽을 재현하지는 않음. --redis-url을 주면
+# channels_redis를 내부 레이어로 쓰고 Redis 명령 수를 함께 기록하지만, 워커 프로세스를 나눈 측정은 아님.
+# 예: python manage.py bench_group_fanout --workers 4 --groups 20 --members 50 --events 200
+class Command(BaseCommand):
+    help = "그룹 전송 팬아웃을 소켓 단위(direct)와 워커 단위(multiplex)로 비교합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4, help="워커(프로세스) 수 (W)")
+        parser.add_argument("--groups", type=int, default=20, help="그룹(파티) 수 (G)")
+        parser.add_argument("--members", type=int, default=20, help="그룹당 소켓 수 (M)")
+        parser.add_argument("--events", type=int, default=200, help="보낼 group_send 수")
+        parser.add_argument("--mode", choices=MODES + ("both",), default="both")
+        parser.add_argument("--redis-url", default=None, help="지정하면 channels_redis를 내부 레이어로 사용")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--timeout", type=float, default=10.0)
+        parser.add_argument("--output", default=None)
+
+    def handle(self, *args, **options):
+        self.options = options
+        modes = MODES if options["mode"] == "both" else (options["mode"],)
+        results = {mode: asyncio.run(self.run_mode(mode)) for mode in modes}
+        params = {key: options[key] for key in ("workers", "groups", "members", "events", "seed")}
+        params["inner"] = "redis" if options["redis_url"] else "inmemory"
+        self.stdout.write(write_results("group_fanout", params, results, options["output"]))
+
+    def inner_config(self):
+        if self.options["redis_url"]:
+            return {
+                "BACKEND": "channels_redis.core.RedisChannelLayer",
+                "CONFIG": {"hosts": [self.options["redis_url"]], "capacity": 10000},
+            }
+        return {"BACKEND": "channels.layers.InMemoryChannelLayer", "CONFIG": {"capacity": 10000}}
+
+    async def run_mode(self, mode):
+        options = self.options
+        rng = random.Random(options["seed"])
+        inner = build_layer(self.inner_config())
+        counter = ReceiveCounter(inner)
+        group_adds = GroupAddCounter(inner)
+        redis_stats = RedisCommandStats(options["redis_url"]) if options["redis_url"] else None
+        if redis_stats:
+            setup_before = await redis_stats.snapshot()
+        if mode == "multiplex":
+            workers = [GroupMultiplexChannelLayer(inner=inner, capacity=10000) for _ in range(options["workers"])]
+        else:
+            workers = [inner] * options["workers"]
+
+        pending = {}
+        latencies = []
+        receivers = []
+
+        async def receive_loop(layer, channel):
+            while True:
+                message = await layer.receive(channel)
+                state = pending.get(message["event"])
+                if state is None:
+                    continue
+                state["left"] -= 1
+                if state["left"] == 0:
+                    latencies.append(time.perf_counter() - state["sent_at"])
+                    state["done"].set()
+
+        for group_index in range(options["groups"]):
+            for member_index in range(options["members"]):
+                # 소켓을 워커에 고르게 흩뿌림. 그룹 하나의 멤버가 여러 워커에 나뉘는 실제 상황을 흉내 냄.
+                layer = workers[(group_index + member_index) % len(workers)]
+                channel = await layer.new_channel()
+                await layer.group_add(f"bench_{group_index}", channel)
+                receivers.append(asyncio.create_task(receive_loop(layer, channel)))
+
+        await asyncio.sleep(0)
+        if redis_stats:
+            send_before = await redis_stats.snapshot()
+        baseline = counter.count
+        started = time.perf_counter()
+        for event_id in range(options["events"]):
+            group_index = rng.randrange(options["groups"])
+            state = pending[event_id] = {"left": options["members"], "sent_at": time.perf_counter(), "done": asyncio.Event()}
+            await workers[0].group_send(f"bench_{group_index}", {"type": "bench.event", "event": event_id})
+            await asyncio.wait_for(state["done"].wait(), options["timeout"])
+            del pending[event_id]
+        elapsed = time.perf_counter() - started
+        inner_receives = counter.count - baseline
+        if redis_stats:
+            send_after = await redis_stats.snapshot()
+
+        for task in receivers:
+            task.cancel()
+        await asyncio.gather(*receivers, return_exceptions=True)
+        for layer in {id(layer): layer for layer in workers}.values():
+            await layer.flush()
+
+        result = {
+            "events": options["events"],
+            "deliveries": options["events"] * options["members"],
+            "inner_group_add_calls": group_adds.calls,
+            "inner_group_members": len(group_adds.members),
+            "inner_receives": inner_receives,
+            "inner_receives_per_event": round(inner_receives / options["events"], 2),
+            "events_per_s": round(options["events"] / elapsed, 1) if elapsed else None,
+            "fanout_latency_ms": latency_summary(latencies),
+        }
+        if redis_stats:
+            # 수신 대기(BZPOPMIN 등)도 포함된 서버 기준 명령 수임.
+            setup_commands = RedisCommandStats.diff(setup_before, send_before)
+            send_commands = RedisCommandStats.diff(send_before, send_after)
+            result["redis_setup_commands"] = sum(setup_commands.values())
+            result["redis_commands"] = send_commands
+            result["redis_commands_per_event"] = round(sum(send_commands.values()) / options["events"], 2)
+            await redis_stats.close()
+        return result
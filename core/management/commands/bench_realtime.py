@@ -0,0 +1,239 @@
+import asyncio
+import random
+import time
+
+from allauth.account.models import EmailAddress
+from asgiref.sync import sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+
+from accounts.models import Game, User
+from chat.routing import websocket_urlpatterns
+from core.benchmarks import QueryCounter, latency_summary, write_results
+from parties.models import Party, PartyMember
+
+BENCH_CHANNEL_LAYERS = {
+    "default": {
+        "BACKEND": "channels.layers.InMemoryChannelLayer",
+        "CONFIG": {"capacity": 1000},
+    }
+}
+
+
+# 파티 P개 x 멤버 M명을 WebsocketCommunicator로 접속시켜 채팅/입장/퇴장/강퇴 트래픽을 흘리고
+# 처리량, 전달 지연(p50/p95/p99), 이벤트당 쿼리 수를 JSON으로 남기는 벤치마크 커맨드임.
+# 별도 테스트 DB를 만들어 쓰므로 운영 데이터에는 영향을 주지 않음.
+# 예: DJANGO_SETTINGS_MODULE=websocket_project.settings_bench python manage.py bench_realtime --parties 20 --members 5
+class Command(BaseCommand):
+    help = "ChatConsumer와 파티 뷰를 대상으로 실시간 전달 지연/처리량/쿼리 수를 측정합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--parties", type=int, default=10, help="동시에 열린 파티 수 (P)")
+        parser.add_argument("--members", type=int, default=5, help="파티당 접속 멤버 수 (M)")
+        parser.add_argument("--rounds", type=int, default=20, help="채팅 라운드 수 (라운드마다 파티별 1메시지)")
+        parser.add_argument("--churn", type=int, default=2, help="파티별 입장/강퇴/퇴장 반복 횟수")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--timeout", type=float, default=10.0, help="이벤트 수신 대기 시간(초)")
+        parser.add_argument("--output", default=None, help="결과 JSON 저장 경로")
+
+    def handle(self, *args, **options):
+        params = {key: options[key] for key in ("parties", "members", "rounds", "churn", "seed")}
+        self.timeout = options["timeout"]
+        self.rng = random.Random(options["seed"])
+
+        setup_test_environment()
+        # replica alias가 있으면 테스트 DB의 미러로 맞춰, replica 라우팅 읽기도 같은 테스트 DB를 보게 함.
+        old_config = setup_databases(verbosity=0, interactive=False, serialized_aliases=set())
+        try:
+            with override_settings(CHANNEL_LAYERS=BENCH_CHANNEL_LAYERS):
+                fixtures = self.build_fixtures(options["parties"], options["members"], options["churn"])
+                results = asyncio.run(self.run_benchmark(fixtures, options["rounds"]))
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        self.stdout.write(write_results("realtime", params, results, options["output"]))
+
+    # ------------------------------------------------------------------ fixtures
+
+    def build_fixtures(self, party_count, member_count, churn):
+        game = Game.objects.create(code="bench", name="Bench")
+        extras_per_party = churn * 2
+        total_users = party_count * (member_count + extras_per_party)
+
+        User.objects.bulk_create(
+            [
+                User(
+                    username=f"bench{i}",
+                    nickname=f"b{i}",
+                    phone=f"{i:011d}",
+                    birth_year=2000,
+                    gender=User.Gender.PRIVATE,
+                    password="!",
+                )
+                for i in range(total_users)
+            ]
+        )
+        users = list(User.objects.order_by("id"))
+        EmailAddress.objects.bulk_create(
+            [EmailAddress(user=user, email=f"{user.username}@bench.local", verified=True, primary=True) for user in users]
+        )
+
+        fixtures = []
+        cursor = 0
+        for index in range(party_count):
+            members = users[cursor:cursor + member_count]
+            cursor += member_count
+            extras = users[cursor:cursor + extras_per_party]
+            cursor += extras_per_party
+
+            host = members[0]
+            party = Party.objects.create(host=host, game=game, mode=f"bench-{index}", max_members=member_count + 1)
+            for member in members:
+                PartyMember.objects.create(party=party, user=member, is_active=True)
+
+            fixtures.append(
+                {
+                    "party_id": party.id,
+                    "members": members,
+                    "host_client": self.client_for(host),
+                    "extras": [(extra, self.client_for(extra)) for extra in extras],
+                }
+            )
+        return fixtures
+
+    def client_for(self, user):
+        client = Client()
+        client.force_login(user)
+        return client
+
+    # ------------------------------------------------------------------ scenario
+
+    async def run_benchmark(self, fixtures, rounds):
+        counter = QueryCounter()
+        application = URLRouter(websocket_urlpatterns)
+        results = {}
+
+        with counter.installed():
+            connect_latencies = []
+            queries_before = counter.count
+            for fixture in fixtures:
+                fixture["sockets"] = []
+                for user in fixture["members"]:
+                    communicator = WebsocketCommunicator(application, f"/ws/chat/{fixture['party_id']}/")
+                    communicator.scope["user"] = user
+                    started = time.perf_counter()
+                    connected, _ = await communicator.connect(timeout=self.timeout)
+                    if not connected:
+                        raise RuntimeError(f"socket connect failed for party {fixture['party_id']}")
+                    # 접속 직후 스냅샷(member_list_update, count_update)까지 받아야 접속 완료로 봄.
+                    await self.wait_for(communicator, lambda data: data.get("type") == "count_update")
+                    connect_latencies.append(time.perf_counter() - started)
+                    fixture["sockets"].append(communicator)
+            results["connect"] = self.summarize(connect_latencies, len(connect_latencies), counter.count - queries_before, None)
+
+            results["chat"] = await self.run_chat(fixtures, rounds, counter)
+            results.update(await self.run_churn(fixtures, counter))
+
+        for fixture in fixtures:
+            for communicator in fixture["sockets"]:
+                await communicator.disconnect()
+        return results
+
+    async def run_chat(self, fixtures, rounds, counter):
+        latencies = []
+        events = 0
+        queries_before = counter.count
+        started = time.perf_counter()
+
+        for round_no in range(rounds):
+            batch = await asyncio.gather(
+                *[self.chat_event(fixture, f"bench-{fixture['party_id']}-{round_no}") for fixture in fixtures]
+            )
+            for event_latencies in batch:
+                latencies.extend(event_latencies)
+                events += 1
+
+        elapsed = time.perf_counter() - started
+        return self.summarize(latencies, events, counter.count - queries_before, elapsed)
+
+    async def chat_event(self, fixture, text):
+        sender = self.rng.choice(fixture["sockets"])
+        started = time.perf_counter()
+        await sender.send_json_to({"message": text})
+        return await asyncio.gather(
+            *[
+                self.wait_for(
+                    communicator,
+                    lambda data: data.get("type") == "chat_message" and data.get("message") == text,
+                    started,
+                )
+                for communicator in fixture["sockets"]
+            ]
+        )
+
+    async def run_churn(self, fixtures, counter):
+        latencies = {"join": [], "leave": [], "kick": []}
+        request_times = {"join": [], "leave": [], "kick": []}
+        queries = {"join": 0, "leave": 0, "kick": 0}
+
+        async def view_event(kind, fixture, client, path):
+            before = counter.count
+            started = time.perf_counter()
+            response = await sync_to_async(client.post)(path)
+            request_times[kind].append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                raise RuntimeError(f"{kind} {path} -> {response.status_code}")
+            delivered = await asyncio.gather(
+                *[
+                    self.wait_for(communicator, lambda data: data.get("type") == "member_list_update", started)
+                    for communicator in fixture["sockets"]
+                ]
+            )
+            latencies[kind].extend(delivered)
+            queries[kind] += counter.count - before
+
+        for fixture in fixtures:
+            party_id = fixture["party_id"]
+            extras = list(fixture["extras"])
+            while len(extras) >= 2:
+                (kicked_user, kicked_client), (leaving_user, leaving_client) = extras.pop(0), extras.pop(0)
+
+                await view_event("join", fixture, kicked_client, f"/parties/{party_id}/join/")
+                await view_event("kick", fixture, fixture["host_client"], f"/parties/{party_id}/members/{kicked_user.id}/kick/")
+                await view_event("join", fixture, leaving_client, f"/parties/{party_id}/join/")
+                await view_event("leave", fixture, leaving_client, f"/parties/{party_id}/leave/")
+
+        results = {}
+        for kind in latencies:
+            events = len(request_times[kind])
+            summary = self.summarize(latencies[kind], events, queries[kind], sum(request_times[kind]))
+            summary["request_latency_ms"] = latency_summary(request_times[kind])
+            results[kind] = summary
+        return results
+
+    # ------------------------------------------------------------------ helpers
+
+    async def wait_for(self, communicator, predicate, started=None):
+        # 관심 없는 이벤트(count_update, system_message 등)는 건너뛰고 조건에 맞는 첫 메시지를 기다림.
+        while True:
+            data = await communicator.receive_json_from(timeout=self.timeout)
+            if predicate(data):
+                return time.perf_counter() - started if started is not None else None
+
+    def summarize(self, latencies, events, queries, elapsed):
+        summary = {
+            "events": events,
+            "deliveries": len(latencies),
+            "latency_ms": latency_summary(latencies),
+            "queries_total": queries,
+            "queries_per_event": round(queries / events, 2) if events else None,
+        }
+        if elapsed:
+            summary["elapsed_s"] = round(elapsed, 3)
+            summary["events_per_s"] = round(events / elapsed, 2)
+            summary["deliveries_per_s"] = round(len(latencies) / elapsed, 2)
+        return summary
@@ -0,0 +1,47 @@
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# TRACE_DIR의 JSONL에서 trace id 하나에 속한 스팬을 모아 부모-자식 트리로 출력하는 커맨드임.
+# 예: python manage.py show_trace 3f2a... --date 2026-10-19
+class Command(BaseCommand):
+    help = "기록된 트레이스 하나를 스팬 트리로 출력합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("trace_id")
+        parser.add_argument("--date", default=None, help="YYYY-MM-DD (기본: 모든 파일 검색)")
+
+    def handle(self, *args, **options):
+        pattern = f"spans-{options['date']}.jsonl" if options["date"] else "spans-*.jsonl"
+        spans = []
+        for path in sorted(settings.TRACE_DIR.glob(pattern)):
+            with path.open(encoding="utf-8") as fh:
+                for line in fh:
+                    if options["trace_id"] in line:
+                        record = json.loads(line)
+                        if record["trace_id"] == options["trace_id"]:
+                            spans.append(record)
+        if not spans:
+            raise CommandError(f"trace {options['trace_id']} not found in {settings.TRACE_DIR}")
+
+        children = defaultdict(list)
+        ids = {record["span_id"] for record in spans}
+        for record in sorted(spans, key=lambda item: item["start"]):
+            parent = record["parent_id"] if record["parent_id"] in ids else None
+            children[parent].append(record)
+
+        origin = min(record["start"] for record in spans)
+        self._print(children, None, 0, origin)
+
+    def _print(self, children, parent_id, depth, origin):
+        for record in children.get(parent_id, []):
+            offset = (record["start"] - origin) * 1000.0
+            attrs = " ".join(f"{key}={value}" for key, value in record["attrs"].items())
+            error = f" ERROR {record['error']}" if record["error"] else ""
+            self.stdout.write(
+                f"{'  ' * depth}{record['name']} +{offset:.1f}ms {record['duration_ms']}ms {attrs}{error}".rstrip()
+            )
+            self._print(children, record["span_id"], depth + 1, origin)
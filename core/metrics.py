@@ -0,0 +1,289 @@
+import bisect
+import threading
+import time
+
+# 프로세스 단위 인메모리 메트릭 레지스트리임.
+# 값 갱신은 락 한 번 + 딕셔너리 조회 수준이라 운영에서도 켜 둘 수 있고,
+# /internal/metrics/ 요청 시점에만 Prometheus 텍스트 포맷으로 직렬화함.
+# 워커 프로세스마다 레지스트리가 따로 있으므로 Prometheus에서 워커별로 수집해야 함.
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+DEPTH_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name}: expected labels {self.labelnames}, got {labels}")
+        return tuple(str(value) for value in labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.extend(self._render_sample(labels, value))
+        return lines
+
+    def _render_sample(self, labels, value):
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, *labels, value):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, *labels, amount=1):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set_max(self, *labels, value):
+        key = self._key(labels)
+        with self._lock:
+            if value > self._values.get(key, 0):
+                self._values[key] = value
+
+    def value(self, *labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, *labels, value):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # 버킷별 개수(누적 아님), 합계, 전체 개수
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def time(self, *labels):
+        return _Timer(self, labels)
+
+    def count(self, *labels):
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def render(self):
+        with self._lock:
+            items = sorted((labels, [list(state[0]), state[1], state[2]]) for labels, state in self._values.items())
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = _format_labels(self.labelnames, labels, f'le="{_format_value(float(bound))}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            le = _format_labels(self.labelnames, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {count}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {count}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(*self.labels, value=time.perf_counter() - self.started)
+        return False
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+        return metric
+
+    # 스크레이프 시점에 값을 채우는 콜백을 등록함. (풀 상태처럼 매번 갱신할 필요가 없는 값)
+    def register_collector(self, collector):
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+
+    def counter(self, name, help_text, labelnames=()):
+        return self.register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self.register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self):
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = [self._metrics[name] for name in sorted(self._metrics)]
+        for collector in collectors:
+            collector()
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+ws_connections = registry.gauge(
+    "liveparty_ws_connections", "현재 열린 WebSocket 연결 수", ("consumer",)
+)
+ws_messages_in = registry.counter(
+    "liveparty_ws_messages_in_total", "클라이언트에서 받은 WebSocket 메시지 수", ("consumer", "type")
+)
+ws_messages_out = registry.counter(
+    "liveparty_ws_messages_out_total", "채널 레이어에서 받아 클라이언트로 내려보낸 이벤트 수", ("consumer", "type")
+)
+ws_outbound_queue_depth = registry.histogram(
+    "liveparty_ws_outbound_queue_depth",
+    "이벤트 처리 시점에 소켓 채널에 남아 있던 대기 메시지 수",
+    ("consumer",),
+    buckets=DEPTH_BUCKETS,
+)
+ws_outbound_queue_depth_max = registry.gauge(
+    "liveparty_ws_outbound_queue_depth_max", "최근 스크레이프 이후 관측된 소켓별 대기 메시지 최대값", ("consumer",)
+)
+ws_outbound_frames = registry.counter(
+    "liveparty_ws_outbound_frames_total",
+    "소켓 송신 대기열 정책으로 덮어쓰거나(coalesced) 버린(dropped) 프레임, 밀려서 끊은 연결(laggard) 수",
+    ("consumer", "result"),
+)
+group_send_seconds = registry.histogram(
+    "liveparty_group_send_seconds", "channel_layer.group_send 소요 시간", ("group", "type")
+)
+layer_envelopes = registry.counter(
+    "liveparty_layer_envelopes_total", "멀티플렉스 채널 레이어가 내부 레이어와 주고받은 메시지 수", ("direction", "kind")
+)
+layer_local_deliveries = registry.counter(
+    "liveparty_layer_local_deliveries_total", "멀티플렉스 채널 레이어가 워커 안의 소켓에 나눠 준 메시지 수", ("result",)
+)
+layer_shard_ops = registry.counter(
+    "liveparty_layer_shard_ops_total", "샤드 채널 레이어가 샤드별로 보낸 요청 수", ("shard", "op")
+)
+db_sync_wait_seconds = registry.histogram(
+    "liveparty_db_sync_wait_seconds", "database_sync_to_async 호출이 실행 스레드를 기다린 시간", ("function",)
+)
+db_sync_run_seconds = registry.histogram(
+    "liveparty_db_sync_run_seconds", "database_sync_to_async 함수 실행 시간", ("function",)
+)
+http_request_seconds = registry.histogram(
+    "liveparty_http_request_seconds", "뷰별 HTTP 요청 처리 시간", ("view", "method")
+)
+http_request_queries = registry.histogram(
+    "liveparty_http_request_queries", "뷰별 요청당 DB 쿼리 수", ("view", "method"), buckets=QUERY_BUCKETS
+)
+db_pool_connections = registry.gauge(
+    "liveparty_db_pool_connections", "DB 연결 풀 상태별 연결 수", ("alias", "state")
+)
+db_pool_events = registry.gauge(
+    "liveparty_db_pool_events", "DB 연결 풀 누적 이벤트 수", ("alias", "event")
+)
+
+
+# 그룹 이름의 숫자 id를 떼어 라벨 카디널리티를 파티 수와 무관하게 유지함. (chat_12 -> chat)
+def group_kind(group):
+    prefix, _, suffix = group.rpartition("_")
+    return prefix if prefix and suffix.isdigit() else group
+
+
+def observe_queue_depth(consumer, depth):
+    ws_outbound_queue_depth.observe(consumer, value=depth)
+    ws_outbound_queue_depth_max.set_max(consumer, value=depth)
+
+
+def _collect_pool_stats():
+    from websocket_project.db_backends.pool import pool_stats
+
+    for stats in pool_stats():
+        alias = stats["name"]
+        for state in ("size", "idle", "in_use"):
+            db_pool_connections.set(alias, state, value=stats[state])
+        for event in ("created", "closed", "checkouts", "waits", "timeouts", "health_check_failures", "evicted_idle"):
+            db_pool_events.set(alias, event, value=stats[event])
+
+
+registry.register_collector(_collect_pool_stats)
+
+
+def render_latest():
+    text = registry.render()
+    # 최대값 게이지는 스크레이프 간격 단위로 다시 잼.
+    ws_outbound_queue_depth_max.clear()
+    return text
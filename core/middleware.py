@@ -0,0 +1,106 @@
+import time
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.metrics import http_request_queries, http_request_seconds
+from core.profiling import MODES, profile_block
+from core.tracing import start_trace
+from websocket_project.db_router import pin_primary, replica_alias
+
+WRITE_PREFIXES = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+# 요청 중 primary에 쓰기 쿼리가 실행되면 해당 사용자의 읽기를 잠시 primary로 고정하는 미들웨어임.
+# GET으로 처리되는 이메일 인증처럼 메서드만으로 알 수 없는 쓰기도 잡기 위해 실제 SQL을 확인함.
+class PrimaryPinMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not replica_alias():
+            return self.get_response(request)
+
+        wrote = []
+
+        def detect_write(execute, sql, params, many, context):
+            if not wrote and sql.lstrip()[:7].upper().startswith(WRITE_PREFIXES):
+                wrote.append(True)
+            return execute(sql, params, many, context)
+
+        with connections[DEFAULT_DB_ALIAS].execute_wrapper(detect_write):
+            response = self.get_response(request)
+
+        user = getattr(request, "user", None)
+        if wrote and user is not None and user.is_authenticated:
+            pin_primary(user.id)
+        return response
+
+
+# 뷰별 처리 시간과 요청당 쿼리 수를 메트릭으로 기록하는 미들웨어임.
+# 라벨은 URL name(view_name)을 써서 경로 파라미터 수와 관계없이 카디널리티를 고정함.
+class RequestMetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = [0]
+
+        def count_query(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        with connections[DEFAULT_DB_ALIAS].execute_wrapper(count_query):
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = getattr(request, "resolver_match", None)
+        # 이름 없는 URL은 경로 패턴(route)으로 묶음. 둘 다 파라미터 값이 들어가지 않아 카디널리티가 고정됨.
+        view = (match.view_name or match.route or "unnamed") if match else "unresolved"
+        http_request_seconds.observe(view, request.method, value=elapsed)
+        http_request_queries.observe(view, request.method, value=queries[0])
+        return response
+
+
+# HTTP 요청을 트레이스 루트로 만드는 미들웨어임. TRACE_SAMPLE_RATE 확률로 샘플링하며,
+# 스태프가 X-Trace-Id 헤더를 보내면 샘플링과 무관하게 그 id로 기록해 특정 요청을 추적할 수 있음.
+class TracingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        trace_id = None
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated and user.is_staff:
+            trace_id = (request.headers.get("X-Trace-Id") or "")[:64] or None
+
+        with start_trace("http", trace_id=trace_id, method=request.method, path=request.path) as root:
+            response = self.get_response(request)
+            if root is not None:
+                match = getattr(request, "resolver_match", None)
+                root.set(view=match.view_name if match else None, status=response.status_code)
+                response["X-Trace-Id"] = root.trace_id
+        return response
+
+
+# 스태프가 X-Profile 헤더나 ?_profile= 쿼리를 붙이면 그 요청 하나(템플릿 렌더링 포함)를 프로파일링함.
+# 값이 sample이면 스택 샘플링, 그 외에는 cProfile로 측정하고 결과 파일 이름을 X-Profile-File로 알려줌.
+# 다른 요청이 cProfile을 쓰는 중이면 측정하지 않고 X-Profile-Busy를 붙임.
+class ProfilerMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = request.headers.get("X-Profile") or request.GET.get("_profile")
+        user = getattr(request, "user", None)
+        if not mode or user is None or not user.is_authenticated or not user.is_staff:
+            return self.get_response(request)
+
+        mode = mode if mode in MODES else "cprofile"
+        with profile_block(f"{request.method}-{request.path}", mode) as result:
+            response = self.get_response(request)
+        if result["busy"]:
+            response["X-Profile-Busy"] = "1"
+        else:
+            response["X-Profile-File"] = result["path"].name
+        return response
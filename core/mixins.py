@@ -0,0 +1,17 @@
+from websocket_project.db_router import replica_reads
+
+
+# 안전한(GET/HEAD) 요청의 읽기 쿼리를 replica로 보내는 믹스인임.
+# dispatch 전체를 감싸므로 다른 접근 제어 믹스인보다 앞에 두어야 함.
+class ReplicaReadMixin:
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return super().dispatch(request, *args, **kwargs)
+
+        user_id = request.user.id if request.user.is_authenticated else None
+        with replica_reads(user_id):
+            response = super().dispatch(request, *args, **kwargs)
+            # TemplateResponse는 dispatch 밖에서 렌더링되므로 템플릿의 지연 쿼리도 블록 안에서 처리함.
+            if hasattr(response, "render") and not getattr(response, "is_rendered", True):
+                response.render()
+        return response
@@ -0,0 +1,221 @@
+import cProfile
+import io
+import json
+import logging
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# 스태프가 요청한 경우에만 켜지는 프로파일러임.
+# - cprofile: 요청 하나를 cProfile로 측정해 .prof(pstats)로 저장
+# - sample: 일정 간격으로 스레드 스택을 떠서 flamegraph용 collapsed stack(.folded)으로 저장
+# 결과 파일은 PROFILE_DIR에 쌓이고 /internal/profiles/에서 목록/요약을 볼 수 있음.
+
+MODES = ("cprofile", "sample")
+_SAFE_LABEL = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def profile_dir():
+    return Path(settings.PROFILE_DIR)
+
+
+def _profile_path(label, suffix):
+    safe = _SAFE_LABEL.sub("_", label).strip("_")[:60] or "profile"
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / f"{timezone.now():%Y%m%d-%H%M%S-%f}-{safe}{suffix}"
+
+
+def _fold(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{Path(code.co_filename).name}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+# sys._current_frames()로 대상 스레드 스택을 주기적으로 샘플링하는 프로파일러임.
+# thread_ids가 None이면 샘플러 자신을 뺀 모든 스레드를 수집함.
+class StackSampler:
+    def __init__(self, interval=None, thread_ids=None):
+        self.interval = interval or settings.PROFILE_SAMPLE_INTERVAL
+        self.thread_ids = thread_ids
+        self.samples = Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            if len(names) != threading.active_count():
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (self.thread_ids is not None and ident not in self.thread_ids):
+                    continue
+                self.samples[f"{names.get(ident, ident)};{_fold(frame)}"] += 1
+            self.sample_count += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def write(self, label):
+        path = _profile_path(label, ".folded")
+        with path.open("w", encoding="utf-8") as fh:
+            for stack, count in self.samples.most_common():
+                fh.write(f"{stack} {count}\n")
+        return path
+
+
+# cProfile은 프로세스에 하나만 켤 수 있고(3.12부터는 동시에 켜면 ValueError), 스레드 워커에서
+# 두 요청이 겹치면 서로의 측정을 망가뜨리므로 프로세스 전체에서 한 번에 하나만 실행함.
+_cprofile_lock = threading.Lock()
+
+
+# 블록 하나를 프로파일링하고 result["path"]에 결과 파일을 채움.
+# 다른 스레드가 이미 cProfile을 쓰는 중이면 기다리지 않고 측정 없이 실행하며 result["busy"]를 True로 둠.
+@contextmanager
+def profile_block(label, mode="cprofile"):
+    result = {"path": None, "busy": False}
+    if mode == "sample":
+        sampler = StackSampler(thread_ids={threading.get_ident()}).start()
+        try:
+            yield result
+        finally:
+            sampler.stop()
+            result["path"] = sampler.write(label)
+        return
+
+    if not _cprofile_lock.acquire(blocking=False):
+        result["busy"] = True
+        yield result
+        return
+
+    try:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield result
+        finally:
+            profiler.disable()
+            path = _profile_path(label, ".prof")
+            profiler.dump_stats(str(path))
+            result["path"] = path
+    finally:
+        _cprofile_lock.release()
+
+
+_window_lock = threading.Lock()
+_window_active = False
+
+
+# 소켓 명령으로 시작하는 프로세스 단위 샘플링 구간임. 이벤트 루프와 DB 실행 스레드를 모두 담기 위해
+# 전체 스레드를 샘플링하며, 한 프로세스에서 동시에 하나만 실행됨.
+def start_sampling_window(label, seconds):
+    global _window_active
+    seconds = max(1, min(int(seconds), settings.PROFILE_WINDOW_MAX_SECONDS))
+    with _window_lock:
+        if _window_active:
+            return None
+        _window_active = True
+
+    def run():
+        global _window_active
+        sampler = StackSampler().start()
+        try:
+            time.sleep(seconds)
+        finally:
+            sampler.stop()
+            try:
+                path = sampler.write(label)
+                logger.info("profile window written: %s (%s samples)", path, sampler.sample_count)
+            finally:
+                with _window_lock:
+                    _window_active = False
+
+    threading.Thread(target=run, name="profile-window", daemon=True).start()
+    return seconds
+
+
+def list_profiles(limit=200):
+    directory = profile_dir()
+    if not directory.exists():
+        return []
+    entries = []
+    for path in directory.iterdir():
+        if path.suffix not in (".prof", ".folded"):
+            continue
+        stat = path.stat()
+        entries.append(
+            {
+                "name": path.name,
+                "kind": "cprofile" if path.suffix == ".prof" else "sample",
+                "size": stat.st_size,
+                "modified": datetime.fromtimestamp(stat.st_mtime, tz=timezone.get_current_timezone()),
+            }
+        )
+    entries.sort(key=lambda entry: entry["modified"], reverse=True)
+    return entries[:limit]
+
+
+def resolve_profile(name):
+    path = (profile_dir() / name).resolve()
+    if path.parent != profile_dir().resolve() or path.suffix not in (".prof", ".folded") or not path.exists():
+        return None
+    return path
+
+
+# 목록 페이지에서 보여줄 요약임. .prof는 누적 시간 상위 함수, .folded는 샘플이 많은 스택 말단 함수.
+def summarize_profile(path, limit=30):
+    if path.suffix == ".prof":
+        out = io.StringIO()
+        stats = pstats.Stats(str(path), stream=out)
+        stats.sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+    leaves = Counter()
+    total = 0
+    with path.open(encoding="utf-8") as fh:
+        for line in fh:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            leaves[stack.rsplit(";", 1)[-1]] += int(count)
+            total += int(count)
+    lines = [f"{total} samples"]
+    for leaf, count in leaves.most_common(limit):
+        lines.append(f"{count:>8} {count * 100.0 / total:6.2f}%  {leaf}")
+    return "\n".join(lines)
+
+
+# 소켓 명령 {"command": "profile", "seconds": N}을 처리하는 컨슈머 믹스인임. 스태프만 사용할 수 있음.
+class ProfilerConsumerMixin:
+    async def handle_profile_command(self, data):
+        user = self.scope.get("user")
+        if not (user and user.is_authenticated and user.is_staff):
+            return
+        try:
+            seconds = int(data.get("seconds") or 10)
+        except (TypeError, ValueError):
+            seconds = 10
+        seconds = start_sampling_window(f"ws-{type(self).__name__}", seconds)
+        payload = {"type": "profile_started", "seconds": seconds} if seconds else {"type": "profile_busy"}
+        await self.send(text_data=json.dumps(payload))
@@ -0,0 +1,312 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from asgiref.sync import async_to_sync
+from channels.db import DatabaseSyncToAsync
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+from core.metrics import (
+    db_sync_run_seconds,
+    db_sync_wait_seconds,
+    group_kind,
+    group_send_seconds,
+    observe_queue_depth,
+    ws_connections,
+    ws_messages_in,
+    ws_messages_out,
+    ws_outbound_frames,
+)
+from core.tracing import TRACE_KEY, extract, inject, span, start_trace
+
+logger = logging.getLogger(__name__)
+
+# 뷰/시그널/컨슈머가 공통으로 쓰는 실시간 전송 헬퍼임.
+# 채널 레이어 호출과 DB 스레드 전환을 한 곳에서 감싸 계측함.
+
+# 밀린 소켓을 끊을 때 쓰는 close 코드임. 클라이언트는 이 코드를 받으면 상태를 새로 불러옴.
+RESYNC_CLOSE_CODE = 4008
+# 클라이언트가 받은 프레임 수를 알려 주는 텍스트 프레임 접두사임. (OutboundQueueConsumerMixin)
+ACK_PREFIX = "ack:"
+
+_submitted_at = ContextVar("db_sync_submitted_at", default=None)
+
+
+async def group_send(group, message, channel_layer=None):
+    channel_layer = channel_layer or get_channel_layer()
+    started = time.perf_counter()
+    try:
+        with span("group_send", group=group, type=message.get("type", "")):
+            await channel_layer.group_send(group, inject(message))
+    finally:
+        group_send_seconds.observe(group_kind(group), message.get("type", ""), value=time.perf_counter() - started)
+
+
+# 동기 코드(뷰, on_commit 콜백)에서 쓰는 버전임.
+def group_send_sync(group, message, channel_layer=None):
+    async_to_sync(group_send)(group, message, channel_layer)
+
+
+def _measured(func):
+    name = getattr(func, "__name__", "unknown")
+
+    def run(*args, **kwargs):
+        started = time.perf_counter()
+        submitted = _submitted_at.get()
+        if submitted is not None:
+            db_sync_wait_seconds.observe(name, value=started - submitted)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            db_sync_run_seconds.observe(name, value=time.perf_counter() - started)
+
+    run.__name__ = name
+    run.__qualname__ = getattr(func, "__qualname__", name)
+    run.__doc__ = func.__doc__
+    return run
+
+
+# channels.db.database_sync_to_async와 같게 동작하면서,
+# 호출 시점부터 실행 스레드에서 함수가 시작될 때까지의 대기 시간과 실행 시간을 기록함.
+# 제출 시각은 ContextVar로 넘기며, SyncToAsync가 호출 시점 컨텍스트를 복사해 실행 스레드로 전달함.
+class InstrumentedDatabaseSyncToAsync(DatabaseSyncToAsync):
+    def __init__(self, func, *args, **kwargs):
+        super().__init__(_measured(func), *args, **kwargs)
+
+    async def __call__(self, *args, **kwargs):
+        token = _submitted_at.set(time.perf_counter())
+        try:
+            return await super().__call__(*args, **kwargs)
+        finally:
+            _submitted_at.reset(token)
+
+
+database_sync_to_async = InstrumentedDatabaseSyncToAsync
+
+
+# 채널 레이어가 소켓 채널별로 들고 있는 미처리 메시지 수임.
+# InMemoryChannelLayer(channels)와 channels_redis(receive_buffer)는 채널별 asyncio.Queue를 갖고 있음.
+def pending_messages(channel_layer, channel_name):
+    for attr in ("channels", "receive_buffer"):
+        queues = getattr(channel_layer, attr, None)
+        if isinstance(queues, dict):
+            queue = queues.get(channel_name)
+            if queue is not None and hasattr(queue, "qsize"):
+                return queue.qsize()
+    return None
+
+
+# AsyncWebsocketConsumer 앞에 섞어 연결 수, 수신/발신 메시지 수, 소켓 대기열 길이를 기록하는 믹스인임.
+class MetricsConsumerMixin:
+    metrics_name = None
+
+    def _metrics_label(self):
+        return self.metrics_name or type(self).__name__
+
+    async def websocket_connect(self, message):
+        ws_connections.inc(self._metrics_label())
+        self._metrics_connected = True
+        await super().websocket_connect(message)
+
+    async def websocket_disconnect(self, message):
+        if getattr(self, "_metrics_connected", False):
+            self._metrics_connected = False
+            ws_connections.dec(self._metrics_label())
+        await super().websocket_disconnect(message)
+
+    async def dispatch(self, message):
+        event_type = message.get("type", "")
+        if event_type == "websocket.receive":
+            ws_messages_in.inc(self._metrics_label(), "bytes" if message.get("bytes") is not None else "text")
+        elif not event_type.startswith("websocket."):
+            label = self._metrics_label()
+            ws_messages_out.inc(label, event_type)
+            depth = pending_messages(self.channel_layer, self.channel_name)
+            if depth is not None:
+                observe_queue_depth(label, depth)
+        await super().dispatch(message)
+
+
+# 소켓 프레임 수신을 트레이스 루트로 만들고, 채널 레이어로 전달된 trace id를 이어받아
+# 수신 소켓의 핸들러(클라이언트로의 send)까지 같은 트레이스로 기록하는 믹스인임.
+class TracedConsumerMixin:
+    async def dispatch(self, message):
+        event_type = message.get("type", "")
+        if event_type == "websocket.receive" and not (message.get("text") or "").startswith(ACK_PREFIX):
+            with start_trace("ws.receive", consumer=type(self).__name__, path=self.scope.get("path")):
+                await super().dispatch(message)
+        elif TRACE_KEY in message:
+            message, context = extract(message)
+            with start_trace(
+                "ws.deliver",
+                trace_id=context["trace_id"],
+                parent_id=context["parent_id"],
+                consumer=type(self).__name__,
+                event=event_type,
+            ):
+                await super().dispatch(message)
+        else:
+            await super().dispatch(message)
+
+
+class _OutboundFrame:
+    __slots__ = ("message", "key", "capped", "queued_at")
+
+    def __init__(self, message, key, capped):
+        self.message = message
+        self.key = key
+        self.capped = capped
+        self.queued_at = time.monotonic()
+
+
+# 소켓별 송신 대기열 정책을 적용하는 믹스인임. 모든 ASGI send를 대기열에 넣고 별도 태스크가 순서대로 내보냄.
+# - coalesce_events: 최신 스냅샷이면 충분한 이벤트. 아직 나가지 않은 같은 키의 프레임을 새 내용으로 덮어씀
+# - capped_events: 채팅처럼 쌓이는 이벤트. WS_OUTBOUND_CHAT_CAP개를 넘으면 오래된 것부터 버림
+# - 그 외(accept/close, 강퇴/결과 통지 등)는 버리지 않음
+# 대기열이 WS_OUTBOUND_MAX_FRAMES를 넘거나 한 프레임이 WS_OUTBOUND_MAX_LAG_SECONDS 넘게 나가지 못하면
+# 대기열을 비우고 RESYNC_CLOSE_CODE로 연결을 끊어, 반쯤 죽은 모바일 소켓이 워커 메모리를 붙잡지 못하게 함.
+# Daphne의 send는 소켓이 비워질 때까지 기다리지 않고 Twisted 송신 버퍼에 쌓기만 하므로, send가 막히는지로는
+# 밀림을 알 수 없음. 그래서 클라이언트가 받은 프레임 수를 "ack:<n>" 텍스트 프레임으로 알려 주면
+# 내보냈지만 확인받지 못한 프레임도 대기열과 같은 기준(개수/경과 시간)으로 셈.
+# (ack를 한 번도 보내지 않는 클라이언트는 send가 막히는 경우만 감지함)
+class OutboundQueueConsumerMixin:
+    coalesce_events = frozenset()
+    capped_events = frozenset()
+
+    # 덮어쓸 기준 키. 기본은 이벤트 타입이며, 카드별로 나눠야 하는 컨슈머는 재정의함.
+    def outbound_key(self, event):
+        event_type = event.get("type")
+        return event_type if event_type in self.coalesce_events else None
+
+    async def __call__(self, scope, receive, send):
+        self._outbound_base_send = send
+        self._outbound = deque()
+        self._outbound_slots = {}
+        self._outbound_capped = deque()
+        self._outbound_event = None
+        self._outbound_closed = False
+        self._outbound_sending_since = None
+        self._outbound_wakeup = asyncio.Event()
+        self._outbound_writer = None
+        self._outbound_written = 0
+        self._outbound_acked = None
+        self._outbound_unacked = deque()
+        try:
+            await super().__call__(scope, receive, self._outbound_send)
+        finally:
+            if self._outbound_writer is not None:
+                self._outbound_writer.cancel()
+            self._outbound.clear()
+            self._outbound_unacked.clear()
+
+    async def dispatch(self, message):
+        if message.get("type") == "websocket.receive":
+            text = message.get("text") or ""
+            if text.startswith(ACK_PREFIX):
+                self._outbound_ack(text[len(ACK_PREFIX):])
+                return
+        self._outbound_event = message
+        try:
+            await super().dispatch(message)
+        finally:
+            self._outbound_event = None
+
+    async def _outbound_send(self, message):
+        if self._outbound_closed:
+            return
+        event = self._outbound_event if message.get("type") == "websocket.send" else None
+        key = self.outbound_key(event) if event is not None else None
+        if key is not None:
+            frame = self._outbound_slots.get(key)
+            if frame is not None:
+                frame.message = message
+                ws_outbound_frames.inc(type(self).__name__, "coalesced")
+                return
+
+        frame = _OutboundFrame(message, key, event is not None and event.get("type") in self.capped_events)
+        self._outbound.append(frame)
+        if key is not None:
+            self._outbound_slots[key] = frame
+        if frame.capped:
+            self._outbound_capped.append(frame)
+            if len(self._outbound_capped) > settings.WS_OUTBOUND_CHAT_CAP:
+                # 대기열 안의 자리는 남기고 내용만 비움. 작성 태스크가 건너뜀.
+                self._outbound_capped.popleft().message = None
+                ws_outbound_frames.inc(type(self).__name__, "dropped")
+
+        if self._outbound_lagging():
+            await self._disconnect_laggard()
+            return
+        if self._outbound_writer is None:
+            self._outbound_writer = asyncio.get_running_loop().create_task(self._write_outbound())
+        self._outbound_wakeup.set()
+
+    # 클라이언트가 받은 프레임 수를 알려 옴. 첫 ack부터 확인받지 못한 프레임을 추적함.
+    def _outbound_ack(self, value):
+        try:
+            received = int(value)
+        except ValueError:
+            return
+        if self._outbound_acked is None:
+            self._outbound_acked = self._outbound_written
+        self._outbound_acked = max(self._outbound_acked, min(received, self._outbound_written))
+        while self._outbound_unacked and self._outbound_unacked[0][0] <= self._outbound_acked:
+            self._outbound_unacked.popleft()
+
+    def _outbound_lagging(self):
+        if len(self._outbound) + len(self._outbound_unacked) > settings.WS_OUTBOUND_MAX_FRAMES:
+            return True
+        started = self._outbound_sending_since
+        if started is None and self._outbound_unacked:
+            started = self._outbound_unacked[0][1]
+        if started is None and self._outbound:
+            started = self._outbound[0].queued_at
+        return started is not None and time.monotonic() - started > settings.WS_OUTBOUND_MAX_LAG_SECONDS
+
+    async def _write_outbound(self):
+        while True:
+            while not self._outbound:
+                self._outbound_wakeup.clear()
+                await self._outbound_wakeup.wait()
+            frame = self._outbound.popleft()
+            if frame.key is not None and self._outbound_slots.get(frame.key) is frame:
+                del self._outbound_slots[frame.key]
+            if frame.capped and self._outbound_capped and self._outbound_capped[0] is frame:
+                self._outbound_capped.popleft()
+            if frame.message is None:
+                continue
+            self._outbound_sending_since = time.monotonic()
+            try:
+                await self._outbound_base_send(frame.message)
+            except Exception:
+                # 이미 끊긴 소켓이면 남은 프레임은 의미가 없으므로 정리하고 끝냄.
+                logger.debug("outbound send failed for %s", getattr(self, "channel_name", "?"), exc_info=True)
+                self._outbound_closed = True
+                self._outbound.clear()
+                return
+            self._outbound_sending_since = None
+            if frame.message["type"] == "websocket.send":
+                self._outbound_written += 1
+                if self._outbound_acked is not None:
+                    self._outbound_unacked.append((self._outbound_written, frame.queued_at))
+            if frame.message["type"] == "websocket.close":
+                self._outbound_closed = True
+                return
+
+    async def _disconnect_laggard(self):
+        ws_outbound_frames.inc(type(self).__name__, "laggard")
+        logger.info("closing lagging socket %s (%s frames queued)", getattr(self, "channel_name", "?"), len(self._outbound))
+        self._outbound_closed = True
+        self._outbound.clear()
+        self._outbound_slots.clear()
+        self._outbound_capped.clear()
+        self._outbound_unacked.clear()
+        if self._outbound_writer is not None:
+            self._outbound_writer.cancel()
+        # 전송이 막힌 소켓일 수 있으므로 close도 별도 태스크로 보내 이벤트 처리를 막지 않음.
+        asyncio.get_running_loop().create_task(
+            self._outbound_base_send({"type": "websocket.close", "code": RESYNC_CLOSE_CODE, "reason": "resync"})
+        )
@@ -0,0 +1,100 @@
+import threading
+import traceback
+from contextlib import contextmanager
+from pathlib import Path
+
+from allauth.account.models import EmailAddress
+from django.conf import settings
+
+from accounts.models import Game, User
+from core.benchmarks import QueryCounter
+
+# 앱별 tests.py에서 공통으로 쓰는 테스트 헬퍼임.
+
+BASE_DIR = str(Path(settings.BASE_DIR).resolve())
+_IGNORED_STACK_FILES = (__file__,)
+
+
+# 실행된 SQL과 그 쿼리를 발생시킨 프로젝트 코드 위치를 함께 기록하는 캡처임.
+class QueryCapture(QueryCounter):
+    def __init__(self):
+        super().__init__()
+        self.queries = []
+        self._capture_lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        sites = _project_stack()
+        with self._capture_lock:
+            self.queries.append((sql, sites))
+        return super().__call__(execute, sql, params, many, context)
+
+    def report(self, label, budget, start=0):
+        queries = self.queries[start:]
+        lines = [f"{label}: {len(queries)} queries (budget {budget})"]
+        for index, (sql, sites) in enumerate(queries, start=1):
+            lines.append(f"{index:>3}. {sql}")
+            for site in sites:
+                lines.append(f"       at {site}")
+        return "\n".join(lines)
+
+
+def _project_stack(limit=4):
+    sites = []
+    for frame in reversed(traceback.extract_stack()[:-2]):
+        filename = str(Path(frame.filename).resolve())
+        if not filename.startswith(BASE_DIR) or "site-packages" in filename or filename in _IGNORED_STACK_FILES:
+            continue
+        sites.append(f"{Path(filename).relative_to(BASE_DIR)}:{frame.lineno} in {frame.name}")
+        if len(sites) >= limit:
+            break
+    return sites
+
+
+# 블록 안에서 실행된 쿼리 수가 예산을 넘으면 SQL과 호출 위치를 보여주며 실패시키는 믹스인임.
+class QueryBudgetMixin:
+    _query_capture = None
+
+    # async_to_sync로 컨슈머 시나리오를 돌리면 database_sync_to_async 쿼리는 호출한 동기 스레드에서 실행됨.
+    # 이벤트 루프 스레드에서는 그 연결에 래퍼를 달 수 없으므로 시나리오 바깥에서 미리 설치해 둠.
+    @contextmanager
+    def capturingQueries(self):
+        capture = QueryCapture()
+        with capture.installed():
+            self._query_capture = capture
+            try:
+                yield capture
+            finally:
+                self._query_capture = None
+
+    @contextmanager
+    def assertQueryBudget(self, budget, label):
+        if self._query_capture is not None:
+            capture = self._query_capture
+            start = len(capture.queries)
+            yield capture
+        else:
+            capture = QueryCapture()
+            start = 0
+            with capture.installed():
+                yield capture
+        if len(capture.queries) - start > budget:
+            self.fail(capture.report(label, budget, start))
+
+
+def make_game(code="lol", name="LoL"):
+    game, _ = Game.objects.get_or_create(code=code, defaults={"name": name})
+    return game
+
+
+def make_user(index, verified=True, **extra):
+    user = User.objects.create(
+        username=f"user{index}",
+        nickname=f"nick{index}",
+        phone=f"{index:011d}",
+        birth_year=2000,
+        gender=User.Gender.PRIVATE,
+        **extra,
+    )
+    if verified:
+        EmailAddress.objects.create(user=user, email=f"user{index}@example.com", verified=True, primary=True)
+    return user
@@ -1,3 +1,721 @@
-from django.test import TestCase
+import asyncio
+import json
+import tempfile
+import threading
+import time
+from pathlib import Path
 
-# core 앱 테스트를 추가할 때 사용하는 기본 모듈임.
+from asgiref.sync import async_to_sync
+from channels.generic.websocket import AsyncWebsocketConsumer
+from channels.layers import InMemoryChannelLayer, get_channel_layer
+from channels.testing import WebsocketCommunicator
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.testing import make_game, make_user
+from parties.models import Party, PartyMember
+from websocket_project.db_backends import pool as db_pool
+from websocket_project.db_router import PIN_CACHE_KEY, ReplicaRouter, is_pinned, replica_alias, replica_reads
+
+from .benchmarks import latency_summary, percentile
+from .layers import GroupMultiplexChannelLayer, HashRing, ShardedChannelLayer
+from .metrics import http_request_queries, http_request_seconds, ws_connections, ws_messages_in, ws_messages_out
+from . import profiling, tracing
+from .realtime import RESYNC_CLOSE_CODE, MetricsConsumerMixin, OutboundQueueConsumerMixin
+
+MEMORY_SHARD = {"BACKEND": "channels.layers.InMemoryChannelLayer"}
+IN_MEMORY_LAYERS = {"default": MEMORY_SHARD}
+REPLICA = getattr(settings, "TEST_REPLICA_ALIAS", None) or settings.DB_REPLICA_ALIAS
+
+
+class GroupMultiplexChannelLayerTests(SimpleTestCase):
+    def setUp(self):
+        self.inner = InMemoryChannelLayer()
+        self.inner_sends = 0
+        send = self.inner.send
+
+        async def counting_send(channel, message):
+            self.inner_sends += 1
+            await send(channel, message)
+
+        self.inner.send = counting_send
+
+    def test_group_send_costs_one_inner_message_per_worker(self):
+        async def scenario():
+            workers = [GroupMultiplexChannelLayer(inner=self.inner) for _ in range(2)]
+            channels = []
+            for index in range(6):
+                layer = workers[index % 2]
+                channel = await layer.new_channel()
+                await layer.group_add("chat_1", channel)
+                channels.append((layer, channel))
+
+            await workers[0].group_send("chat_1", {"type": "chat.message", "message": "hi"})
+            for layer, channel in channels:
+                self.assertEqual((await layer.receive(channel))["message"], "hi")
+            self.assertEqual(self.inner_sends, 2)
+
+            # 다른 워커 소켓으로의 직접 전송은 소유 워커 inbox를 거쳐 전달됨.
+            await workers[0].send(channels[1][1], {"type": "direct"})
+            self.assertEqual((await workers[1].receive(channels[1][1]))["type"], "direct")
+
+        async_to_sync(scenario)()
+
+    def test_last_local_discard_unsubscribes_worker(self):
+        async def scenario():
+            layer = GroupMultiplexChannelLayer(inner=self.inner)
+            first, second = await layer.new_channel(), await layer.new_channel()
+            await layer.group_add("chat_1", first)
+            await layer.group_add("chat_1", second)
+            await layer.group_discard("chat_1", first)
+            self.assertIn(layer.inbox, self.inner.groups["chat_1"])
+            await layer.group_discard("chat_1", second)
+            self.assertNotIn("chat_1", layer.groups)
+            self.assertNotIn(layer.inbox, self.inner.groups.get("chat_1", {}))
+
+        async_to_sync(scenario)()
+
+    def test_inbox_survives_a_burst_beyond_the_inner_default_capacity(self):
+        async def scenario():
+            layer = GroupMultiplexChannelLayer(inner=self.inner, capacity=1000, inbox_capacity=500)
+            channel = await layer.new_channel()
+            await layer.group_add("chat_1", channel)
+            self.assertEqual(self.inner.get_capacity(layer.inbox), 500)
+            self.assertEqual(self.inner.get_capacity("chat.socket"), 100)
+
+            # 읽기 태스크가 돌기 전에 소켓 채널 기본 용량(100)보다 많은 이벤트가 몰려도 버려지지 않음.
+            for index in range(300):
+                await layer.group_send("chat_1", {"type": "chat.message", "index": index})
+            received = [(await asyncio.wait_for(layer.receive(channel), 1))["index"] for _ in range(300)]
+            self.assertEqual(received, list(range(300)))
+
+        async_to_sync(scenario)()
+
+    def test_explicit_inner_inbox_capacity_wins(self):
+        inner = {
+            "BACKEND": "channels.layers.InMemoryChannelLayer",
+            "CONFIG": {"channel_capacity": {"mux.*": 50}},
+        }
+        layer = GroupMultiplexChannelLayer(inner=inner, inbox_capacity=500)
+        self.assertEqual(layer.inner.get_capacity("mux.inmemory!abc"), 50)
+
+
+class ShardedChannelLayerTests(SimpleTestCase):
+    def make_layer(self):
+        return ShardedChannelLayer(
+            shards={"a": MEMORY_SHARD, "b": MEMORY_SHARD, "lobby": MEMORY_SHARD},
+            pins={"lobby": "lobby", "chat_42": "b"},
+        )
+
+    def test_pins_and_ring_routing(self):
+        layer = self.make_layer()
+        self.assertEqual(layer.shard_for_group("lobby"), "lobby")
+        self.assertEqual(layer.shard_for_group("chat_42"), "b")
+        # 고정 전용 샤드에는 다른 그룹이 배정되지 않음.
+        self.assertNotIn("lobby", {layer.shard_for_group(f"chat_{index}") for index in range(200)})
+
+    def test_ring_keeps_most_keys_when_a_shard_is_added(self):
+        keys = [f"chat_{index}" for index in range(1000)]
+        before, after = HashRing(["a", "b", "c"]), HashRing(["a", "b", "c", "d"])
+        moved = sum(1 for key in keys if before.get(key) != after.get(key))
+        self.assertLess(moved, 400)
+
+    def test_channel_receives_groups_on_other_shards(self):
+        async def scenario():
+            layer = self.make_layer()
+            channel = await layer.new_channel()
+            for group in ("lobby", "chat_42", "chat_7"):
+                await layer.group_add(group, channel)
+                await layer.group_send(group, {"type": "event", "group": group})
+                self.assertEqual((await layer.receive(channel))["group"], group)
+            await layer.send(channel, {"type": "direct"})
+            self.assertEqual((await layer.receive(channel))["type"], "direct")
+
+        async_to_sync(scenario)()
+
+    def test_multiplex_over_shards(self):
+        async def scenario():
+            shards = self.make_layer()
+            workers = [GroupMultiplexChannelLayer(inner=shards) for _ in range(2)]
+            sockets = []
+            for index in range(4):
+                layer = workers[index % 2]
+                channel = await layer.new_channel()
+                await layer.group_add("lobby", channel)
+                sockets.append((layer, channel))
+            await workers[0].group_send("lobby", {"type": "lobby.update"})
+            for layer, channel in sockets:
+                self.assertEqual((await layer.receive(channel))["type"], "lobby.update")
+            self.assertEqual(len(shards.shards["lobby"].groups["lobby"]), 2)
+
+        async_to_sync(scenario)()
+
+
+class EchoConsumer(OutboundQueueConsumerMixin, AsyncWebsocketConsumer):
+    coalesce_events = frozenset({"count_update"})
+    capped_events = frozenset({"chat_message"})
+
+    async def count_update(self, event):
+        await self.send(text_data=json.dumps(event))
+
+    async def chat_message(self, event):
+        await self.send(text_data=json.dumps(event))
+
+    async def notice(self, event):
+        await self.send(text_data=json.dumps(event))
+
+
+@override_settings(
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}},
+    WS_OUTBOUND_CHAT_CAP=3,
+    WS_OUTBOUND_MAX_FRAMES=20,
+)
+class OutboundQueueTests(SimpleTestCase):
+    # 클라이언트가 읽지 않는 상황을 gate가 열릴 때까지 멈추는 send로 흉내 냄.
+    def run_stalled(self, events, check):
+        async def scenario():
+            inbound, sent, gate = asyncio.Queue(), [], asyncio.Event()
+
+            async def send(message):
+                await gate.wait()
+                sent.append(message)
+
+            consumer = EchoConsumer()
+            task = asyncio.create_task(consumer({"type": "websocket", "path": "/"}, inbound.get, send))
+            await inbound.put({"type": "websocket.connect"})
+            await asyncio.sleep(0.01)
+            for event in events:
+                await consumer.dispatch(event)
+            gate.set()
+            await asyncio.sleep(0.01)
+            await inbound.put({"type": "websocket.disconnect", "code": 1000})
+            await task
+            check(consumer, sent)
+
+        async_to_sync(scenario)()
+
+    def test_snapshots_coalesce_and_chat_is_capped(self):
+        events = [{"type": "count_update", "count": index} for index in range(5)]
+        events += [{"type": "chat_message", "message": str(index)} for index in range(5)]
+
+        def check(consumer, sent):
+            payloads = [json.loads(message["text"]) for message in sent if message["type"] == "websocket.send"]
+            self.assertEqual(payloads[0], {"type": "count_update", "count": 4})
+            self.assertEqual([payload["message"] for payload in payloads[1:]], ["2", "3", "4"])
+
+        self.run_stalled(events, check)
+
+    def test_laggard_is_closed_with_resync_code(self):
+        # 덮어쓰거나 버릴 수 없는 프레임이 상한을 넘기면 대기열을 비우고 끊음.
+        events = [{"type": "notice", "index": index} for index in range(30)]
+
+        def check(consumer, sent):
+            self.assertEqual(sent[-1], {"type": "websocket.close", "code": RESYNC_CLOSE_CODE, "reason": "resync"})
+            self.assertEqual(len(consumer._outbound), 0)
+            self.assertLess(len(sent), 5)
+
+        self.run_stalled(events, check)
+
+    # Daphne처럼 send가 프레임을 송신 버퍼에 넘기고 바로 돌아오는 경우임. 읽지 않는 클라이언트는 ack로만 드러남.
+    def run_buffered(self, steps):
+        async def scenario():
+            inbound, sent = asyncio.Queue(), []
+
+            async def send(message):
+                sent.append(message)
+
+            consumer = EchoConsumer()
+            task = asyncio.create_task(consumer({"type": "websocket", "path": "/"}, inbound.get, send))
+            await inbound.put({"type": "websocket.connect"})
+            await asyncio.sleep(0.01)
+            await consumer.dispatch({"type": "websocket.receive", "text": "ack:0"})
+            for frames, ack in steps:
+                for index in range(frames):
+                    await consumer.dispatch({"type": "notice", "index": index})
+                    await asyncio.sleep(0)
+                if ack:
+                    delivered = sum(message["type"] == "websocket.send" for message in sent)
+                    await consumer.dispatch({"type": "websocket.receive", "text": f"ack:{delivered}"})
+            await asyncio.sleep(0.01)
+            await inbound.put({"type": "websocket.disconnect", "code": 1000})
+            await task
+            return sent
+
+        return async_to_sync(scenario)()
+
+    def test_unacked_frames_close_a_socket_whose_send_never_blocks(self):
+        sent = self.run_buffered([(30, False)])
+        self.assertEqual(sent[-1], {"type": "websocket.close", "code": RESYNC_CLOSE_CODE, "reason": "resync"})
+        # 상한(20)을 넘는 순간 끊으므로 버퍼에 넘긴 프레임도 그 이상 늘지 않음.
+        self.assertLessEqual(sum(message["type"] == "websocket.send" for message in sent), 21)
+
+    def test_acking_client_stays_connected(self):
+        sent = self.run_buffered([(15, True)] * 4)
+        self.assertNotIn("websocket.close", [message["type"] for message in sent])
+        self.assertEqual(sum(message["type"] == "websocket.send" for message in sent), 60)
+
+    @override_settings(WS_OUTBOUND_MAX_LAG_SECONDS=0.05)
+    def test_old_unacked_frame_closes_the_socket(self):
+        async def scenario():
+            inbound, sent = asyncio.Queue(), []
+
+            async def send(message):
+                sent.append(message)
+
+            consumer = EchoConsumer()
+            task = asyncio.create_task(consumer({"type": "websocket", "path": "/"}, inbound.get, send))
+            await inbound.put({"type": "websocket.connect"})
+            await asyncio.sleep(0.01)
+            await consumer.dispatch({"type": "websocket.receive", "text": "ack:0"})
+            await consumer.dispatch({"type": "notice", "index": 0})
+            await asyncio.sleep(0.1)
+            await consumer.dispatch({"type": "notice", "index": 1})
+            await asyncio.sleep(0.01)
+            await inbound.put({"type": "websocket.disconnect", "code": 1000})
+            await task
+            return sent
+
+        sent = async_to_sync(scenario)()
+        self.assertEqual(sent[-1]["code"], RESYNC_CLOSE_CODE)
+
+
+# replica alias가 있는 설정(websocket_project.settings_test)에서만 실행됨. 미러는 default와 다른 연결이므로
+# 커밋된 데이터만 보이고, 그래서 트랜잭션으로 감싸지 않는 TransactionTestCase를 씀.
+@skipUnless(REPLICA in settings.DATABASES, "replica alias가 없는 설정임")
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYERS, DB_REPLICA_ALIAS=REPLICA)
+class ReplicaRoutingTests(TransactionTestCase):
+    # 건너뛰는 경우에도 테스트 러너가 alias를 모으므로 설정에 있는 alias만 선언함.
+    databases = {"default", REPLICA} & set(settings.DATABASES)
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_user(1)
+        self.party = Party.objects.create(host=self.user, game=make_game(), mode="랭크")
+        PartyMember.objects.create(party=self.party, user=self.user)
+        self.client.force_login(self.user)
+
+    # 화면 하나를 GET하고 (primary, replica) 각각에서 실행된 Party 조회 수를 반환함.
+    def party_reads(self, name, **kwargs):
+        primary = CaptureQueriesContext(connections["default"])
+        replica = CaptureQueriesContext(connections[REPLICA])
+        with primary, replica:
+            response = self.client.get(reverse(name, kwargs=kwargs))
+        self.assertEqual(response.status_code, 200)
+        return tuple(
+            sum('"parties_party"' in query["sql"] for query in context.captured_queries) for context in (primary, replica)
+        )
+
+    def test_router_sends_only_scoped_reads_to_the_replica(self):
+        router = ReplicaRouter()
+        self.assertEqual(replica_alias(), REPLICA)
+        self.assertIsNone(router.db_for_read(Party))
+        with replica_reads(self.user.id) as alias:
+            self.assertEqual((alias, router.db_for_read(Party)), (REPLICA, REPLICA))
+            self.assertEqual(router.db_for_write(Party), "default")
+        self.assertFalse(router.allow_migrate(REPLICA, "parties"))
+
+    def test_safe_views_read_from_the_replica(self):
+        for name, kwargs in (("party_list", {}), ("party_detail", {"pk": self.party.pk})):
+            primary, replica = self.party_reads(name, **kwargs)
+            self.assertEqual(primary, 0, name)
+            self.assertGreater(replica, 0, name)
+
+    def test_write_pins_reads_to_primary(self):
+        self.assertFalse(is_pinned(self.user.id))
+        other = Party.objects.create(host=make_user(2), game=self.party.game, mode="일반")
+        PartyMember.objects.create(party=other, user=other.host)
+        response = self.client.post(reverse("party_join", kwargs={"pk": other.pk}))
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(is_pinned(self.user.id))
+
+        # 고정된 동안에는 같은 화면도 primary에서 읽어 방금 쓴 결과를 봄.
+        primary, replica = self.party_reads("party_list")
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+        cache.delete(PIN_CACHE_KEY.format(user_id=self.user.id))
+        primary, replica = self.party_reads("party_list")
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.rollbacks = 0
+
+    def close(self):
+        self.closed = True
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class FakeDatabaseWrapper:
+    def get_new_connection(self, conn_params):
+        return FakeConnection()
+
+
+class PooledFakeWrapper(db_pool.PooledDatabaseWrapperMixin, FakeDatabaseWrapper):
+    alias = "pool_test"
+    settings_dict = {"POOL": {"MAX_SIZE": 2, "TIMEOUT": 0.05}}
+
+    def __init__(self):
+        self.connection = None
+        self.in_atomic_block = False
+        self.errors_occurred = False
+        self.autocommit = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.addCleanup(db_pool._pools.pop, PooledFakeWrapper.alias, None)
+
+    # 만료/점검 주기를 실제로 기다리지 않도록 풀이 보는 시계를 고정하고 self.now로 움직임.
+    def freeze_clock(self):
+        self.now = 1000.0
+        patcher = mock.patch.object(db_pool.time, "monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_pool(self, **options):
+        options = {"max_size": 2, "max_idle": 300, "timeout": 0, "health_check_interval": 30, **options}
+        return db_pool.ConnectionPool(**options)
+
+    def test_reuses_released_connection_and_caps_size(self):
+        self.freeze_clock()
+        pool = self.make_pool()
+        first = pool.acquire(FakeConnection)
+        second = pool.acquire(FakeConnection)
+        with self.assertRaises(db_pool.PoolTimeout):
+            pool.acquire(FakeConnection)
+
+        pool.release(first)
+        self.assertIs(pool.acquire(FakeConnection), first)
+        stats = pool.stats()
+        self.assertEqual((stats["created"], stats["size"], stats["in_use"], stats["timeouts"]), (2, 2, 2, 1))
+        self.assertFalse(second.closed)
+
+    def test_waiting_checkout_gets_the_next_released_connection(self):
+        pool = self.make_pool(max_size=1, timeout=5)
+        held = pool.acquire(FakeConnection)
+        result = []
+        waiter = threading.Thread(target=lambda: result.append(pool.acquire(FakeConnection)))
+        waiter.start()
+        while not pool.stats()["waits"]:
+            threading.Event().wait(0.001)
+        pool.release(held)
+        waiter.join(timeout=5)
+
+        self.assertEqual(result, [held])
+        self.assertEqual(pool.stats()["timeouts"], 0)
+
+    def test_checkout_times_out_when_nothing_is_released(self):
+        pool = self.make_pool(max_size=1, timeout=0.05)
+        pool.acquire(FakeConnection)
+        with self.assertRaisesMessage(db_pool.PoolTimeout, "exhausted"):
+            pool.acquire(FakeConnection)
+        self.assertEqual((pool.stats()["waits"], pool.stats()["timeouts"]), (1, 1))
+
+    def test_failed_connect_frees_its_slot(self):
+        pool = self.make_pool(max_size=1)
+
+        def broken_connect():
+            raise OSError("refused")
+
+        with self.assertRaises(OSError):
+            pool.acquire(broken_connect)
+        self.assertIsInstance(pool.acquire(FakeConnection), FakeConnection)
+
+    def test_idle_connections_are_evicted(self):
+        self.freeze_clock()
+        pool = self.make_pool(max_idle=60)
+        connection = pool.acquire(FakeConnection)
+        pool.release(connection)
+        self.now += 61
+
+        fresh = pool.acquire(FakeConnection)
+        self.assertIsNot(fresh, connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual((pool.stats()["evicted_idle"], pool.stats()["size"]), (1, 1))
+
+    def test_failed_health_check_replaces_the_connection(self):
+        self.freeze_clock()
+        pool = self.make_pool()
+        checked = []
+
+        def health_check(connection):
+            checked.append(connection)
+            raise OSError("gone away")
+
+        connection = pool.acquire(FakeConnection)
+        pool.release(connection)
+        # 점검 주기 안에서는 ping 없이 그대로 빌려줌.
+        self.now += 10
+        self.assertIs(pool.acquire(FakeConnection, health_check=health_check), connection)
+        pool.release(connection)
+
+        self.now += 31
+        fresh = pool.acquire(FakeConnection, health_check=health_check)
+        self.assertIsNot(fresh, connection)
+        self.assertEqual(checked, [connection])
+        self.assertTrue(connection.closed)
+        stats = pool.stats()
+        self.assertEqual((stats["health_check_failures"], stats["size"]), (1, 1))
+
+    def test_wrapper_returns_clean_connections_and_discards_broken_ones(self):
+        wrapper = PooledFakeWrapper()
+        wrapper.connection = wrapper.get_new_connection({})
+        clean = wrapper.connection
+        wrapper._close()
+        self.assertEqual(wrapper.pool.stats()["idle"], 1)
+        self.assertIs(wrapper.get_new_connection({}), clean)
+
+        # 쿼리 오류가 난 연결은 풀로 돌아가지 않고 닫힘.
+        wrapper.connection = clean
+        wrapper.errors_occurred = True
+        wrapper._close()
+        self.assertTrue(clean.closed)
+        self.assertEqual((wrapper.pool.stats()["idle"], wrapper.pool.stats()["size"]), (0, 0))
+
+        # 열린 트랜잭션은 롤백한 뒤 반납함.
+        wrapper.errors_occurred = False
+        wrapper.autocommit = False
+        wrapper.connection = wrapper.get_new_connection({})
+        wrapper._close()
+        self.assertEqual(wrapper.connection.rollbacks, 1)
+        self.assertEqual(wrapper.pool.stats()["idle"], 1)
+
+
+class PercentileTests(SimpleTestCase):
+    def test_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual([percentile(values, pct) for pct in (1, 50, 95, 99, 100)], [1, 50, 95, 99, 100])
+        # 표본이 적으면 ceil(pct/100 * N)번째 관측값을 그대로 씀.
+        self.assertEqual([percentile([5, 1, 3, 2], pct) for pct in (0, 25, 50, 51, 99)], [1, 1, 2, 3, 5])
+        self.assertEqual(percentile([7], 99), 7)
+        self.assertIsNone(percentile([], 50))
+
+    def test_latency_summary_reports_milliseconds(self):
+        summary = latency_summary([0.001 * value for value in range(1, 21)])
+        self.assertEqual((summary["count"], summary["p50"], summary["p95"], summary["max"]), (20, 10.0, 19.0, 20.0))
+
+
+@override_settings(METRICS_ENABLED=True, METRICS_TOKEN="secret", METRICS_ALLOWED_IPS=["10.0.0.5"], TRUSTED_PROXY_COUNT=0)
+class MetricsAccessTests(TestCase):
+    def scrape(self, **extra):
+        return self.client.get(reverse("metrics"), **extra).status_code
+
+    def test_token_or_staff_login(self):
+        self.assertEqual(self.scrape(HTTP_AUTHORIZATION="Bearer secret"), 200)
+        self.assertEqual(self.scrape(HTTP_AUTHORIZATION="Bearer wrong"), 403)
+        self.assertEqual(self.scrape(), 403)
+
+        self.client.force_login(make_user(1, is_staff=True))
+        self.assertEqual(self.scrape(), 200)
+
+    def test_allowed_ip_without_proxy(self):
+        self.assertEqual(self.scrape(REMOTE_ADDR="10.0.0.5"), 200)
+        # 프록시를 신뢰하지 않으면 클라이언트가 보낸 X-Forwarded-For는 무시함.
+        self.assertEqual(self.scrape(REMOTE_ADDR="203.0.113.9", HTTP_X_FORWARDED_FOR="10.0.0.5"), 403)
+
+    @override_settings(TRUSTED_PROXY_COUNT=1, METRICS_ALLOWED_IPS=["127.0.0.1", "10.0.0.5"])
+    def test_allowed_ip_behind_a_proxy(self):
+        proxied = {"REMOTE_ADDR": "127.0.0.1"}
+        self.assertEqual(self.scrape(HTTP_X_FORWARDED_FOR="10.0.0.5", **proxied), 200)
+        # 프록시 주소가 허용 목록에 있어도 외부 클라이언트는 막히고, 왼쪽에 위조한 주소도 보지 않음.
+        self.assertEqual(self.scrape(HTTP_X_FORWARDED_FOR="203.0.113.9", **proxied), 403)
+        self.assertEqual(self.scrape(HTTP_X_FORWARDED_FOR="10.0.0.5, 203.0.113.9", **proxied), 403)
+        self.assertEqual(self.scrape(**proxied), 403)
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        self.assertEqual(self.scrape(HTTP_AUTHORIZATION="Bearer secret"), 404)
+
+
+class RequestMetricsMiddlewareTests(TestCase):
+    def test_labels_by_url_name(self):
+        before = http_request_seconds.count("guide", "GET"), http_request_queries.count("guide", "GET")
+        self.client.get(reverse("guide"))
+        after = http_request_seconds.count("guide", "GET"), http_request_queries.count("guide", "GET")
+        self.assertEqual((after[0] - before[0], after[1] - before[1]), (1, 1))
+
+        missing = http_request_seconds.count("unresolved", "GET")
+        self.client.get("/no-such-page/")
+        self.assertEqual(http_request_seconds.count("unresolved", "GET"), missing + 1)
+
+
+class MetricsEchoConsumer(MetricsConsumerMixin, AsyncWebsocketConsumer):
+    metrics_name = "metrics_test"
+
+    async def connect(self):
+        await self.accept()
+        await self.send(text_data=self.channel_name)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        await self.send(text_data=text_data)
+
+    async def notice(self, event):
+        await self.send(text_data=event["text"])
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYERS)
+class MetricsConsumerMixinTests(SimpleTestCase):
+    def test_counts_connections_and_messages(self):
+        label = MetricsEchoConsumer.metrics_name
+        messages_in = ws_messages_in.value(label, "text")
+        messages_out = ws_messages_out.value(label, "notice")
+
+        async def scenario():
+            communicator = WebsocketCommunicator(MetricsEchoConsumer.as_asgi(), "/ws/metrics/")
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            channel_name = await communicator.receive_from()
+            self.assertEqual(ws_connections.value(label), 1)
+
+            await communicator.send_to(text_data="ping")
+            self.assertEqual(await communicator.receive_from(), "ping")
+            await get_channel_layer().send(channel_name, {"type": "notice", "text": "hello"})
+            self.assertEqual(await communicator.receive_from(), "hello")
+            await communicator.disconnect()
+
+        async_to_sync(scenario)()
+        self.assertEqual(ws_connections.value(label), 0)
+        self.assertEqual(ws_messages_in.value(label, "text"), messages_in + 1)
+        self.assertEqual(ws_messages_out.value(label, "notice"), messages_out + 1)
+
+
+class TracingTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = Path(tmp.name)
+        # 주기 flush가 끼어들지 않게 주기를 길게 잡고 flush()를 직접 부름.
+        self.exporter = tracing.JsonlExporter(self.directory, flush_interval=3600, max_buffer=4)
+        tracing.set_exporter(self.exporter)
+        self.addCleanup(tracing.set_exporter, None)
+
+    def spans(self):
+        return [json.loads(line) for path in sorted(self.directory.glob("spans-*.jsonl")) for line in path.open()]
+
+    def test_spans_are_buffered_until_flushed(self):
+        with tracing.start_trace("http", force=True, path="/") as root:
+            with tracing.span("db"):
+                message = tracing.inject({"type": "chat.message"})
+        self.assertEqual(list(self.directory.iterdir()), [])
+
+        self.assertEqual(self.exporter.flush(), 2)
+        child, parent = self.spans()
+        self.assertEqual((parent["name"], parent["attrs"], parent["parent_id"]), ("http", {"path": "/"}, None))
+        self.assertEqual((child["trace_id"], child["parent_id"]), (root.trace_id, root.span_id))
+
+        event, context = tracing.extract(message)
+        self.assertEqual(event, {"type": "chat.message"})
+        self.assertEqual(context, {"trace_id": root.trace_id, "parent_id": child["span_id"]})
+
+    def test_full_buffer_drops_new_spans(self):
+        for index in range(6):
+            with tracing.start_trace(f"span{index}", force=True):
+                pass
+        self.assertEqual((self.exporter.flush(), self.exporter.dropped), (4, 2))
+        self.assertEqual([span["name"] for span in self.spans()], ["span0", "span1", "span2", "span3"])
+
+    def test_writer_thread_flushes_in_the_background(self):
+        exporter = tracing.JsonlExporter(self.directory, flush_interval=0.01, max_buffer=100)
+        tracing.set_exporter(exporter)
+        with tracing.start_trace("frame", force=True):
+            pass
+        deadline = time.monotonic() + 2
+        while not self.spans() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual([span["name"] for span in self.spans()], ["frame"])
+
+    def test_unsampled_requests_are_not_traced(self):
+        with override_settings(TRACE_SAMPLE_RATE=0):
+            with tracing.start_trace("http") as root:
+                self.assertIsNone(root)
+                self.assertIsNone(tracing.current_span())
+        self.assertEqual(self.exporter.flush(), 0)
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        override = override_settings(PROFILE_DIR=Path(tmp.name), PROFILE_SAMPLE_INTERVAL=0.001)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_cprofile_and_sample_blocks_write_profiles(self):
+        with profiling.profile_block("GET /parties/", "cprofile") as result:
+            sum(range(1000))
+        self.assertEqual(result["path"].suffix, ".prof")
+        self.assertIn("cumulative", profiling.summarize_profile(result["path"]))
+
+        with profiling.profile_block("sample", "sample") as sampled:
+            time.sleep(0.05)
+        self.assertIn("samples", profiling.summarize_profile(sampled["path"]))
+        self.assertEqual(
+            {entry["name"] for entry in profiling.list_profiles()}, {result["path"].name, sampled["path"].name}
+        )
+        self.assertIsNone(profiling.resolve_profile("../settings.py"))
+
+    def test_overlapping_cprofile_blocks_do_not_collide(self):
+        entered, release, results = threading.Event(), threading.Event(), []
+
+        def first_request():
+            with profiling.profile_block("first") as result:
+                entered.set()
+                release.wait(5)
+            results.append(result)
+
+        worker = threading.Thread(target=first_request)
+        worker.start()
+        entered.wait(5)
+        with profiling.profile_block("second") as second:
+            pass
+        release.set()
+        worker.join(5)
+
+        self.assertEqual((second["busy"], second["path"]), (True, None))
+        self.assertEqual(results[0]["path"].suffix, ".prof")
+        # 앞 요청이 끝나면 다시 측정할 수 있음.
+        with profiling.profile_block("third") as third:
+            pass
+        self.assertIsNotNone(third["path"])
+
+    def test_middleware_profiles_only_staff(self):
+        self.client.force_login(make_user(1))
+        self.assertNotIn("X-Profile-File", self.client.get(reverse("guide"), HTTP_X_PROFILE="cprofile"))
+
+        self.client.force_login(make_user(2, is_staff=True))
+        response = self.client.get(reverse("guide"), {"_profile": "sample"})
+        self.assertTrue(response["X-Profile-File"].endswith(".folded"))
+
+        # 다른 요청이 cProfile을 쓰는 중인 상태를 락을 직접 잡아 만듦.
+        with profiling._cprofile_lock:
+            response = self.client.get(reverse("guide"), HTTP_X_PROFILE="cprofile")
+        self.assertEqual(response["X-Profile-Busy"], "1")
+        self.assertNotIn("X-Profile-File", response)
+
+    def test_profile_command_is_staff_only(self):
+        sent = []
+
+        class Consumer(profiling.ProfilerConsumerMixin):
+            async def send(self, text_data):
+                sent.append(json.loads(text_data))
+
+        consumer = Consumer()
+        with mock.patch.object(profiling, "start_sampling_window", return_value=5) as start:
+            consumer.scope = {"user": make_user(1)}
+            async_to_sync(consumer.handle_profile_command)({"seconds": 5})
+            consumer.scope = {"user": make_user(2, is_staff=True)}
+            async_to_sync(consumer.handle_profile_command)({"seconds": "x"})
+        start.assert_called_once_with("ws-Consumer", 10)
+        self.assertEqual(sent, [{"type": "profile_started", "seconds": 5}])
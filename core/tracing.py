@@ -0,0 +1,221 @@
+import atexit
+import functools
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# 요청/소켓 프레임 단위 스팬 트레이싱임.
+# 루트 스팬은 TRACE_SAMPLE_RATE 확률로만 만들어지고, 샘플링되지 않은 경우 span()/traced()는
+# ContextVar 한 번 읽고 바로 반환하므로 비활성 상태의 비용은 거의 없음.
+# trace id는 group_send 메시지의 TRACE_KEY로 실려 채널 레이어를 건너 수신 소켓까지 이어짐.
+
+TRACE_KEY = "_trace"
+
+_current = ContextVar("current_span", default=None)
+
+
+def _new_id(bits=64):
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "attrs", "started_at", "_start", "duration", "error")
+
+    def __init__(self, name, trace_id, parent_id=None, attrs=None):
+        self.trace_id = trace_id
+        self.span_id = _new_id()
+        self.parent_id = parent_id
+        self.name = name
+        self.attrs = attrs or {}
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration = None
+        self.error = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def finish(self):
+        self.duration = time.perf_counter() - self._start
+
+    def as_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.started_at,
+            "duration_ms": round(self.duration * 1000.0, 3) if self.duration is not None else None,
+            "attrs": self.attrs,
+            "error": self.error,
+            "pid": os.getpid(),
+        }
+
+
+# 끝난 스팬을 TRACE_DIR/spans-YYYY-MM-DD.jsonl에 쌓는 로컬 익스포터임.
+# export()는 이벤트 루프/요청 스레드에서 불리므로 메모리 버퍼에 넣기만 하고,
+# 파일 쓰기는 writer 스레드가 TRACE_FLUSH_SECONDS마다(또는 버퍼가 절반 차면) 모아서 함.
+# 버퍼가 TRACE_BUFFER_SIZE만큼 차 있으면 새 스팬은 버리고 dropped로 셈.
+class JsonlExporter:
+    def __init__(self, directory, flush_interval=None, max_buffer=None):
+        self.directory = Path(directory)
+        self.flush_interval = settings.TRACE_FLUSH_SECONDS if flush_interval is None else flush_interval
+        self.max_buffer = settings.TRACE_BUFFER_SIZE if max_buffer is None else max_buffer
+        self.dropped = 0
+        self._buffer = []  # (날짜, 스팬 dict)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._writer = None
+
+    def export(self, span):
+        with self._lock:
+            if len(self._buffer) >= self.max_buffer:
+                self.dropped += 1
+                return
+            self._buffer.append((timezone.localdate(), span.as_dict()))
+            pending = len(self._buffer)
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+                self._writer.start()
+                atexit.register(self.flush)
+        if pending * 2 >= self.max_buffer:
+            self._wake.set()
+
+    # 버퍼를 비워 날짜별 파일에 한 번씩 이어 씀. 쓴 스팬 수를 반환함.
+    def flush(self):
+        with self._lock:
+            records, self._buffer = self._buffer, []
+        if not records:
+            return 0
+
+        lines_by_day = {}
+        for day, record in records:
+            lines_by_day.setdefault(day, []).append(json.dumps(record, ensure_ascii=False, default=str))
+        with self._write_lock:
+            for day, lines in lines_by_day.items():
+                path = self.directory / f"spans-{day:%Y-%m-%d}.jsonl"
+                try:
+                    self.directory.mkdir(parents=True, exist_ok=True)
+                    with path.open("a", encoding="utf-8") as fh:
+                        fh.write("\n".join(lines) + "\n")
+                except OSError:
+                    logger.warning("trace export failed: %s", path, exc_info=True)
+        return len(records)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("trace writer failed")
+
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def get_exporter():
+    global _exporter
+    if _exporter is None:
+        with _exporter_lock:
+            if _exporter is None:
+                _exporter = JsonlExporter(settings.TRACE_DIR)
+    return _exporter
+
+
+def set_exporter(exporter):
+    global _exporter
+    _exporter = exporter
+
+
+def current_span():
+    return _current.get()
+
+
+def should_sample():
+    rate = settings.TRACE_SAMPLE_RATE
+    return rate > 0 and (rate >= 1 or random.random() < rate)
+
+
+@contextmanager
+def _activate(span):
+    token = _current.set(span)
+    try:
+        yield span
+    except BaseException as exc:
+        span.error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        _current.reset(token)
+        span.finish()
+        get_exporter().export(span)
+
+
+# 트레이스의 시작점(HTTP 요청, 소켓 프레임, 채널 레이어 이벤트 수신)을 만듦.
+# trace_id가 주어지면 상위에서 이미 샘플링된 트레이스를 이어받는 것이므로 항상 기록함.
+@contextmanager
+def start_trace(name, trace_id=None, parent_id=None, force=False, **attrs):
+    if trace_id is None and not (force or should_sample()):
+        yield None
+        return
+    span = Span(name, trace_id or _new_id(128), parent_id, attrs)
+    with _activate(span):
+        yield span
+
+
+# 현재 트레이스 안에서만 자식 스팬을 만듦. 트레이스 밖이면 아무것도 하지 않음.
+@contextmanager
+def span(name, **attrs):
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(name, parent.trace_id, parent.span_id, attrs)
+    with _activate(child):
+        yield child
+
+
+def traced(name=None):
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return func(*args, **kwargs)
+            with span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# group_send 메시지에 현재 트레이스 정보를 실어 보냄. 트레이스 밖이면 메시지를 그대로 반환함.
+def inject(message):
+    current = _current.get()
+    if current is None:
+        return message
+    return {**message, TRACE_KEY: {"trace_id": current.trace_id, "parent_id": current.span_id}}
+
+
+# 수신 측에서 트레이스 정보를 꺼내고, 핸들러에는 원래 메시지만 넘김.
+def extract(message):
+    context = message.get(TRACE_KEY)
+    if context is None:
+        return message, None
+    return {key: value for key, value in message.items() if key != TRACE_KEY}, context
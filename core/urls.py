@@ -1,10 +1,13 @@
 from django.contrib import admin
 from django.urls import path, include
-from .views import MainView
+from .views import MainView, MetricsView, ProfileDownloadView, ProfileListView
 from django.views.generic import TemplateView
 
 # core 앱의 기본 페이지 라우팅임.
 urlpatterns = [
     path('', MainView.as_view(), name='main'),
     path('guide/', TemplateView.as_view(template_name='core/guide.html'), name='guide'),
+    path('internal/metrics/', MetricsView.as_view(), name='metrics'),
+    path('internal/profiles/', ProfileListView.as_view(), name='profile_list'),
+    path('internal/profiles/<str:name>/download/', ProfileDownloadView.as_view(), name='profile_download'),
 ]
\ No newline at end of file
@@ -1,6 +1,15 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
+from django.utils.decorators import method_decorator
 from django.views import View
 
+from core.http import client_ip
+from core.metrics import render_latest
+from core.profiling import list_profiles, resolve_profile, summarize_profile
+
 # 메인 랜딩 페이지를 렌더링하는 뷰
 class MainView(View):
     # GET 요청에 대해 메인 템플릿을 반환함.
@@ -11,4 +20,55 @@ class MainView(View):
 class GuideView(View):
     # GET 요청에 대해 가이드 템플릿을 반환함.
     def get(self, request):
-        return render(request, 'core/guide.html')
\ No newline at end of file
+        return render(request, 'core/guide.html')
+
+# 워커 프로세스의 메트릭을 Prometheus 텍스트 포맷으로 내려주는 내부 엔드포인트임.
+# METRICS_TOKEN(Bearer), METRICS_ALLOWED_IPS, 스태프 로그인 중 하나를 만족해야 응답함.
+class MetricsView(View):
+    def get(self, request):
+        if not settings.METRICS_ENABLED:
+            raise Http404
+        if not _metrics_allowed(request):
+            return HttpResponseForbidden()
+        return HttpResponse(render_latest(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def _metrics_allowed(request):
+    token = settings.METRICS_TOKEN
+    if token:
+        header = request.headers.get("Authorization", "")
+        if header.startswith("Bearer ") and constant_time_compare(header[7:], token):
+            return True
+    # 프록시 뒤에서는 REMOTE_ADDR이 항상 프록시 주소라서, 신뢰하는 프록시 홉 기준으로 구한 IP를 비교함.
+    ip = client_ip(request)
+    if ip and ip in settings.METRICS_ALLOWED_IPS:
+        return True
+    user = getattr(request, "user", None)
+    return bool(user and user.is_authenticated and user.is_staff)
+
+
+# PROFILE_DIR에 쌓인 프로파일 목록과 선택한 파일의 요약을 보여주는 스태프 전용 페이지임.
+@method_decorator(staff_member_required, name="dispatch")
+class ProfileListView(View):
+    def get(self, request):
+        selected = request.GET.get("name")
+        summary = None
+        if selected:
+            path = resolve_profile(selected)
+            if path is None:
+                raise Http404
+            summary = summarize_profile(path)
+        return render(
+            request,
+            "core/profiles.html",
+            {"profiles": list_profiles(), "selected": selected, "summary": summary, "title": "Profiles"},
+        )
+
+
+@method_decorator(staff_member_required, name="dispatch")
+class ProfileDownloadView(View):
+    def get(self, request, name):
+        path = resolve_profile(name)
+        if path is None:
+            raise Http404
+        return FileResponse(path.open("rb"), as_attachment=True, filename=path.name)
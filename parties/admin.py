@@ -1,6 +1,22 @@
+from django.conf import settings
 from django.contrib import admin
+from django.db.models import Q
+from django.http import Http404, JsonResponse
+from django.urls import path, reverse
+from django.utils.html import format_html
 
-from .models import BlackList, Party, PartyJoinRequest, PartyMember, PartyWaitlist
+from chat.archive import load_archived_messages, read_index
+from . import search
+from .models import (
+    ArchivedParty,
+    ArchivedPartyMember,
+    BlackList,
+    Party,
+    PartyJoinRequest,
+    PartyMember,
+    PartyWaitlist,
+    SearchPosting,
+)
 
 
 @admin.register(Party)
@@ -10,6 +26,48 @@ class PartyAdmin(admin.ModelAdmin):
     search_fields = ("mode", "description", "host__username", "host__nickname", "game__name")
     ordering = ("-id",)
     autocomplete_fields = ("host", "game")
+    readonly_fields = ("archived_chat",)
+
+    # 모드/설명은 LIKE 스캔 대신 검색 색인으로 찾고, 호스트/게임 이름은 인덱스를 타는 정확 일치로 찾음.
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        ids = search.search_ids(SearchPosting.Kind.PARTY, search_term, limit=settings.SEARCH_ADMIN_LIMIT)
+        matches = (
+            Q(pk__in=ids)
+            | Q(host__username=search_term)
+            | Q(host__nickname=search_term)
+            | Q(game__name=search_term)
+        )
+        return queryset.filter(matches), False
+
+    # 아카이브된 채팅 기록을 JSON으로 내려주는 관리자 전용 URL을 추가함.
+    def get_urls(self):
+        urls = [
+            path(
+                "<int:party_id>/archived-chat/",
+                self.admin_site.admin_view(self.archived_chat_view),
+                name="parties_party_archived_chat",
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def archived_chat_view(self, request, party_id):
+        index = read_index(party_id)
+        if not index:
+            raise Http404("아카이브된 채팅이 없습니다.")
+        messages = [message.as_dict() for message in load_archived_messages(party_id)]
+        return JsonResponse({"index": index, "messages": messages}, json_dumps_params={"ensure_ascii": False})
+
+    # 변경 화면에서 아카이브 존재 여부와 보기 링크를 표시함.
+    def archived_chat(self, obj):
+        index = read_index(obj.pk) if obj.pk else None
+        if not index:
+            return "-"
+        url = reverse("admin:parties_party_archived_chat", args=[obj.pk])
+        return format_html('<a href="{}">{}건 보기</a>', url, index["total"])
+    archived_chat.short_description = "아카이브 채팅"
 
 
 @admin.register(PartyMember)
@@ -46,3 +104,24 @@ class PartyWaitlistAdmin(admin.ModelAdmin):
     search_fields = ("party__mode", "user__username", "user__nickname")
     ordering = ("-id",)
     autocomplete_fields = ("party", "user")
+
+
+@admin.register(ArchivedParty)
+class ArchivedPartyAdmin(admin.ModelAdmin):
+    list_display = ("id", "game", "mode", "host", "max_members", "created_at", "closed_at", "archived_at")
+    list_filter = ("game", "archived_at")
+    search_fields = ("=id", "host__username", "host__nickname")
+    ordering = ("-id",)
+    raw_id_fields = ("host",)
+    readonly_fields = ("archived_chat",)
+
+    # 채팅 아카이브는 파티 id 기준이므로 PartyAdmin의 링크를 그대로 사용함.
+    archived_chat = PartyAdmin.archived_chat
+
+
+@admin.register(ArchivedPartyMember)
+class ArchivedPartyMemberAdmin(admin.ModelAdmin):
+    list_display = ("id", "party", "user", "joined_at")
+    search_fields = ("=party__id", "user__username", "user__nickname")
+    ordering = ("-id",)
+    raw_id_fields = ("party", "user")
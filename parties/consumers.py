@@ -1,16 +1,38 @@
 import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 
-class LobbyConsumer(AsyncWebsocketConsumer):
+from core.realtime import MetricsConsumerMixin, OutboundQueueConsumerMixin, TracedConsumerMixin
+
+class LobbyConsumer(MetricsConsumerMixin, TracedConsumerMixin, OutboundQueueConsumerMixin, AsyncWebsocketConsumer):
+    coalesce_events = frozenset({"member_list_update", "game_counts_snapshot"})
+
+    # 파티 카드 갱신은 카드별로 마지막 상태만 보내면 되므로 파티 id를 키로 덮어씀.
+    # 새 카드(is_new) 프레임은 덮어쓰면 카드가 안 생기므로 따로 두고, 삭제는 중복만 합침.
+    def outbound_key(self, event):
+        if event.get("type") == "party_update":
+            return ("party_update", event["party_data"].get("id"), bool(event.get("is_new")))
+        if event.get("type") == "party_deleted":
+            return ("party_deleted", event["party_id"])
+        if event.get("type") == "game_counts_update":
+            return ("game_counts_update", event["game"]["id"])
+        return super().outbound_key(event)
+
     # 소켓 연결 시 "lobby" 그룹에 현재 클라이언트 채널을 등록함.
     async def connect(self):
         # group_add("lobby", channel_name): "lobby" 브로드캐스트를 이 클라이언트가 받게 함
         await self.channel_layer.group_add("lobby", self.channel_name)
+        # 빠른 참가 대기 결과처럼 이 사용자에게만 보내는 알림용 그룹
+        user = self.scope.get("user")
+        self.user_group_name = f"user_{user.id}" if user and user.is_authenticated else None
+        if self.user_group_name:
+            await self.channel_layer.group_add(self.user_group_name, self.channel_name)
         await self.accept()
 
     # 브라우저가 떠나면 그룹에서 채널을 제거해 누수/중복 전송을 방지함.
     async def disconnect(self, close_code):
         await self.channel_layer.group_discard("lobby", self.channel_name)
+        if getattr(self, "user_group_name", None):
+            await self.channel_layer.group_discard(self.user_group_name, self.channel_name)
 
     # 파티 카드 생성/수정 이벤트를 그대로 브라우저로 전달함.
     async def party_update(self, event):
@@ -33,4 +55,26 @@ class LobbyConsumer(AsyncWebsocketConsumer):
         await self.send(text_data=json.dumps({
             "type": "member_list_update",
             "members": event["members"]
-        }))
\ No newline at end of file
+        }))
+
+    # 게임 하나의 모집 현황 카운터(모집 중/마감/남은 자리)가 바뀌었음을 알림.
+    async def game_counts_update(self, event):
+        await self.send(text_data=json.dumps({
+            "type": "game_counts_update",
+            "game": event["game"],
+        }))
+
+    # 주기적 reconcile 후 전체 게임 카운터를 다시 보냄.
+    async def game_counts_snapshot(self, event):
+        await self.send(text_data=json.dumps({
+            "type": "game_counts_snapshot",
+            "games": event["games"],
+        }))
+
+    # 빠른 참가 대기 중이던 사용자가 파티에 자리를 잡았음을 알림.
+    async def quick_join_matched(self, event):
+        await self.send(text_data=json.dumps({
+            "type": "quick_join_matched",
+            "party_id": event["party_id"],
+            "url": f"/parties/{event['party_id']}/",
+        }))
@@ -0,0 +1,168 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from accounts import catalog
+from core.realtime import group_send_sync
+from core.tracing import traced
+
+from .models import Party
+
+# 로비 상단의 게임별 모집 현황(모집 중/마감 파티 수, 남은 자리 수) 카운터임.
+# 파티가 저장될 때마다 그 파티가 카운터에 기여하던 값(게임, 모집 중, 마감, 남은 자리)을 캐시에 두고
+# 새 기여값과의 차이만 cache.incr로 더하므로 로비 렌더링은 GROUP BY 없이 캐시만 읽음.
+# (멤버 입장/퇴장은 handle_member_change가 파티를 저장하면서 broadcast_party_update를 거쳐 반영됨)
+# 워커 간 경합이나 캐시 유실로 생긴 오차는 reconcile이 DB 기준으로 새 세대(generation)를 만들어 바로잡음.
+
+GENERATION_KEY = "lobby:counters:gen"
+GAMES_KEY = "lobby:counters:games"
+FIELDS = ("open", "full", "seats")
+
+
+def _counter_key(generation, game_id, field):
+    return f"lobby:counters:{generation}:{game_id}:{field}"
+
+
+def _state_key(generation, party_id):
+    return f"lobby:counters:{generation}:party:{party_id}"
+
+
+# 세대 키는 reconcile 주기의 몇 배만 유지함. reconcile이 멈추면 세대가 만료되고 다음 로비 렌더링이 다시 만듦.
+# 카운터/기여값 키는 세대보다 오래 남겨, 세대가 살아 있는 동안 값이 먼저 사라지지 않게 함.
+def _timeout():
+    return int(settings.LOBBY_COUNTERS_RECONCILE_SECONDS * 4)
+
+
+def _data_timeout():
+    return _timeout() * 2
+
+
+# 파티 하나가 카운터에 기여하는 값 (game_id, 모집 중, 마감, 남은 자리). 종료된 파티는 None.
+def contribution(game_id, status, current_count, max_members):
+    if status == Party.Status.OPEN:
+        return game_id, 1, 0, max(0, max_members - current_count)
+    if status == Party.Status.FULL:
+        return game_id, 0, 1, 0
+    return None
+
+
+def _incr(key, delta):
+    if not delta:
+        return
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        cache.add(key, 0, timeout=_data_timeout())
+        cache.incr(key, delta)
+
+
+def _apply(generation, state, sign):
+    game_id, *values = state
+    for field, value in zip(FIELDS, values):
+        _incr(_counter_key(generation, game_id, field), sign * value)
+
+
+def read(game_ids=None):
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        return None
+    games = cache.get(GAMES_KEY) or {}
+    game_ids = games.keys() if game_ids is None else game_ids
+    keys = {(game_id, field): _counter_key(generation, game_id, field) for game_id in game_ids for field in FIELDS}
+    values = cache.get_many(keys.values())
+    counts = {}
+    for (game_id, field), key in keys.items():
+        counts.setdefault(game_id, {"id": game_id, "name": games.get(game_id, "")})[field] = values.get(key, 0)
+    return counts
+
+
+# 로비 헤더용 게임별 카운터 목록임. 캐시가 비어 있을 때(최초 기동 등)만 DB에서 다시 만듦.
+def get_counts():
+    counts = read()
+    if counts is None:
+        counts = reconcile(broadcast=False)
+    return sorted(
+        (entry for entry in counts.values() if entry["open"] or entry["full"]),
+        key=lambda entry: (-entry["open"], entry["name"]),
+    )
+
+
+# 파티 저장 후(on_commit) 호출함. 기여값이 바뀐 게임의 카운터만 고치고 로비에 알림.
+def party_changed(party_id, game_id, game_name, status, current_count, max_members):
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        return
+    new = contribution(game_id, status, current_count, max_members)
+    state_key = _state_key(generation, party_id)
+    old = cache.get(state_key)
+    if old is not None:
+        old = tuple(old)
+    if old == new:
+        return
+
+    if old is not None:
+        _apply(generation, old, -1)
+    if new is not None:
+        _apply(generation, new, 1)
+        cache.set(state_key, new, timeout=_data_timeout())
+    else:
+        cache.delete(state_key)
+
+    games = cache.get(GAMES_KEY) or {}
+    if new is not None and game_id not in games and game_name:
+        games[game_id] = game_name
+        cache.set(GAMES_KEY, games, timeout=None)
+
+    changed = {state[0] for state in (old, new) if state is not None}
+    for entry in (read(changed) or {}).values():
+        group_send_sync("lobby", {"type": "game_counts_update", "game": entry})
+
+
+def party_removed(party_id):
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        return
+    old = cache.get(_state_key(generation, party_id))
+    if old is None:
+        return
+    _apply(generation, tuple(old), -1)
+    cache.delete(_state_key(generation, party_id))
+    for entry in (read({old[0]}) or {}).values():
+        group_send_sync("lobby", {"type": "game_counts_update", "game": entry})
+
+
+# DB 기준으로 새 세대의 카운터와 파티별 기여값을 만든 뒤 세대를 바꿈.
+# 이전 세대 키는 만료 시간이 지나면 사라지며, 전환 중에 이전 세대에 반영된 변경은 다음 reconcile에서 맞춰짐.
+@traced("lobby_counters.reconcile")
+def reconcile(broadcast=True):
+    generation = int(time.time() * 1000)
+    rows = Party.objects.filter(status__in=(Party.Status.OPEN, Party.Status.FULL)).values_list(
+        "id", "game_id", "status", "current_member_count", "max_members"
+    )
+    totals, states = {}, {}
+    for party_id, game_id, status, current_count, max_members in rows:
+        state = contribution(game_id, status, current_count, max_members)
+        states[_state_key(generation, party_id)] = state
+        entry = totals.setdefault(game_id, [0, 0, 0])
+        for index, value in enumerate(state[1:]):
+            entry[index] += value
+
+    games = {game.pk: game.name for game in catalog.all_games()}
+    values = {
+        _counter_key(generation, game_id, field): totals.get(game_id, (0, 0, 0))[index]
+        for game_id in games
+        for index, field in enumerate(FIELDS)
+    }
+    values.update(states)
+    cache.set_many(values, timeout=_data_timeout())
+    cache.set(GAMES_KEY, games, timeout=None)
+    cache.set(GENERATION_KEY, generation, timeout=_timeout())
+
+    counts = {
+        game_id: {"id": game_id, "name": name, **dict(zip(FIELDS, totals.get(game_id, (0, 0, 0))))}
+        for game_id, name in games.items()
+    }
+    if broadcast:
+        group_send_sync("lobby", {"type": "game_counts_snapshot", "games": list(counts.values())})
+    return counts
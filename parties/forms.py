@@ -1,15 +1,19 @@
 from django import forms
+from accounts.catalog import GameChoiceField
 from .models import Party
 
 # 파티 생성/수정 입력값과 위젯 스타일을 정의하는 폼
 class PartyForm(forms.ModelForm):
+    # 게임 선택지는 카탈로그 캐시에서 만들어 폼 렌더링/검증에 Game 조회가 없음.
+    game = GameChoiceField(
+        widget=forms.Select(attrs={'class': 'input'}),
+        label='게임 선택',
+    )
+
     class Meta:
         model = Party
         fields = ['game', 'mode', 'description', 'max_members', 'mic_required', 'join_policy']
         widgets = {
-            'game': forms.Select(attrs={
-                'class': 'input',
-            }),
             'mode': forms.TextInput(attrs={
                 'placeholder': '예: 랭크, 일반, 칼바람, 신속, 내전',
                 'class': 'input',
@@ -32,10 +36,13 @@ class PartyForm(forms.ModelForm):
             }),
         }
         labels = {
-            'game': '게임 선택',
             'mode': '게임 모드',
             'description': '내용',
             'max_members': '최대 인원',
             'mic_required': '마이크 필수 여부',
             'join_policy': '입장 방식',
         }
+
+    # game은 GameChoiceField가 카탈로그로 이미 검증했으므로 모델 검증의 FK 존재 확인 쿼리는 건너뜀.
+    def _get_validation_exclusions(self):
+        return super()._get_validation_exclusions() | {"game"}
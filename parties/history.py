@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from heapq import merge
+
+from django.db.models import Q
+
+from .models import ArchivedPartyMember, PartyMember
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+# 핫(PartyMember)/콜드(ArchivedPartyMember) 참여 이력을 하나의 목록처럼 읽는 저장소 계층임.
+# 두 모델 모두 party.game/party.mode/party.status/joined_at을 가지므로 템플릿은 구분하지 않아도 됨.
+def recent_matches(user, limit=5):
+    return match_page(user, limit=limit)[0]
+
+
+# 커서는 마지막 항목의 (joined_at 마이크로초, id)임. 아카이브 이동 시 id가 유지되므로 두 테이블에서 유일함.
+def encode_cursor(match):
+    return f"{(match.joined_at - EPOCH) // MICROSECOND}.{match.id}"
+
+
+def decode_cursor(cursor):
+    micros, match_id = cursor.split(".", 1)
+    return EPOCH + int(micros) * MICROSECOND, int(match_id)
+
+
+# (user, -joined_at) 인덱스를 따라 커서 이후 limit개만 테이블마다 읽고 합침. 이력 길이와 무관하게 O(page)임.
+def match_page(user, cursor=None, limit=20):
+    after = Q()
+    if cursor:
+        joined_at, match_id = decode_cursor(cursor)
+        after = Q(joined_at__lt=joined_at) | Q(joined_at=joined_at, id__lt=match_id)
+
+    def page(model):
+        return (
+            model.objects.filter(after, user=user)
+            .select_related("party__game")
+            .order_by("-joined_at", "-id")[:limit + 1]
+        )
+
+    merged = merge(page(PartyMember), page(ArchivedPartyMember), key=lambda match: (match.joined_at, match.id), reverse=True)
+    matches = [match for _, match in zip(range(limit + 1), merged)]
+    next_cursor = encode_cursor(matches[limit - 1]) if len(matches) > limit else None
+    return matches[:limit], next_cursor
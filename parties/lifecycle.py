@@ -0,0 +1,69 @@
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from chat.models import ChatMessage
+from .models import ArchivedParty, ArchivedPartyMember, Party, PartyMember
+
+logger = logging.getLogger(__name__)
+
+ARCHIVED_PARTY_FIELDS = (
+    "id", "host_id", "game_id", "mic_required", "mode", "description", "max_members",
+    "join_policy", "current_member_count", "status", "closed_at", "created_at",
+)
+ARCHIVED_MEMBER_FIELDS = ("id", "party_id", "user_id", "joined_at", "is_active")
+
+
+# 콜드 테이블로 옮길 수 있는 종료 파티 쿼리셋임.
+# 채팅이 남아 있으면 Party 삭제 시 CASCADE로 사라지므로 archive_chat_history가 먼저 비운 파티만 대상으로 함.
+def archivable_parties(days):
+    cutoff = timezone.now() - timedelta(days=days)
+    return (
+        Party.objects.filter(status=Party.Status.CLOSED, teardown_pending=False)
+        .filter(Q(closed_at__lte=cutoff) | Q(closed_at__isnull=True, created_at__lte=cutoff))
+        .exclude(Exists(ChatMessage.objects.filter(party_id=OuterRef("pk"))))
+        .order_by("pk")
+    )
+
+
+# 파티 한 배치를 같은 트랜잭션 안에서 콜드 테이블로 복사하고 핫 테이블에서 삭제함.
+def _move_batch(party_ids):
+    with transaction.atomic():
+        parties = list(
+            Party.objects.select_for_update()
+            .filter(pk__in=party_ids, status=Party.Status.CLOSED)
+            .values(*ARCHIVED_PARTY_FIELDS)
+        )
+        if not parties:
+            return 0, 0
+
+        moved_ids = [row["id"] for row in parties]
+        members = list(PartyMember.objects.filter(party_id__in=moved_ids).values(*ARCHIVED_MEMBER_FIELDS))
+
+        ArchivedParty.objects.bulk_create([ArchivedParty(**row) for row in parties], ignore_conflicts=True)
+        ArchivedPartyMember.objects.bulk_create([ArchivedPartyMember(**row) for row in members], ignore_conflicts=True)
+
+        # 블랙리스트/신청/대기열은 종료 파티에서 의미가 없으므로 CASCADE로 함께 정리됨.
+        Party.objects.filter(pk__in=moved_ids).delete()
+
+    return len(parties), len(members)
+
+
+# 보존 기간이 지난 종료 파티와 참여 이력을 배치 단위로 콜드 테이블로 옮김.
+def archive_closed_parties(days, batch_size=200, limit=None):
+    queryset = archivable_parties(days).values_list("pk", flat=True)
+    if limit:
+        queryset = queryset[:limit]
+    party_ids = list(queryset)
+
+    totals = {"parties": 0, "members": 0}
+    for start in range(0, len(party_ids), batch_size):
+        parties, members = _move_batch(party_ids[start:start + batch_size])
+        totals["parties"] += parties
+        totals["members"] += members
+
+    logger.info("closed parties archived: %s", totals)
+    return totals
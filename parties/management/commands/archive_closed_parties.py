@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from parties.lifecycle import archive_closed_parties
+
+
+# 오래된 종료 파티와 참여 이력을 콜드 테이블(ArchivedParty/ArchivedPartyMember)로 옮기는 커맨드임.
+# 채팅이 남은 파티는 건너뛰므로 archive_chat_history를 먼저 실행해야 함.
+# 예: python manage.py archive_closed_parties --days 45
+class Command(BaseCommand):
+    help = "N일이 지난 CLOSED 파티와 PartyMember를 아카이브 테이블로 이동합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=None, help="종료 후 핫 테이블에 남겨둘 일수")
+        parser.add_argument("--batch-size", type=int, default=200, help="한 트랜잭션에서 옮길 파티 수")
+        parser.add_argument("--limit", type=int, default=None, help="한 번에 처리할 최대 파티 수")
+
+    def handle(self, *args, **options):
+        days = options["days"] if options["days"] is not None else settings.PARTY_ARCHIVE_AFTER_DAYS
+        totals = archive_closed_parties(days, batch_size=options["batch_size"], limit=options["limit"])
+        self.stdout.write(self.style.SUCCESS(f"archived parties={totals['parties']} members={totals['members']}"))
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from parties.teardown import reap_pending_parties
+
+
+# 종료 처리된 파티의 하위 데이터를 백그라운드에서 청크 단위로 정리하는 커맨드임.
+# 예: python manage.py reap_closed_parties --loop --interval 30
+class Command(BaseCommand):
+    help = "teardown_pending 상태인 CLOSED 파티의 블랙리스트/신청/대기열/검색 색인을 청크 단위로 삭제합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=None, help="한 번에 삭제할 최대 행 수")
+        parser.add_argument("--pause", type=float, default=None, help="청크 사이 대기 시간(초)")
+        parser.add_argument("--limit", type=int, default=None, help="한 번에 처리할 최대 파티 수")
+        parser.add_argument("--loop", action="store_true", help="종료하지 않고 주기적으로 반복 실행")
+        parser.add_argument("--interval", type=float, default=30.0, help="--loop 사용 시 반복 간격(초)")
+        parser.add_argument("--verbose-chunks", action="store_true", help="청크마다 진행 상황 출력")
+
+    def handle(self, *args, **options):
+        on_chunk = None
+        if options["verbose_chunks"]:
+            def on_chunk(party_id, key, count):
+                self.stdout.write(f"  party={party_id} {key} -{count}")
+
+        while True:
+            totals = reap_pending_parties(
+                limit=options["limit"],
+                chunk_size=options["chunk_size"],
+                pause=options["pause"],
+                on_chunk=on_chunk,
+            )
+            if totals["parties"]:
+                summary = " ".join(f"{key}={value}" for key, value in totals.items())
+                self.stdout.write(self.style.SUCCESS(f"teardown: {summary}"))
+
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
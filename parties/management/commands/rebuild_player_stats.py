@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from parties.stats import rebuild
+
+
+# 프로필 통계 롤업(PlayerGameStats)이 도입되기 전 이력이나 어긋난 값을 핫/콜드 참여 이력 기준으로 다시 계산하는 커맨드임.
+# 참여/개최 수와 파티 규모 합계만 덮어쓰고, 강퇴/블랙리스트 수는 이미 있는 값을 유지함.
+# 예: python manage.py rebuild_player_stats
+class Command(BaseCommand):
+    help = "PartyMember/ArchivedPartyMember 이력으로 게임별 플레이어 통계를 다시 계산합니다."
+
+    def handle(self, *args, **options):
+        totals = rebuild()
+        self.stdout.write(self.style.SUCCESS(f"player stats created={totals['created']} updated={totals['updated']}"))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from parties.search import rebuild
+
+
+# 검색 색인(SearchPosting)이 도입되기 전의 파티/채팅을 색인하는 커맨드임.
+# 이미 있는 행은 무시하므로 중단된 뒤 다시 실행해도 됨.
+# 예: python manage.py rebuild_search_index --batch-size 2000
+class Command(BaseCommand):
+    help = "Party 모드/설명과 ChatMessage 본문을 검색 색인에 채워 넣습니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="한 번에 읽어 색인할 행 수")
+
+    def handle(self, *args, **options):
+        totals = rebuild(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"indexed parties={totals['parties']} messages={totals['messages']}"))
@@ -0,0 +1,28 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from parties.counters import reconcile
+
+
+# 로비 게임별 카운터를 DB 기준으로 다시 맞추는 커맨드임. 증분 갱신 중 생긴 오차를 주기적으로 바로잡음.
+# 예: python manage.py reconcile_lobby_counters --loop
+class Command(BaseCommand):
+    help = "게임별 모집 중/마감 파티 수와 남은 자리 카운터를 DB 기준으로 다시 계산합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="종료하지 않고 주기적으로 반복 실행")
+        parser.add_argument("--interval", type=float, default=None, help="--loop 사용 시 반복 간격(초)")
+
+    def handle(self, *args, **options):
+        interval = options["interval"] or settings.LOBBY_COUNTERS_RECONCILE_SECONDS
+        while True:
+            counts = reconcile()
+            open_total = sum(entry["open"] for entry in counts.values())
+            self.stdout.write(self.style.SUCCESS(f"reconciled games={len(counts)} open={open_total}"))
+            if not options["loop"]:
+                return
+            close_old_connections()
+            time.sleep(interval)
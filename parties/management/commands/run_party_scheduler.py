@@ -0,0 +1,28 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from parties.scheduler import PartyScheduler
+
+
+# 오래된 참가 신청/대기열을 만료시키고 활동 없는 파티를 종료하는 스케줄러 커맨드임. 프로세스 하나만 띄움.
+# 예: python manage.py run_party_scheduler --loop
+class Command(BaseCommand):
+    help = "만료된 참가 신청과 대기열 항목을 정리하고 활동이 없거나 빈 파티를 종료합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="종료하지 않고 주기적으로 반복 실행")
+
+    def handle(self, *args, **options):
+        scheduler = PartyScheduler()
+        while True:
+            totals = scheduler.run_once()
+            if any(totals.values()):
+                summary = " ".join(f"{key}={value}" for key, value in totals.items())
+                self.stdout.write(self.style.SUCCESS(f"expired: {summary} (timers={len(scheduler)})"))
+            if not options["loop"]:
+                return
+            close_old_connections()
+            time.sleep(settings.PARTY_SCHEDULER_POLL_SECONDS)
@@ -0,0 +1,357 @@
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from core.realtime import group_send_sync
+from core.tracing import traced
+
+from .models import BlackList, Party, PartyJoinRequest, PartyMember, PartyWaitlist
+
+logger = logging.getLogger(__name__)
+
+# 빠른 참가(quick-join) 매치메이커임.
+# OPEN 파티를 (game, mic_required, join_policy) 버킷 안에서 남은 자리 수별로 나눠 메모리에 들고 있어
+# 사용자 주 게임/마이크 조건에 맞는 파티를 DB 조회 없이 고름. (남은 자리가 적은 파티 우선, 같은 자리 수는 먼저 열린 순)
+# 인덱스는 Party post_save/post_delete(on_commit)로 갱신하고, 다른 워커에서 바뀐 파티는
+# MATCHMAKING_RESYNC_SECONDS마다 DB에서 다시 읽어 맞춤. 실제 입장은 파티 행을 잠근 뒤 다시 검증해 확정함.
+# 맞는 파티가 없으면 대기표를 남기고, 조건에 맞는 파티가 열리면 티커 스레드가 자리를 잡은 뒤 user_{id} 그룹으로 알림.
+# 대기표 본체는 받은 워커 메모리에 있지만 유효 여부는 공유 캐시(TICKET_CACHE_KEY)에 둠. 취소 요청이 다른 워커로
+# 가도 캐시 키가 지워지므로, 대기표를 가진 워커는 자리를 잡기 직전에 키를 확인하고 없으면 대기표를 버림.
+
+MAX_FREE_SEATS = 19
+RESERVE_ATTEMPTS = 5
+TICKET_CACHE_KEY = "matchmaking:ticket:{user_id}"
+
+
+class PartyIndex:
+    def __init__(self):
+        # (game_id, mic_required, join_policy) -> {남은 자리 수: {party_id: None}} (dict를 삽입 순서 있는 집합으로 씀)
+        self._buckets = {}
+        # party_id -> (bucket key, 남은 자리 수)
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.loaded_at = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, party_id):
+        entry = self._entries.pop(party_id, None)
+        if entry is None:
+            return
+        key, free = entry
+        slots = self._buckets[key]
+        slots[free].pop(party_id, None)
+        if not slots[free]:
+            del slots[free]
+        if not slots:
+            del self._buckets[key]
+
+    def _insert(self, party_id, game_id, mic_required, join_policy, status, max_members, current_count):
+        free = max_members - current_count
+        if status != Party.Status.OPEN or free <= 0:
+            return
+        key = (game_id, mic_required, join_policy)
+        free = min(free, MAX_FREE_SEATS)
+        self._buckets.setdefault(key, {}).setdefault(free, {})[party_id] = None
+        self._entries[party_id] = (key, free)
+
+    def upsert(self, party_id, game_id, mic_required, join_policy, status, max_members, current_count):
+        with self._lock:
+            self._remove(party_id)
+            self._insert(party_id, game_id, mic_required, join_policy, status, max_members, current_count)
+
+    def remove(self, party_id):
+        with self._lock:
+            self._remove(party_id)
+
+    def load(self, rows):
+        with self._lock:
+            self._buckets = {}
+            self._entries = {}
+            for row in rows:
+                self._insert(*row)
+            self.loaded_at = time.monotonic()
+
+    def describe(self, party_id):
+        entry = self._entries.get(party_id)
+        if entry is None:
+            return None
+        (game_id, mic_required, join_policy), free = entry
+        return {"game_id": game_id, "mic_required": mic_required, "join_policy": join_policy, "free": free}
+
+    # 조건에 맞는 파티 id를 남은 자리가 적은 순으로 최대 limit개 반환함. 버킷 수 x 자리 수만큼만 확인함.
+    def best(self, game_ids, mic_enabled, join_policy=Party.JoinPolicy.INSTANT, exclude=(), limit=1):
+        with self._lock:
+            if not game_ids:
+                game_ids = {key[0] for key in self._buckets}
+            mic_options = (False, True) if mic_enabled else (False,)
+            keys = [
+                (game_id, mic, join_policy)
+                for game_id in game_ids
+                for mic in mic_options
+                if (game_id, mic, join_policy) in self._buckets
+            ]
+            found = []
+            for free in range(1, MAX_FREE_SEATS + 1):
+                for key in keys:
+                    for party_id in self._buckets[key].get(free, ()):
+                        if party_id not in exclude:
+                            found.append(party_id)
+                            if len(found) >= limit:
+                                return found
+            return found
+
+
+class Ticket:
+    __slots__ = ("user_id", "game_ids", "mic_enabled", "queued_at", "token")
+
+    def __init__(self, user_id, game_ids, mic_enabled):
+        self.user_id = user_id
+        self.game_ids = frozenset(game_ids)
+        self.mic_enabled = mic_enabled
+        self.queued_at = time.monotonic()
+        # 같은 사용자가 다른 워커에서 다시 줄을 서면 캐시 값이 바뀌어 이 대기표는 무효가 됨.
+        self.token = uuid.uuid4().hex
+
+    def is_active(self):
+        return cache.get(TICKET_CACHE_KEY.format(user_id=self.user_id)) == self.token
+
+    def matches(self, description):
+        return (
+            description is not None
+            and description["join_policy"] == Party.JoinPolicy.INSTANT
+            and (not self.game_ids or description["game_id"] in self.game_ids)
+            and (self.mic_enabled or not description["mic_required"])
+        )
+
+
+index = PartyIndex()
+_tickets = OrderedDict()
+_tickets_lock = threading.Lock()
+_ticker = None
+# 자리가 생긴 파티 id(삽입 순서 있는 집합). party_changed가 채우고 티커 스레드가 _wakeup을 받아 비움.
+_changed = OrderedDict()
+_wakeup = threading.Event()
+
+
+def _party_row(party):
+    return (
+        party.id,
+        party.game_id,
+        party.mic_required,
+        party.join_policy,
+        party.status,
+        party.max_members,
+        party.current_member_count,
+    )
+
+
+def resync():
+    rows = Party.objects.filter(status=Party.Status.OPEN).order_by("created_at").values_list(
+        "id", "game_id", "mic_required", "join_policy", "status", "max_members", "current_member_count"
+    )
+    index.load(rows)
+
+
+def ensure_fresh():
+    if index.loaded_at is None or time.monotonic() - index.loaded_at >= settings.MATCHMAKING_RESYNC_SECONDS:
+        resync()
+
+
+# 파티 행을 잠근 뒤 입장 가능 여부를 다시 확인하고 멤버로 등록함. 성공하면 Party, 아니면 None.
+def reserve_seat(party_id, user):
+    with transaction.atomic():
+        party = Party.objects.select_for_update().filter(pk=party_id).first()
+        if (
+            party is None
+            or party.status != Party.Status.OPEN
+            or party.join_policy != Party.JoinPolicy.INSTANT
+            or party.current_member_count >= party.max_members
+            or BlackList.objects.filter(party_id=party_id, user_id=user.id).exists()
+        ):
+            return None
+        membership = PartyMember.objects.filter(party_id=party_id, user_id=user.id).first()
+        if membership and membership.is_active:
+            return None
+        if membership:
+            membership.is_active = True
+            membership.save(update_fields=["is_active"])
+        else:
+            PartyMember.objects.create(party=party, user=user, is_active=True)
+        PartyJoinRequest.objects.filter(
+            party_id=party_id, user_id=user.id, status=PartyJoinRequest.Status.PENDING
+        ).update(status=PartyJoinRequest.Status.CANCELLED, decided_at=timezone.now(), decided_by_id=party.host_id)
+        PartyWaitlist.objects.filter(party_id=party_id, user_id=user.id).delete()
+        return party
+
+
+def _user_criteria(user):
+    return set(user.main_games.values_list("id", flat=True)), user.mic_enabled
+
+
+# 조건에 맞는 파티에 바로 입장시키고 Party를 반환함. 자리가 없으면 대기표를 남기고 None을 반환함.
+@traced("matchmaking.quick_join")
+def quick_join(user):
+    ensure_fresh()
+    game_ids, mic_enabled = _user_criteria(user)
+    tried = set()
+    for _ in range(RESERVE_ATTEMPTS):
+        candidates = index.best(game_ids, mic_enabled, exclude=tried)
+        if not candidates:
+            break
+        party_id = candidates[0]
+        tried.add(party_id)
+        party = reserve_seat(party_id, user)
+        if party is not None:
+            cancel(user.id)
+            return party
+    enqueue(user.id, game_ids, mic_enabled)
+    return None
+
+
+def enqueue(user_id, game_ids, mic_enabled):
+    ticket = Ticket(user_id, game_ids, mic_enabled)
+    cache.set(TICKET_CACHE_KEY.format(user_id=user_id), ticket.token, timeout=settings.MATCHMAKING_TICKET_TTL)
+    with _tickets_lock:
+        _tickets.pop(user_id, None)
+        _tickets[user_id] = ticket
+    _ensure_ticker()
+
+
+# 어느 워커에서 불려도 캐시 키를 지워 대기표를 무효로 만듦. 대기 중이던 대기표가 있었으면 True.
+def cancel(user_id):
+    with _tickets_lock:
+        local = _tickets.pop(user_id, None) is not None
+    return bool(cache.delete(TICKET_CACHE_KEY.format(user_id=user_id))) or local
+
+
+def is_queued(user_id):
+    return cache.get(TICKET_CACHE_KEY.format(user_id=user_id)) is not None
+
+
+def _discard(ticket):
+    with _tickets_lock:
+        if _tickets.get(ticket.user_id) is ticket:
+            del _tickets[ticket.user_id]
+
+
+def _waiting_tickets():
+    with _tickets_lock:
+        return list(_tickets.values())
+
+
+def _notify(user_id, party_id):
+    group_send_sync(f"user_{user_id}", {"type": "quick_join_matched", "party_id": party_id})
+
+
+# 파티 하나가 새로 열리거나 자리가 생겼을 때 대기표를 먼저 온 순서대로 넣어 봄.
+def place_waiting(party_id):
+    from accounts.models import User
+
+    for ticket in _waiting_tickets():
+        description = index.describe(party_id)
+        if description is None:
+            return
+        if not ticket.matches(description):
+            continue
+        # 다른 워커에서 취소됐거나 다시 줄을 선 대기표는 자리를 잡지 않고 버림.
+        if not ticket.is_active():
+            _discard(ticket)
+            continue
+        user = User.objects.filter(pk=ticket.user_id).first()
+        if user is None:
+            cancel(ticket.user_id)
+            continue
+        if reserve_seat(party_id, user) is None:
+            continue
+        cancel(ticket.user_id)
+        _notify(ticket.user_id, party_id)
+
+
+def _expire_tickets():
+    deadline = time.monotonic() - settings.MATCHMAKING_TICKET_TTL
+    with _tickets_lock:
+        for user_id in [user_id for user_id, ticket in _tickets.items() if ticket.queued_at < deadline]:
+            del _tickets[user_id]
+
+
+def _take_changed():
+    with _tickets_lock:
+        party_ids = list(_changed)
+        _changed.clear()
+    return party_ids
+
+
+# 자리가 생긴 파티에 대기표를 넣어 봄. 티커 스레드가 _wakeup을 받을 때마다 호출함.
+def place_changed():
+    for party_id in _take_changed():
+        if not _tickets:
+            return
+        place_waiting(party_id)
+
+
+# 대기표가 있는 동안만 도는 스레드임. 자리가 생긴 파티는 _wakeup을 받아 바로 처리하고,
+# 다른 워커에서 열린 파티를 찾기 위해 MATCHMAKING_RESYNC_SECONDS마다 인덱스를 다시 읽어 전체 대기표를 넣어 봄.
+def _run_ticker():
+    global _ticker
+    try:
+        next_resync = time.monotonic() + settings.MATCHMAKING_RESYNC_SECONDS
+        while True:
+            _wakeup.wait(max(0, next_resync - time.monotonic()))
+            _wakeup.clear()
+            _expire_tickets()
+            if not _tickets:
+                return
+            try:
+                place_changed()
+                if time.monotonic() >= next_resync:
+                    next_resync = time.monotonic() + settings.MATCHMAKING_RESYNC_SECONDS
+                    resync()
+                    for ticket in _waiting_tickets():
+                        for party_id in index.best(ticket.game_ids, ticket.mic_enabled, limit=RESERVE_ATTEMPTS):
+                            place_waiting(party_id)
+                            if ticket.user_id not in _tickets:
+                                break
+            except Exception:
+                logger.exception("matchmaking ticker failed")
+            finally:
+                close_old_connections()
+    finally:
+        with _tickets_lock:
+            _ticker = None
+            if not _tickets:
+                _changed.clear()
+        # 종료 직전에 새 대기표가 들어왔다면 다시 시작함.
+        if _tickets:
+            _ensure_ticker()
+
+
+def _ensure_ticker():
+    global _ticker
+    with _tickets_lock:
+        if _ticker is None:
+            _ticker = threading.Thread(target=_run_ticker, name="matchmaking-ticker", daemon=True)
+            _ticker.start()
+
+
+# 시그널(on_commit)에서 호출함. 인덱스만 갱신하고, 자리가 있으면 대기표 배치는 티커 스레드에 넘김.
+# (파티를 저장한 요청이 자리 잡기 트랜잭션/알림까지 떠안지 않게 함)
+def party_changed(party):
+    index.upsert(*_party_row(party))
+    if _tickets and index.describe(party.id) is not None:
+        with _tickets_lock:
+            _changed[party.id] = None
+        _ensure_ticker()
+        _wakeup.set()
+
+
+def party_removed(party_id):
+    index.remove(party_id)
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-19 11:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parties', '0014_party_pinned_message_party_pinned_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='party',
+            name='teardown_pending',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-19 11:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parties', '0015_party_teardown_pending'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='party',
+            name='closed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.27 on 2026-10-19 11:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_alter_user_phone'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('parties', '0016_party_closed_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedParty',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('mic_required', models.BooleanField(default=False, verbose_name='마이크 필수')),
+                ('mode', models.CharField(max_length=50)),
+                ('description', models.TextField(blank=True)),
+                ('max_members', models.PositiveIntegerField(default=5, verbose_name='최대 인원')),
+                ('join_policy', models.CharField(choices=[('INSTANT', '즉시 입장'), ('APPROVAL', '승인제')], default='INSTANT', max_length=12)),
+                ('current_member_count', models.PositiveIntegerField(default=0)),
+                ('status', models.CharField(choices=[('OPEN', '모집중'), ('FULL', '마감'), ('CLOSED', '종료')], default='CLOSED', max_length=10)),
+                ('closed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_parties', to='accounts.game')),
+                ('host', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_hosted_parties', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedPartyMember',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('joined_at', models.DateTimeField()),
+                ('is_active', models.BooleanField(default=False)),
+                ('party', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='members', to='parties.archivedparty')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_party_memberships', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-joined_at'], name='archived_member_user_joined')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='archivedpartymember',
+            constraint=models.UniqueConstraint(fields=('party', 'user'), name='unique_archived_party_member'),
+        ),
+    ]
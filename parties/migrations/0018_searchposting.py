@@ -0,0 +1,30 @@
+# Generated by Django 4.2.27 on 2026-10-19 12:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parties', '0017_archivedparty_archivedpartymember'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.PositiveSmallIntegerField(choices=[(1, '파티'), (2, '채팅')])),
+                ('term', models.CharField(max_length=4)),
+                ('party_id', models.BigIntegerField()),
+                ('doc_id', models.BigIntegerField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['party_id'], name='search_posting_party')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchposting',
+            constraint=models.UniqueConstraint(fields=('kind', 'term', 'doc_id', 'party_id'), name='unique_search_posting'),
+        ),
+    ]
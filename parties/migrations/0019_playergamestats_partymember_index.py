@@ -0,0 +1,50 @@
+# Generated by Django 4.2.27 on 2026-10-19 12:16
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_alter_user_phone'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('parties', '0018_searchposting'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlayerGameStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('joined_count', models.PositiveIntegerField(default=0)),
+                ('hosted_count', models.PositiveIntegerField(default=0)),
+                ('kicked_count', models.PositiveIntegerField(default=0)),
+                ('blacklisted_count', models.PositiveIntegerField(default=0)),
+                ('party_size_total', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-joined_count'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='partymember',
+            index=models.Index(fields=['user', '-joined_at'], name='party_member_user_joined'),
+        ),
+        migrations.AddField(
+            model_name='playergamestats',
+            name='game',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='player_stats', to='accounts.game'),
+        ),
+        migrations.AddField(
+            model_name='playergamestats',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='game_stats', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='playergamestats',
+            constraint=models.UniqueConstraint(fields=('user', 'game'), name='unique_player_game_stats'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.27 on 2026-10-19 12:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parties', '0019_playergamestats_partymember_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='partyjoinrequest',
+            name='status',
+            field=models.CharField(choices=[('PENDING', '대기'), ('APPROVED', '수락'), ('REJECTED', '거절'), ('CANCELLED', '취소'), ('EXPIRED', '만료')], default='PENDING', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='party',
+            index=models.Index(fields=['created_at'], name='party_created'),
+        ),
+        migrations.AddIndex(
+            model_name='partyjoinrequest',
+            index=models.Index(fields=['status', 'requested_at'], name='join_request_status_requested'),
+        ),
+        migrations.AddIndex(
+            model_name='partywaitlist',
+            index=models.Index(fields=['queued_at'], name='party_waitlist_queued'),
+        ),
+    ]
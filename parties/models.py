@@ -42,10 +42,16 @@ class Party(models.Model):
     pinned_updated_at = models.DateTimeField(null=True, blank=True)
     current_member_count = models.PositiveIntegerField(default=1)
     status = models.CharField(max_length=10, choices=Status.choices, default=Status.OPEN)
+    # 종료 후 하위 데이터(블랙리스트/신청/대기열/검색 색인) 정리를 백그라운드 리퍼에 맡긴 파티 표시
+    teardown_pending = models.BooleanField(default=False, db_index=True)
+    # CLOSED로 전환된 시각. 채팅 아카이브 보존 기간 계산 기준으로 사용함.
+    closed_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ["-created_at"]
+        # 로비 최신순 목록과 만료 스케줄러의 새 파티 로드가 사용함.
+        indexes = [models.Index(fields=["created_at"], name="party_created")]
 
 
 # 파티 참여 이력과 활성 상태를 관리하는 모델
@@ -58,6 +64,8 @@ class PartyMember(models.Model):
 
     class Meta:
         constraints = [models.UniqueConstraint(fields=["party", "user"], name="unique_party_member")]
+        # 프로필 참여 이력을 사용자별 최신순 keyset 페이지로 읽음. (ArchivedPartyMember와 같은 인덱스)
+        indexes = [models.Index(fields=["user", "-joined_at"], name="party_member_user_joined")]
 
 
 # 파티별 재입장 제한 대상을 관리하는 모델
@@ -77,6 +85,7 @@ class PartyJoinRequest(models.Model):
         APPROVED = "APPROVED", "수락"
         REJECTED = "REJECTED", "거절"
         CANCELLED = "CANCELLED", "취소"
+        EXPIRED = "EXPIRED", "만료"
 
     party = models.ForeignKey(Party, on_delete=models.CASCADE, related_name="join_requests")
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="party_join_requests")
@@ -94,6 +103,8 @@ class PartyJoinRequest(models.Model):
     class Meta:
         ordering = ["requested_at"]
         constraints = [models.UniqueConstraint(fields=["party", "user"], name="unique_party_join_request")]
+        # 만료 스케줄러가 마지막 로드 이후 들어온 PENDING 신청만 읽음.
+        indexes = [models.Index(fields=["status", "requested_at"], name="join_request_status_requested")]
 
 
 # 정원 초과 파티의 대기열을 관리하는 모델
@@ -105,3 +116,82 @@ class PartyWaitlist(models.Model):
     class Meta:
         ordering = ["queued_at"]
         constraints = [models.UniqueConstraint(fields=["party", "user"], name="unique_party_waitlist_entry")]
+        indexes = [models.Index(fields=["queued_at"], name="party_waitlist_queued")]
+
+
+# 종료 후 일정 기간이 지난 파티를 옮겨 두는 콜드 테이블임. (Party와 같은 컬럼, id 유지)
+# 로비/관리자 목록이 조회하는 Party 테이블을 작게 유지하기 위해 분리함.
+class ArchivedParty(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    host = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="archived_hosted_parties")
+    game = models.ForeignKey("accounts.Game", on_delete=models.PROTECT, related_name="archived_parties")
+    mic_required = models.BooleanField(default=False, verbose_name="마이크 필수")
+    mode = models.CharField(max_length=50)
+    description = models.TextField(blank=True)
+    max_members = models.PositiveIntegerField(default=5, verbose_name="최대 인원")
+    join_policy = models.CharField(max_length=12, choices=Party.JoinPolicy.choices, default=Party.JoinPolicy.INSTANT)
+    current_member_count = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=Party.Status.choices, default=Party.Status.CLOSED)
+    closed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+
+# 콜드 테이블로 옮겨진 파티의 참여 이력임. (PartyMember와 같은 컬럼, id 유지)
+class ArchivedPartyMember(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    party = models.ForeignKey(ArchivedParty, on_delete=models.CASCADE, related_name="members")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="archived_party_memberships")
+    joined_at = models.DateTimeField()
+    is_active = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["party", "user"], name="unique_archived_party_member")]
+        # 프로필 참여 이력은 사용자별 최신순으로만 조회함.
+        indexes = [models.Index(fields=["user", "-joined_at"], name="archived_member_user_joined")]
+
+
+# 파티 모드/설명과 채팅 본문의 n-gram 역색인임. (parties.search가 저장 시그널로 갱신함)
+# 파티 문서는 party_id = doc_id이고, 메시지 문서는 소속 파티 id를 함께 저장해 참여 파티 범위로 좁혀 조회함.
+# 문서를 지우는 경로가 많아 FK 없이 id만 들고 있으며, 정리는 리퍼/아카이브/파티 삭제 시그널이 맡음.
+class SearchPosting(models.Model):
+    class Kind(models.IntegerChoices):
+        PARTY = 1, "파티"
+        MESSAGE = 2, "채팅"
+
+    kind = models.PositiveSmallIntegerField(choices=Kind.choices)
+    term = models.CharField(max_length=4)
+    party_id = models.BigIntegerField()
+    doc_id = models.BigIntegerField()
+
+    class Meta:
+        constraints = [
+            # (kind, term, doc_id) 앞부분으로 term별 최신 문서 구간을 범위 조회함. party_id는 참여 파티 필터용으로 뒤에 둠.
+            models.UniqueConstraint(fields=["kind", "term", "doc_id", "party_id"], name="unique_search_posting"),
+        ]
+        indexes = [models.Index(fields=["party_id"], name="search_posting_party")]
+
+
+# 사용자별/게임별 참여 통계 롤업임. 멤버십/파티/블랙리스트 시그널이 F() 증가로 갱신하므로
+# 프로필은 참여 이력 전체를 집계하지 않고 게임 수만큼의 행만 읽음. (rebuild_player_stats로 다시 계산 가능)
+class PlayerGameStats(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="game_stats")
+    game = models.ForeignKey("accounts.Game", on_delete=models.CASCADE, related_name="player_stats")
+    joined_count = models.PositiveIntegerField(default=0)
+    hosted_count = models.PositiveIntegerField(default=0)
+    kicked_count = models.PositiveIntegerField(default=0)
+    blacklisted_count = models.PositiveIntegerField(default=0)
+    # 참여한 파티의 (현재) 최대 인원 합계. joined_count로 나눠 평균 정원을 보여줌.
+    party_size_total = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["user", "game"], name="unique_player_game_stats")]
+        ordering = ["-joined_count"]
+
+    @property
+    def average_party_size(self):
+        return round(self.party_size_total / self.joined_count, 1) if self.joined_count else 0
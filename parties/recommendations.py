@@ -0,0 +1,169 @@
+import heapq
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from accounts import directory
+from core.tracing import traced
+
+from .models import ArchivedParty, ArchivedPartyMember, Party, PartyMember
+from .signals import lobby_card_data
+
+# 로비 "추천" 탭의 사용자별 파티 피드임.
+# 점수 = 정적 점수(인원 충원율 + 호스트 이력) + 게임 친화도 x RECOMMEND_GAME_WEIGHT + 마이크 보너스.
+# 정적 점수는 사용자와 무관하므로 OPEN 파티 스냅샷을 RECOMMEND_SNAPSHOT_SECONDS마다 한 번 만들면서 계산하고,
+# (game_id, mic_required) 버킷마다 정적 점수 내림차순으로 정렬해 둠. 같은 버킷 안에서는 사용자 항이 상수라
+# 순서가 바뀌지 않으므로, 요청마다 버킷별 목록을 heapq.merge로 합쳐 상위 RECOMMEND_LIMIT개만 꺼내면 됨.
+# (OPEN 파티가 수천 개여도 요청당 비용은 버킷 수와 limit에만 비례함)
+# 사용자 게임 친화도(주 게임 + 참여 이력)와 최종 결과는 캐시에 짧게 저장함.
+
+AFFINITY_KEY = "reco:affinity:{}"
+FEED_KEY = "reco:feed:{}"
+
+# 호스트 이력 점수가 포화되는 개최 횟수임.
+HOST_HISTORY_CAP = 20
+
+
+class Snapshot:
+    def __init__(self, buckets, cards, built_at):
+        # (game_id, mic_required) -> [(정적 점수, party_id), ...] 정적 점수 내림차순
+        self.buckets = buckets
+        self.cards = cards
+        self.built_at = built_at
+
+    def __len__(self):
+        return len(self.cards)
+
+    # 사용자 항(게임 친화도/마이크)을 버킷 단위로 더해 상위 limit개를 (점수, party_id)로 반환함.
+    def top(self, affinity, mic_enabled, exclude=(), limit=20):
+        streams = []
+        for (game_id, mic_required), entries in self.buckets.items():
+            if mic_required and not mic_enabled:
+                continue
+            offset = affinity.get(game_id, 0.0) * settings.RECOMMEND_GAME_WEIGHT
+            if mic_required:
+                offset += settings.RECOMMEND_MIC_WEIGHT
+            streams.append(_shifted(entries, offset))
+        found = []
+        for score, party_id in heapq.merge(*streams, reverse=True):
+            if party_id in exclude:
+                continue
+            found.append((score, party_id))
+            if len(found) >= limit:
+                break
+        return found
+
+
+def _shifted(entries, offset):
+    for score, party_id in entries:
+        yield score + offset, party_id
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def _host_counts(host_ids):
+    counts = dict.fromkeys(host_ids, 0)
+    for model in (Party, ArchivedParty):
+        rows = model.objects.filter(host_id__in=host_ids).values("host_id").annotate(total=Count("id"))
+        for row in rows:
+            counts[row["host_id"]] += row["total"]
+    return counts
+
+
+def static_score(current_count, max_members, hosted_count):
+    fill = current_count / max_members if max_members else 0.0
+    history = min(1.0, math.log1p(hosted_count) / math.log1p(HOST_HISTORY_CAP))
+    return fill * settings.RECOMMEND_FILL_WEIGHT + history * settings.RECOMMEND_HOST_WEIGHT
+
+
+@traced("recommendations.build_snapshot")
+def build_snapshot():
+    parties = list(
+        Party.objects.filter(status=Party.Status.OPEN)
+        .only(
+            "id", "mode", "description", "mic_required", "join_policy", "current_member_count", "max_members",
+            "status", "host_id", "game_id",
+        )
+    )
+    host_ids = {party.host_id for party in parties}
+    hosted = _host_counts(host_ids)
+    directory.get_names(host_ids)
+    buckets, cards = {}, {}
+    for party in parties:
+        if party.current_member_count >= party.max_members:
+            continue
+        score = static_score(party.current_member_count, party.max_members, hosted[party.host_id])
+        buckets.setdefault((party.game_id, party.mic_required), []).append((score, party.id))
+        cards[party.id] = lobby_card_data(party)
+    for entries in buckets.values():
+        entries.sort(reverse=True)
+    return Snapshot(buckets, cards, time.monotonic())
+
+
+def get_snapshot():
+    global _snapshot
+    snapshot = _snapshot
+    if snapshot is None or time.monotonic() - snapshot.built_at >= settings.RECOMMEND_SNAPSHOT_SECONDS:
+        with _snapshot_lock:
+            if _snapshot is snapshot:
+                _snapshot = build_snapshot()
+            snapshot = _snapshot
+    return snapshot
+
+
+def reset_snapshot():
+    global _snapshot
+    with _snapshot_lock:
+        _snapshot = None
+
+
+# 게임별 친화도 {game_id: 0~1}. 주 게임은 1점, 참여 이력은 가장 많이 한 게임 대비 비율로 더한 뒤 최댓값으로 정규화함.
+def compute_affinity(user):
+    affinity = dict.fromkeys(user.main_games.values_list("id", flat=True), 1.0)
+    history = {}
+    for model in (PartyMember, ArchivedPartyMember):
+        rows = model.objects.filter(user_id=user.id).values("party__game_id").annotate(total=Count("id"))
+        for row in rows:
+            history[row["party__game_id"]] = history.get(row["party__game_id"], 0) + row["total"]
+    if history:
+        most = max(history.values())
+        for game_id, total in history.items():
+            affinity[game_id] = affinity.get(game_id, 0.0) + total / most
+    if not affinity:
+        return {}
+    top = max(affinity.values())
+    return {game_id: value / top for game_id, value in affinity.items()}
+
+
+def get_affinity(user):
+    key = AFFINITY_KEY.format(user.id)
+    affinity = cache.get(key)
+    if affinity is None:
+        affinity = compute_affinity(user)
+        cache.set(key, affinity, timeout=settings.RECOMMEND_AFFINITY_TTL)
+    return affinity
+
+
+def invalidate(user_id):
+    cache.delete_many([AFFINITY_KEY.format(user_id), FEED_KEY.format(user_id)])
+
+
+# 추천 파티 카드 목록을 반환함. 카드 형식은 로비 party_update와 같고 score가 더 붙음.
+@traced("recommendations.for_user")
+def for_user(user):
+    key = FEED_KEY.format(user.id)
+    feed = cache.get(key)
+    if feed is not None:
+        return feed
+    snapshot = get_snapshot()
+    joined = set(PartyMember.objects.filter(user_id=user.id, is_active=True).values_list("party_id", flat=True))
+    ranked = snapshot.top(get_affinity(user), user.mic_enabled, exclude=joined, limit=settings.RECOMMEND_LIMIT)
+    feed = [{**snapshot.cards[party_id], "score": round(score, 3)} for score, party_id in ranked]
+    cache.set(key, feed, timeout=settings.RECOMMEND_CACHE_TTL)
+    return feed
@@ -0,0 +1,334 @@
+import logging
+import math
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from accounts import directory
+from chat.models import ChatMessage
+from core.realtime import group_send_sync
+from core.tracing import traced
+
+from .models import Party, PartyJoinRequest, PartyMember, PartyWaitlist
+from .teardown import schedule_party_teardown
+
+logger = logging.getLogger(__name__)
+
+# 참가 신청/대기열 만료와 활동 없는 파티 종료를 맡는 스케줄러임. (run_party_scheduler 커맨드가 돌림)
+# 항목마다 마감 시각을 해시 타이머 휠에 올려 두고, 칸(tick)이 지날 때 그 칸에 든 항목만 꺼내므로
+# 대기 중인 타이머가 수십만 개여도 한 번에 확인하는 양은 칸 하나 크기임. 마감 시각은 DB에 이미 있는
+# requested_at/queued_at/활동 시각으로 계산하므로 별도 컬럼이 없고, 꺼낸 항목은 DB에서 다시 확인한 뒤에만 처리함.
+# (그 사이 다시 신청했거나 채팅이 있었으면 새 마감 시각으로 다시 올림)
+# 새 항목은 PARTY_SCHEDULER_POLL_SECONDS마다 마지막 로드 이후 생긴 행만 읽고,
+# 사라진 항목은 PARTY_SCHEDULER_RESYNC_SECONDS마다 전체를 다시 읽어 휠에서 뺌.
+# 만료는 배치 단위로 처리하고 영향을 받은 파티마다 entries_expired 이벤트를 하나만 보냄.
+
+JOIN_REQUEST, WAITLIST, PARTY = range(3)
+# 증분 로드는 이전 로드 시각보다 이만큼 앞에서 시작해 늦게 커밋된 행도 놓치지 않게 함. (중복 등록은 무시됨)
+LOAD_OVERLAP = timedelta(seconds=60)
+LOAD_CHUNK_SIZE = 2000
+
+
+# 타이머 키는 (pk << 2) | 종류인 정수임. 튜플 키보다 항목당 메모리가 작음.
+def timer_key(kind, pk):
+    return (pk << 2) | kind
+
+
+def split_key(key):
+    return key & 3, key >> 2
+
+
+class TimerWheel:
+    def __init__(self, tick_seconds, slots, now):
+        self.tick_seconds = tick_seconds
+        # 칸마다 {키: 만료 칸 번호}. 칸 수보다 먼 마감은 같은 칸에서 여러 바퀴를 기다림.
+        self._slots = [{} for _ in range(slots)]
+        # 키 -> 칸 위치. 다시 올리거나 취소할 때 칸을 뒤지지 않게 함.
+        self._where = {}
+        # 마지막으로 처리한 칸 번호. 이미 지난 마감은 다음 advance에서 바로 꺼내짐.
+        self.current = self._tick(now) - 1
+
+    def __len__(self):
+        return len(self._where)
+
+    def __contains__(self, key):
+        return key in self._where
+
+    def keys(self):
+        return self._where.keys()
+
+    def _tick(self, timestamp):
+        return int(timestamp // self.tick_seconds)
+
+    # 마감 시각(epoch 초)에 키를 올림. 이미 있으면 새 마감 시각으로 옮김. 마감보다 일찍 꺼내지는 일은 없음.
+    def schedule(self, key, deadline):
+        self.cancel(key)
+        tick = max(math.ceil(deadline / self.tick_seconds), self.current + 1)
+        slot = tick % len(self._slots)
+        self._slots[slot][key] = tick
+        self._where[key] = slot
+
+    def cancel(self, key):
+        slot = self._where.pop(key, None)
+        if slot is not None:
+            del self._slots[slot][key]
+
+    # now까지 지난 칸들을 돌며 마감된 키를 꺼내 반환함. 한 바퀴 이상 밀렸으면 모든 칸을 한 번씩만 확인함.
+    def advance(self, now):
+        target = self._tick(now)
+        if target <= self.current:
+            return []
+        size = len(self._slots)
+        if target - self.current >= size:
+            slots = range(size)
+        else:
+            slots = (tick % size for tick in range(self.current + 1, target + 1))
+
+        due = []
+        for slot in slots:
+            entries = self._slots[slot]
+            fired = [key for key, tick in entries.items() if tick <= target]
+            for key in fired:
+                del entries[key]
+                del self._where[key]
+            due.extend(fired)
+        self.current = target
+        return due
+
+
+# 파티의 첫 확인 시각을 정하는 간격(초). 비었는지는 생성 직후부터 봐야 하므로 둘 중 짧은 쪽을 씀.
+def _first_party_check():
+    limits = [limit for limit in (settings.PARTY_IDLE_SECONDS, settings.PARTY_EMPTY_GRACE_SECONDS) if limit]
+    return min(limits) if limits else 0
+
+
+class PartyScheduler:
+    def __init__(self, now=None):
+        now = now or timezone.now()
+        self.wheel = TimerWheel(
+            settings.PARTY_SCHEDULER_TICK_SECONDS, settings.PARTY_SCHEDULER_WHEEL_SLOTS, now.timestamp()
+        )
+        self.loaded_at = None
+        self.resynced_at = None
+
+    def __len__(self):
+        return len(self.wheel)
+
+    def _sources(self):
+        join_ttl = settings.PARTY_JOIN_REQUEST_TTL_SECONDS
+        waitlist_ttl = settings.PARTY_WAITLIST_TTL_SECONDS
+        party_check = _first_party_check()
+        if join_ttl:
+            yield JOIN_REQUEST, join_ttl, "requested_at", PartyJoinRequest.objects.filter(
+                status=PartyJoinRequest.Status.PENDING
+            )
+        if waitlist_ttl:
+            yield WAITLIST, waitlist_ttl, "queued_at", PartyWaitlist.objects.all()
+        if party_check:
+            yield PARTY, party_check, "created_at", Party.objects.exclude(status=Party.Status.CLOSED)
+
+    # 항목을 휠에 올림. 이미 올라간 키는 그대로 둠. (꺼낼 때 DB에서 다시 확인하므로 이른 마감은 무해함)
+    # full이면 DB에 없는 키를 휠에서 빼고, 아니면 마지막 로드 이후 생긴 행만 읽음.
+    def load(self, now, full=False):
+        since = None if full or self.loaded_at is None else self.loaded_at - LOAD_OVERLAP
+        live = set() if full else None
+        added = 0
+        for kind, ttl, field, queryset in self._sources():
+            if since is not None:
+                queryset = queryset.filter(**{f"{field}__gte": since})
+            for pk, started_at in queryset.values_list("pk", field).iterator(chunk_size=LOAD_CHUNK_SIZE):
+                key = timer_key(kind, pk)
+                if live is not None:
+                    live.add(key)
+                if key not in self.wheel:
+                    self.wheel.schedule(key, started_at.timestamp() + ttl)
+                    added += 1
+
+        if full:
+            for key in [key for key in self.wheel.keys() if key not in live]:
+                self.wheel.cancel(key)
+            self.resynced_at = time.monotonic()
+            logger.info("party scheduler resynced: %s timers", len(self.wheel))
+        self.loaded_at = now
+        return added
+
+    def _resync_due(self):
+        return self.resynced_at is None or time.monotonic() - self.resynced_at >= settings.PARTY_SCHEDULER_RESYNC_SECONDS
+
+    # 새 항목을 읽고 마감된 타이머를 배치 단위로 처리함. {"join_requests", "waitlist", "parties"} 처리 건수를 반환함.
+    # 배치는 트랜잭션/IN 절 크기만 나누고, 브로드캐스트는 모든 배치를 모은 뒤 파티마다 한 번만 보냄.
+    @traced("scheduler.run_once")
+    def run_once(self, now=None):
+        now = now or timezone.now()
+        self.load(now, full=self._resync_due())
+        due = self.wheel.advance(now.timestamp())
+
+        requests, waitlist, closed = defaultdict(list), defaultdict(list), set()
+        batch_size = settings.PARTY_SCHEDULER_BATCH_SIZE
+        for start in range(0, len(due), batch_size):
+            ids = defaultdict(list)
+            for key in due[start:start + batch_size]:
+                kind, pk = split_key(key)
+                ids[kind].append(pk)
+            closed |= self._close_parties(ids[PARTY], now)
+            for party_id, rows in self._expire_join_requests(ids[JOIN_REQUEST], now).items():
+                requests[party_id].extend(rows)
+            for party_id, user_ids in self._expire_waitlist(ids[WAITLIST], now).items():
+                waitlist[party_id].extend(user_ids)
+
+        self._broadcast(requests, waitlist, skip=closed)
+        return {
+            "join_requests": sum(len(rows) for rows in requests.values()),
+            "waitlist": sum(len(user_ids) for user_ids in waitlist.values()),
+            "parties": len(closed),
+        }
+
+    # 마감이 지난 PENDING 신청을 EXPIRED로 바꾸고 {party_id: [(신청 id, user_id)]}를 반환함.
+    def _expire_join_requests(self, ids, now):
+        ttl = settings.PARTY_JOIN_REQUEST_TTL_SECONDS
+        expired = defaultdict(list)
+        if not ids or not ttl:
+            return expired
+
+        cutoff = now - timedelta(seconds=ttl)
+        with transaction.atomic():
+            rows = PartyJoinRequest.objects.select_for_update().filter(
+                pk__in=ids, status=PartyJoinRequest.Status.PENDING
+            ).values_list("pk", "party_id", "user_id", "requested_at")
+            for pk, party_id, user_id, requested_at in rows:
+                if requested_at > cutoff:
+                    # 취소 후 다시 신청한 경우 등 기준 시각이 바뀌었으면 새 마감으로 다시 올림.
+                    self.wheel.schedule(timer_key(JOIN_REQUEST, pk), requested_at.timestamp() + ttl)
+                    continue
+                expired[party_id].append((pk, user_id))
+
+            PartyJoinRequest.objects.filter(pk__in=[pk for rows in expired.values() for pk, _ in rows]).update(
+                status=PartyJoinRequest.Status.EXPIRED, decided_at=now
+            )
+        return expired
+
+    # 마감이 지난 대기열 항목을 지우고 {party_id: [user_id]}를 반환함.
+    # 행을 잠가 두므로 같은 항목을 대기열 자동 입장(_promote_waitlist_entries)이 동시에 처리하지 않음.
+    def _expire_waitlist(self, ids, now):
+        ttl = settings.PARTY_WAITLIST_TTL_SECONDS
+        expired = defaultdict(list)
+        if not ids or not ttl:
+            return expired
+
+        cutoff = now - timedelta(seconds=ttl)
+        with transaction.atomic():
+            rows = PartyWaitlist.objects.select_for_update().filter(pk__in=ids).values_list(
+                "pk", "party_id", "user_id", "queued_at"
+            )
+            expired_ids = []
+            for pk, party_id, user_id, queued_at in rows:
+                if queued_at > cutoff:
+                    self.wheel.schedule(timer_key(WAITLIST, pk), queued_at.timestamp() + ttl)
+                    continue
+                expired_ids.append(pk)
+                expired[party_id].append(user_id)
+            PartyWaitlist.objects.filter(pk__in=expired_ids).delete()
+        return expired
+
+    # 마지막 활동(생성/입장/채팅)에서 PARTY_IDLE_SECONDS가 지났거나, 인원이 0명인 채로 PARTY_EMPTY_GRACE_SECONDS가
+    # 지난 파티를 종료함. 아직이면 마지막 활동 기준 새 마감으로 다시 올림. 종료한 파티 id 집합을 반환함.
+    def _close_parties(self, ids, now):
+        idle, grace = settings.PARTY_IDLE_SECONDS, settings.PARTY_EMPTY_GRACE_SECONDS
+        if not ids or not (idle or grace):
+            return set()
+
+        rows = list(
+            Party.objects.filter(pk__in=ids)
+            .exclude(status=Party.Status.CLOSED)
+            .values_list("pk", "current_member_count", "created_at")
+        )
+        party_ids = [pk for pk, _, _ in rows]
+        last_chat = dict(
+            ChatMessage.objects.filter(party_id__in=party_ids)
+            .values("party_id")
+            .annotate(last=Max("created_at"))
+            .values_list("party_id", "last")
+        )
+        last_join = dict(
+            PartyMember.objects.filter(party_id__in=party_ids)
+            .values("party_id")
+            .annotate(last=Max("joined_at"))
+            .values_list("party_id", "last")
+        )
+
+        to_close = []
+        for pk, count, created_at in rows:
+            limit = grace if count == 0 and grace else idle
+            if not limit:
+                # 활동 기준 종료를 끈 경우에도 비게 되는지는 계속 봐야 하므로 유예 시간 뒤에 다시 확인함.
+                self.wheel.schedule(timer_key(PARTY, pk), now.timestamp() + grace)
+                continue
+            last = max(value for value in (created_at, last_chat.get(pk), last_join.get(pk)) if value)
+            deadline = last + timedelta(seconds=limit)
+            if deadline > now:
+                self.wheel.schedule(timer_key(PARTY, pk), deadline.timestamp())
+                continue
+            to_close.append(pk)
+
+        closed = set()
+        for pk in to_close:
+            # 파티 행을 잠근 뒤 저장해 동시에 바뀐 방장/인원을 덮어쓰지 않게 함. 종료 이벤트는 Party 저장 시그널이 보냄.
+            with transaction.atomic():
+                party = Party.objects.select_for_update().filter(pk=pk).exclude(status=Party.Status.CLOSED).first()
+                if party is None:
+                    continue
+                schedule_party_teardown(party)
+            closed.add(pk)
+
+        if closed:
+            logger.info("idle parties closed: %s", len(closed))
+        return closed
+
+    # 영향을 받은 파티마다 entries_expired 이벤트를 하나씩 보냄. 대기 건수와 대기열 스냅샷은 배치 전체에 대해 한 번씩만 읽음.
+    def _broadcast(self, requests, waitlist, skip=()):
+        request_party_ids = set(requests) - set(skip)
+        waitlist_party_ids = set(waitlist) - set(skip)
+        if not request_party_ids and not waitlist_party_ids:
+            return
+
+        pending = dict(
+            PartyJoinRequest.objects.filter(party_id__in=request_party_ids, status=PartyJoinRequest.Status.PENDING)
+            .values("party_id")
+            .annotate(count=Count("pk"))
+            .values_list("party_id", "count")
+        )
+        queues = defaultdict(list)
+        if waitlist_party_ids:
+            for party_id, user_id in (
+                PartyWaitlist.objects.filter(party_id__in=waitlist_party_ids)
+                .order_by("queued_at")
+                .values_list("party_id", "user_id")
+            ):
+                queues[party_id].append(user_id)
+        names = directory.get_names([user_id for user_ids in queues.values() for user_id in user_ids])
+
+        for party_id in request_party_ids | waitlist_party_ids:
+            expired_requests = requests.get(party_id, [])
+            event = {
+                "type": "entries_expired",
+                "request_ids": [pk for pk, _ in expired_requests],
+                "request_user_ids": [user_id for _, user_id in expired_requests],
+                "pending_count": pending.get(party_id, 0) if party_id in request_party_ids else None,
+                "waitlist_user_ids": waitlist.get(party_id, []),
+                "waitlist": None,
+            }
+            if party_id in waitlist_party_ids:
+                user_ids = queues.get(party_id, [])
+                event["waitlist"] = {
+                    "count": len(user_ids),
+                    "entries": [
+                        {"user_id": user_id, "nickname": names.get(user_id, ""), "rank": rank}
+                        for rank, user_id in enumerate(user_ids, start=1)
+                    ],
+                }
+            group_send_sync(f"chat_{party_id}", event)
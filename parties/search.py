@@ -0,0 +1,206 @@
+import hashlib
+import re
+import unicodedata
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from accounts import directory
+from chat.models import ChatMessage
+from core.tracing import traced
+
+from .models import Party, PartyMember, SearchPosting
+
+# 파티 모드/설명과 채팅 본문 검색용 역색인임.
+# 본문을 NFKC + 소문자로 맞춘 뒤 단어마다 글자 2-gram으로 쪼개 SearchPosting에 (term, 문서) 행으로 저장함.
+# 한국어는 띄어쓰기/조사가 일정하지 않아 형태소 대신 2-gram을 쓰며, "칼바람"은 "칼바", "바람"으로 색인됨.
+# 검색은 질의의 2-gram을 모두 가진 문서를 (kind, term, doc_id) 인덱스 범위 조회 + GROUP BY로 찾으므로
+# LIKE '%...%' 테이블 스캔이 없고, 최신 문서부터 doc_id 커서로 페이지를 나눔.
+
+Kind = SearchPosting.Kind
+
+WORD_RE = re.compile(r"\w+")
+PARTY_DIGEST_KEY = "search:party:{}"
+# 종료되어 파티 문서를 지운 상태를 나타내는 해시 자리 값임.
+CLOSED_DIGEST = "closed"
+
+
+def _words(text):
+    return WORD_RE.findall(unicodedata.normalize("NFKC", text or "").lower())
+
+
+# 한 글자 단어는 그대로, 나머지는 2-gram으로 쪼갬.
+def tokenize(text):
+    terms = set()
+    for word in _words(text):
+        if len(word) == 1:
+            terms.add(word)
+            continue
+        terms.update(word[index:index + 2] for index in range(len(word) - 1))
+        if len(terms) >= settings.SEARCH_MAX_TERMS_PER_DOC:
+            break
+    return terms
+
+
+# 질의 term 목록임. 두 글자 이상 단어가 하나라도 있으면 한 글자 단어는 조건에서 뺌. (색인에 한 글자 조각이 없기 때문)
+def query_terms(query):
+    words = _words(query)
+    if any(len(word) > 1 for word in words):
+        words = [word for word in words if len(word) > 1]
+    return tokenize(" ".join(words))
+
+
+def _postings(kind, party_id, doc_id, terms):
+    return [SearchPosting(kind=kind, term=term, party_id=party_id, doc_id=doc_id) for term in terms]
+
+
+def _party_text(party):
+    return f"{party.mode} {party.description}"
+
+
+# 파티 문서를 다시 색인함. 저장할 때마다 호출되므로 본문 해시를 캐시에 두고 바뀌지 않았으면 DB를 건드리지 않음.
+# 종료된 파티는 검색 결과에 나오지 않도록 파티 문서만 지움. (채팅은 참여자 검색용이라 남김)
+def index_party(party, created=False):
+    key = PARTY_DIGEST_KEY.format(party.pk)
+    if party.status == Party.Status.CLOSED:
+        if cache.get(key) != CLOSED_DIGEST:
+            SearchPosting.objects.filter(kind=Kind.PARTY, party_id=party.pk, doc_id=party.pk).delete()
+            cache.set(key, CLOSED_DIGEST, timeout=None)
+        return
+    text = _party_text(party)
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+    if not created and cache.get(key) == digest:
+        return
+    if not created:
+        SearchPosting.objects.filter(kind=Kind.PARTY, party_id=party.pk, doc_id=party.pk).delete()
+    SearchPosting.objects.bulk_create(_postings(Kind.PARTY, party.pk, party.pk, tokenize(text)), ignore_conflicts=True)
+    cache.set(key, digest, timeout=None)
+
+
+# 채팅은 수정되지 않으므로 생성 시 한 번만 색인함. 시스템 메시지는 검색 대상이 아님.
+def index_message(message):
+    if message.is_system:
+        return
+    terms = tokenize(message.content)
+    SearchPosting.objects.bulk_create(_postings(Kind.MESSAGE, message.party_id, message.pk, terms), ignore_conflicts=True)
+
+
+def remove_party(party_id):
+    SearchPosting.objects.filter(party_id=party_id).delete()
+    cache.delete(PARTY_DIGEST_KEY.format(party_id))
+
+
+def remove_messages(party_id, message_ids):
+    SearchPosting.objects.filter(party_id=party_id, kind=Kind.MESSAGE, doc_id__in=message_ids).delete()
+
+
+# 질의 term을 모두 가진 문서 id를 최신순으로 반환함. party_ids를 주면 그 파티들 안에서만 찾음.
+# 흔한 term은 posting이 많으므로 최신 doc_id 구간부터 SEARCH_WINDOW 크기로 잘라 집계하고,
+# 한 페이지가 차지 않으면 구간을 4배씩 넓혀 과거로 내려감. 한 페이지를 채우는 데 필요한 구간만 읽게 됨.
+def search_ids(kind, query, party_ids=None, before=None, limit=20):
+    terms = query_terms(query)
+    if not terms:
+        return []
+    postings = SearchPosting.objects.filter(kind=kind, term__in=terms)
+    if party_ids is not None:
+        postings = postings.filter(party_id__in=party_ids)
+    if before is None:
+        newest = postings.order_by("-doc_id").values_list("doc_id", flat=True).first()
+        if newest is None:
+            return []
+        before = newest + 1
+
+    found = []
+    window = settings.SEARCH_WINDOW
+    while before > 0 and len(found) < limit:
+        floor = max(0, before - window)
+        rows = (
+            postings.filter(doc_id__lt=before, doc_id__gte=floor)
+            .values("doc_id")
+            .annotate(hits=Count("id"))
+            .filter(hits__gte=len(terms))
+            .order_by("-doc_id")
+            .values_list("doc_id", flat=True)[:limit - len(found)]
+        )
+        found.extend(rows)
+        before, window = floor, window * 4
+    return found
+
+
+def _page(ids, limit):
+    return ids[:limit], (ids[limit - 1] if len(ids) > limit else None)
+
+
+# 파티 검색 결과 한 페이지와 다음 커서를 반환함. (카드 형식은 로비와 같음)
+@traced("search.parties")
+def search_parties(query, before=None, limit=20):
+    from .signals import lobby_card_data
+
+    ids, next_cursor = _page(search_ids(Kind.PARTY, query, before=before, limit=limit + 1), limit)
+    parties = Party.objects.in_bulk(ids)
+    directory.get_names(party.host_id for party in parties.values())
+    # 종료 직후 색인이 지워지기 전(on_commit 전)에 조회된 파티도 로비 카드로 내보내지 않음.
+    return [
+        lobby_card_data(parties[pk]) for pk in ids if pk in parties and parties[pk].status != Party.Status.CLOSED
+    ], next_cursor
+
+
+# 사용자가 참여했던 파티의 채팅만 검색함.
+@traced("search.messages")
+def search_messages(user, query, before=None, limit=20):
+    party_ids = PartyMember.objects.filter(user_id=user.id).values("party_id")
+    ids, next_cursor = _page(
+        search_ids(Kind.MESSAGE, query, party_ids=party_ids, before=before, limit=limit + 1), limit
+    )
+    messages = ChatMessage.objects.in_bulk(ids)
+    results = [
+        {
+            "id": message.id,
+            "party_id": message.party_id,
+            "sender": message.sender_name,
+            "content": message.content,
+            "created_at": message.created_at.isoformat(),
+        }
+        for message in (messages.get(pk) for pk in ids)
+        if message is not None
+    ]
+    return results, next_cursor
+
+
+# 기존 데이터를 색인함. 이미 있는 행은 무시하므로 중단된 뒤 다시 실행해도 됨.
+def rebuild(batch_size=1000):
+    totals = {"parties": 0, "messages": 0}
+    last_id = 0
+    while True:
+        batch = list(
+            Party.objects.filter(pk__gt=last_id)
+            .exclude(status=Party.Status.CLOSED)
+            .order_by("pk")
+            .only("id", "mode", "description")[:batch_size]
+        )
+        if not batch:
+            break
+        SearchPosting.objects.bulk_create(
+            [posting for party in batch for posting in _postings(Kind.PARTY, party.pk, party.pk, tokenize(_party_text(party)))],
+            ignore_conflicts=True,
+        )
+        totals["parties"] += len(batch)
+        last_id = batch[-1].pk
+
+    last_id = 0
+    while True:
+        batch = list(
+            ChatMessage.objects.filter(pk__gt=last_id, is_system=False)
+            .order_by("pk")
+            .only("id", "party_id", "content")[:batch_size]
+        )
+        if not batch:
+            break
+        SearchPosting.objects.bulk_create(
+            [posting for message in batch for posting in _postings(Kind.MESSAGE, message.party_id, message.pk, tokenize(message.content))],
+            ignore_conflicts=True,
+        )
+        totals["messages"] += len(batch)
+        last_id = batch[-1].pk
+    return totals
@@ -1,44 +1,72 @@
+from functools import partial
+
 from django.db import transaction as db_transaction
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
-from .models import Party, PartyMember
+from django.utils import timezone
+from accounts import catalog, directory
+from accounts.models import User
+from core.realtime import group_send_sync
+from core.tracing import traced
+from . import counters, matchmaking, search, stats
+from .models import BlackList, Party, PartyMember
+
+# 로비 카드 렌더링에 필요한 최소 데이터임. (추천 피드도 같은 형식을 씀)
+# 게임 이름은 카탈로그, 호스트 이름은 표시 이름 디렉터리에서 찾으므로 관계를 로드하지 않아도 됨.
+# 여러 카드를 만들 때는 directory.get_names로 호스트 이름을 먼저 한 번에 채워 둘 것.
+def lobby_card_data(party):
+    return {
+        "id": party.id,
+        "title": party.mode,
+        "game": catalog.name(party.game_id),
+        "host": directory.get_name(party.host_id),
+        "description": party.description or "",
+        "mic_required": party.mic_required,
+        "join_policy": party.join_policy,
+        "current_count": party.current_member_count,
+        "max_members": party.max_members,
+        "status": party.get_status_display(),
+        "status_code": party.status,
+    }
+
 
 @receiver(post_save, sender=PartyMember)
+@traced("signal.handle_member_change")
 def handle_member_change(sender, instance, created, **kwargs):
     # instance는 "방금 저장된 PartyMember 한 건"임.
     party = instance.party
-    user = instance.user
     # 강퇴에서 온 비활성화인지 구분하기 위한 임시 플래그(뷰에서 주입)
     kicked_by_host = getattr(instance, "_kicked", False)
-    channel_layer = get_channel_layer()
 
     # 방장 본인이 비활성화되면(=나가기), 자동 위임 로직을 수행함.
     host_left = (instance.user_id == party.host_id and not instance.is_active)
     new_host_name = None
 
+    # 활성 멤버 id를 한 번만 읽어 위임 대상/인원수/브로드캐스트 데이터에 함께 사용함.
+    # 이름은 user를 JOIN하지 않고 디렉터리에서 한 번에 찾음.
+    member_ids = list(
+        party.members.filter(is_active=True).order_by('joined_at').values_list('user_id', flat=True)
+    )
+    names = directory.get_names([*member_ids, instance.user_id])
+
     if host_left:
         # joined_at 오름차순 = 가장 먼저 들어온 활성 멤버가 우선권
-        successor = (
-            party.members
-            .filter(is_active=True)
-            .exclude(user_id=instance.user_id)
-            .select_related('user')
-            .order_by('joined_at')
-            .first()
+        successor_id = next(
+            (user_id for user_id in member_ids if user_id != instance.user_id),
+            None,
         )
-        if successor:
+        if successor_id:
             # 새 방장 지정
-            party.host = successor.user
-            new_host_name = successor.user.nickname or successor.user.username
+            party.host_id = successor_id
+            stats.host_changed(party, instance.user_id)
+            new_host_name = names.get(successor_id, "")
         else:
             # 남은 사람이 없으면 파티 종료 상태로 전환
             party.status = Party.Status.CLOSED
+            party.closed_at = timezone.now()
 
     # 현재 활성 인원을 다시 계산해 파티 스냅샷을 최신화함.
-    active_count = party.members.filter(is_active=True).count()
-    party.current_member_count = active_count
+    party.current_member_count = len(member_ids)
 
     # CLOSED가 아니라면 인원수 기준으로 OPEN/FULL을 자동 전환함.
     if party.status != Party.Status.CLOSED:
@@ -54,17 +82,16 @@ def handle_member_change(sender, instance, created, **kwargs):
     party_id = party.id
     count = party.current_member_count
 
-    active_members = party.members.filter(is_active=True).select_related('user').order_by('joined_at')
     members_data = [
         {
-            'id': member.user.id,
-            'nickname': member.user.nickname if member.user.nickname else member.user.username,
-            'is_host': (member.user_id == party.host_id),
+            'id': user_id,
+            'nickname': names.get(user_id, ""),
+            'is_host': (user_id == party.host_id),
         }
-        for member in active_members
+        for user_id in member_ids
     ]
 
-    user_name = getattr(user, 'nickname', None) or user.username
+    user_name = names.get(instance.user_id, "")
     system_message = None
 
     if created:
@@ -85,23 +112,22 @@ def handle_member_change(sender, instance, created, **kwargs):
         _members_data=members_data,
         _system_message=system_message,
         _new_host_msg=new_host_msg,
-        _channel_layer=channel_layer,
     ):
-        async_to_sync(_channel_layer.group_send)(
+        group_send_sync(
             f"chat_{_party_id}",
             {"type": "count_update", "count": _count},
         )
-        async_to_sync(_channel_layer.group_send)(
+        group_send_sync(
             f"chat_{_party_id}",
             {"type": "member_list_update", "members": _members_data},
         )
         if _system_message:
-            async_to_sync(_channel_layer.group_send)(
+            group_send_sync(
                 f"chat_{_party_id}",
                 {"type": "system_message", "message": _system_message, "sender": "시스템"},
             )
         if _new_host_msg:
-            async_to_sync(_channel_layer.group_send)(
+            group_send_sync(
                 f"chat_{_party_id}",
                 {"type": "system_message", "message": _new_host_msg, "sender": "시스템"},
             )
@@ -111,55 +137,117 @@ def handle_member_change(sender, instance, created, **kwargs):
 
 # Party 저장 직후 실행되어, 로비 카드/채팅방 종료 이벤트를 동기화하는 시그널 핸들러임.
 @receiver(post_save, sender=Party)
+@traced("signal.broadcast_party_update")
 def broadcast_party_update(sender, instance, created, **kwargs):
-    channel_layer = get_channel_layer()
     party_id = instance.id
+    # 게임별 모집 현황 카운터에 넘길 현재 상태 (게임 이름은 카드 데이터를 만든 뒤 채움)
+    counter_row = [
+        party_id, instance.game_id, None, instance.status, instance.current_member_count, instance.max_members
+    ]
 
     # 종료 상태면 로비 카드 삭제 + 채팅방 종료 이벤트를 보냄.
     if instance.status == Party.Status.CLOSED:
         def _send_closed(
             _party_id=party_id,
-            _channel_layer=channel_layer,
+            _counter_row=counter_row,
         ):
-            async_to_sync(_channel_layer.group_send)(
+            group_send_sync(
                 "lobby", {"type": "party_deleted", "party_id": _party_id}
             )
-            async_to_sync(_channel_layer.group_send)(
+            group_send_sync(
                 f"chat_{_party_id}", {"type": "party_killed"}
             )
+            counters.party_changed(*_counter_row)
         db_transaction.on_commit(_send_closed)
         return
 
-    # 로비 카드 업데이트에 필요한 최소 데이터만 전송함.
-    data = {
-        "id": instance.id,
-        "title": instance.mode,
-        "game": instance.game.name,
-        "host": instance.host.nickname if instance.host.nickname else instance.host.username,
-        "description": instance.description or "",
-        "mic_required": instance.mic_required,
-        "join_policy": instance.join_policy,
-        "current_count": instance.current_member_count,
-        "max_members": instance.max_members,
-        "status": instance.get_status_display(),
-        "status_code": instance.status,
-    }
+    data = lobby_card_data(instance)
     is_new = created
+    counter_row[2] = data["game"]
 
     # 생성/수정 모두 party_update로 처리하고, is_new 플래그로 프론트 분기
     def _send(
         _party_id=party_id,
         _data=data,
         _is_new=is_new,
-        _channel_layer=channel_layer,
+        _counter_row=counter_row,
     ):
-        async_to_sync(_channel_layer.group_send)(
+        group_send_sync(
             "lobby",
             {"type": "party_update", "party_data": _data, "is_new": _is_new},
         )
-        async_to_sync(_channel_layer.group_send)(
+        group_send_sync(
             f"chat_{_party_id}",
             {"type": "party_meta_update", "party": _data},
         )
+        counters.party_changed(*_counter_row)
 
     db_transaction.on_commit(_send)
+
+
+# 빠른 참가 인덱스 갱신임. 멤버 입장/퇴장은 handle_member_change가 파티 인원/상태를 저장하면서 여기로 이어짐.
+@receiver(post_save, sender=Party)
+def update_matchmaking_index(sender, instance, **kwargs):
+    db_transaction.on_commit(partial(matchmaking.party_changed, instance))
+
+
+@receiver(post_delete, sender=Party)
+def remove_from_matchmaking_index(sender, instance, **kwargs):
+    db_transaction.on_commit(partial(matchmaking.party_removed, instance.id))
+
+
+# 종료 없이 바로 삭제된 파티(관리자 삭제 등)의 기여값을 게임별 카운터에서 뺌.
+@receiver(post_delete, sender=Party)
+def remove_from_lobby_counters(sender, instance, **kwargs):
+    db_transaction.on_commit(partial(counters.party_removed, instance.id))
+
+
+# 검색 색인 갱신임. 모드/설명이 그대로면 index_party가 캐시된 해시만 보고 넘어감.
+@receiver(post_save, sender=Party)
+def update_search_index(sender, instance, created, **kwargs):
+    db_transaction.on_commit(partial(search.index_party, instance, created))
+
+
+@receiver(post_delete, sender=Party)
+def remove_from_search_index(sender, instance, **kwargs):
+    db_transaction.on_commit(partial(search.remove_party, instance.id))
+
+
+# 추천 피드 캐시 무효화임. (recommendations가 lobby_card_data를 쓰므로 순환 import를 피해 함수 안에서 import함)
+@receiver(post_save, sender=PartyMember)
+def invalidate_recommendations(sender, instance, **kwargs):
+    from . import recommendations
+
+    db_transaction.on_commit(partial(recommendations.invalidate, instance.user_id))
+
+
+@receiver(m2m_changed, sender=User.main_games.through)
+def invalidate_affinity(sender, instance, action, reverse, pk_set, **kwargs):
+    from . import recommendations
+
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    user_ids = (pk_set or ()) if reverse else (instance.pk,)
+    for user_id in user_ids:
+        recommendations.invalidate(user_id)
+
+
+# 프로필 통계 롤업 갱신임. 같은 트랜잭션 안에서 F() 증가로 반영해 롤백되면 함께 취소됨.
+@receiver(post_save, sender=PartyMember)
+def update_member_stats(sender, instance, created, **kwargs):
+    if created:
+        stats.member_joined(instance.party, instance.user_id)
+    if getattr(instance, "_kicked", False):
+        stats.member_kicked(instance.party, instance.user_id)
+
+
+@receiver(post_save, sender=Party)
+def update_host_stats(sender, instance, created, **kwargs):
+    if created:
+        stats.party_hosted(instance)
+
+
+@receiver(post_save, sender=BlackList)
+def update_blacklist_stats(sender, instance, created, **kwargs):
+    if created:
+        stats.blacklisted(instance.party, instance.user_id)
@@ -0,0 +1,120 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .models import ArchivedParty, ArchivedPartyMember, BlackList, Party, PartyMember, PlayerGameStats
+
+# 프로필 통계 롤업(PlayerGameStats) 갱신임. 시그널에서 (user, game) 행 하나를 F()로 증가시키므로
+# 참여 이력이 아무리 길어도 갱신/조회 비용이 일정함. 보통 UPDATE 한 번이고 첫 기록일 때만 INSERT가 더해짐.
+
+
+def bump(user_id, game_id, **deltas):
+    changes = {field: F(field) + value for field, value in deltas.items()}
+    updated = PlayerGameStats.objects.filter(user_id=user_id, game_id=game_id).update(
+        updated_at=timezone.now(), **changes
+    )
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            PlayerGameStats.objects.create(user_id=user_id, game_id=game_id, **deltas)
+    except IntegrityError:
+        # 동시에 첫 행을 만든 요청이 있으면 그 행에 더함.
+        PlayerGameStats.objects.filter(user_id=user_id, game_id=game_id).update(
+            updated_at=timezone.now(), **changes
+        )
+
+
+def member_joined(party, user_id):
+    bump(user_id, party.game_id, joined_count=1, party_size_total=party.max_members)
+
+
+def member_kicked(party, user_id):
+    bump(user_id, party.game_id, kicked_count=1)
+
+
+def party_hosted(party):
+    bump(party.host_id, party.game_id, hosted_count=1)
+
+
+# 개최 수는 "지금 방장인 파티" 기준이라(rebuild와 동일) 방장이 바뀌면 이전 방장에서 빼서 새 방장에 더함.
+def host_changed(party, previous_host_id):
+    PlayerGameStats.objects.filter(user_id=previous_host_id, game_id=party.game_id, hosted_count__gt=0).update(
+        updated_at=timezone.now(), hosted_count=F("hosted_count") - 1
+    )
+    bump(party.host_id, party.game_id, hosted_count=1)
+
+
+# 정원 합계도 파티의 현재 max_members 기준이라(rebuild와 동일) 정원이 바뀌면 그 파티 참여자 행에 차이만큼 반영함.
+def party_resized(party, previous_max_members):
+    delta = party.max_members - previous_max_members
+    if not delta:
+        return
+    PlayerGameStats.objects.filter(
+        game_id=party.game_id,
+        user_id__in=PartyMember.objects.filter(party=party).values("user_id"),
+    ).update(updated_at=timezone.now(), party_size_total=F("party_size_total") + delta)
+
+
+def blacklisted(party, user_id):
+    bump(user_id, party.game_id, blacklisted_count=1)
+
+
+def for_user(user):
+    return list(PlayerGameStats.objects.filter(user=user).select_related("game"))
+
+
+def _totals(rows):
+    totals = {}
+    for row in rows:
+        entry = totals.setdefault((row["user_id"], row["game_id"]), {})
+        for field, value in row.items():
+            if field not in ("user_id", "game_id"):
+                entry[field] = entry.get(field, 0) + (value or 0)
+    return totals
+
+
+# 핫/콜드 테이블에서 참여 수, (현재 방장 기준) 개최 수, (현재 정원 기준) 정원 합계를 다시 계산함.
+# 강퇴/블랙리스트는 종료 파티가 정리될 때 함께 지워지므로, 이미 있는 값은 유지하고 새 행에만 현재 블랙리스트 수를 넣음.
+# (앱에서 블랙리스트는 강퇴할 때만 생기므로 새 행의 강퇴 수도 같은 값으로 채움)
+def rebuild():
+    rows = []
+    for model in (PartyMember, ArchivedPartyMember):
+        rows += model.objects.values("user_id", game_id=F("party__game_id")).annotate(
+            joined_count=Count("id"), party_size_total=Sum("party__max_members")
+        )
+    for model in (Party, ArchivedParty):
+        rows += model.objects.values("game_id", user_id=F("host_id")).annotate(hosted_count=Count("id"))
+    totals = _totals(rows)
+    for row in BlackList.objects.values("user_id", game_id=F("party__game_id")).annotate(total=Count("id")):
+        totals.setdefault((row["user_id"], row["game_id"]), {})["seed_blacklisted"] = row["total"]
+
+    now = timezone.now()
+    with transaction.atomic():
+        existing = {
+            (stats.user_id, stats.game_id): stats
+            for stats in PlayerGameStats.objects.select_for_update()
+        }
+        created, updated = [], []
+        for (user_id, game_id), entry in totals.items():
+            values = {
+                "joined_count": entry.get("joined_count", 0),
+                "hosted_count": entry.get("hosted_count", 0),
+                "party_size_total": entry.get("party_size_total", 0),
+            }
+            stats = existing.get((user_id, game_id))
+            if stats is None:
+                seed = entry.get("seed_blacklisted", 0)
+                created.append(
+                    PlayerGameStats(user_id=user_id, game_id=game_id, kicked_count=seed, blacklisted_count=seed, **values)
+                )
+                continue
+            for field, value in values.items():
+                setattr(stats, field, value)
+            stats.updated_at = now
+            updated.append(stats)
+        PlayerGameStats.objects.bulk_create(created, batch_size=1000)
+        PlayerGameStats.objects.bulk_update(
+            updated, ["joined_count", "hosted_count", "party_size_total", "updated_at"], batch_size=1000
+        )
+    return {"created": len(created), "updated": len(updated)}
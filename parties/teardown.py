@@ -0,0 +1,102 @@
+import logging
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import BlackList, Party, PartyJoinRequest, PartyWaitlist, SearchPosting
+
+logger = logging.getLogger(__name__)
+
+# 리퍼가 정리하는 하위 테이블 목록임. (통계 키, 모델)
+# 채팅 메시지와 참여 이력(PartyMember)은 지우지 않고 남겨 둠. 보존 기간이 지나면 archive_chat_history가 채팅을 파일로,
+# archive_closed_parties가 파티/참여 이력을 콜드 테이블로 옮긴 뒤 삭제함.
+# 검색 색인은 파티/메시지 문서를 party_id로 함께 들고 있으므로 같은 방식으로 청크 삭제함. (종료 파티는 검색되지 않음)
+TEARDOWN_TARGETS = (
+    ("search_postings", SearchPosting),
+    ("blacklist", BlackList),
+    ("join_requests", PartyJoinRequest),
+    ("waitlist", PartyWaitlist),
+)
+
+
+def _chunk_size():
+    return getattr(settings, "PARTY_TEARDOWN_CHUNK_SIZE", 500)
+
+
+def _chunk_pause():
+    return getattr(settings, "PARTY_TEARDOWN_PAUSE", 0.05)
+
+
+# 파티 종료를 즉시 표시하고 하위 데이터 정리는 리퍼에 넘김.
+# 요청 스레드에서는 Party 한 건만 갱신하므로 대량 삭제 락을 잡지 않음.
+def schedule_party_teardown(party):
+    party.status = Party.Status.CLOSED
+    party.closed_at = timezone.now()
+    party.teardown_pending = True
+    party.save()
+
+
+# pk 목록 단위로 잘라서 삭제해 한 번에 잡히는 row lock 범위를 제한함.
+def _delete_in_chunks(queryset, chunk_size, pause, on_chunk=None):
+    deleted = 0
+    model = queryset.model
+    while True:
+        ids = list(queryset.order_by("pk").values_list("pk", flat=True)[:chunk_size])
+        if not ids:
+            break
+
+        model.objects.filter(pk__in=ids).delete()
+        deleted += len(ids)
+        if on_chunk:
+            on_chunk(len(ids))
+
+        if len(ids) < chunk_size:
+            break
+        if pause:
+            time.sleep(pause)
+    return deleted
+
+
+# 파티 하나의 하위 데이터를 청크 단위로 정리하고 삭제 건수를 반환함.
+def reap_party(party, chunk_size=None, pause=None, on_chunk=None):
+    chunk_size = chunk_size or _chunk_size()
+    pause = _chunk_pause() if pause is None else pause
+    stats = {}
+
+    # 고정 공지는 하위 데이터를 지우기 전에 먼저 풀어, 종료 파티 화면이 지워지는 중인 데이터를 가리키지 않게 함.
+    if party.pinned_message_id:
+        Party.objects.filter(pk=party.pk).update(pinned_message=None)
+
+    for key, model in TEARDOWN_TARGETS:
+        stats[key] = _delete_in_chunks(
+            model.objects.filter(party_id=party.pk),
+            chunk_size,
+            pause,
+            on_chunk=(lambda n, _key=key: on_chunk(party.pk, _key, n)) if on_chunk else None,
+        )
+
+    Party.objects.filter(pk=party.pk).update(teardown_pending=False)
+    logger.info("party %s teardown finished: %s", party.pk, stats)
+    return stats
+
+
+# 정리 대기 중인 파티들을 순서대로 처리하고 누적 통계를 반환함.
+def reap_pending_parties(limit=None, chunk_size=None, pause=None, on_chunk=None):
+    queryset = Party.objects.filter(teardown_pending=True, status=Party.Status.CLOSED).order_by("pk")
+    if limit:
+        queryset = queryset[:limit]
+
+    totals = {"parties": 0, "elapsed": 0.0}
+    for key, _model in TEARDOWN_TARGETS:
+        totals[key] = 0
+
+    started = time.monotonic()
+    for party in queryset:
+        stats = reap_party(party, chunk_size=chunk_size, pause=pause, on_chunk=on_chunk)
+        totals["parties"] += 1
+        for key, count in stats.items():
+            totals[key] += count
+
+    totals["elapsed"] = round(time.monotonic() - started, 3)
+    return totals
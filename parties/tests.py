@@ -1,3 +1,636 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# parties 앱 테스트를 추가할 때 사용하는 기본 모듈임.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts import catalog, directory
+from chat.models import ChatMessage
+from core.testing import QueryBudgetMixin, make_game, make_user
+from . import counters, history, matchmaking, recommendations, scheduler, search, stats
+from .lifecycle import ARCHIVED_MEMBER_FIELDS, ARCHIVED_PARTY_FIELDS, archive_closed_parties
+from .teardown import reap_pending_parties, schedule_party_teardown
+from . import urls as party_urls
+from .models import (
+    ArchivedParty,
+    ArchivedPartyMember,
+    BlackList,
+    Party,
+    PartyJoinRequest,
+    PartyMember,
+    PartyWaitlist,
+    PlayerGameStats,
+    SearchPosting,
+)
+
+IN_MEMORY_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+
+# 뷰/시그널별 최대 쿼리 수임. 키는 parties/urls.py의 URL name이며 ":" 뒤는 같은 URL의 다른 분기임.
+# 예산을 늘려야 한다면 실패 메시지에 찍힌 SQL과 호출 위치부터 확인할 것.
+VIEW_QUERY_BUDGETS = {
+    "party_list": 4,
+    "party_create": 3,
+    "party_create:post": 16,
+    "party_detail": 9,
+    "party_detail:host": 10,
+    "party_join": 20,
+    "party_join:approval": 12,
+    "party_join_request_cancel": 9,
+    "party_leave": 16,
+    "party_settings_update": 18,
+    "party_kick": 22,
+    "party_transfer_host": 11,
+    "party_pin_notice": 9,
+    "party_unpin_notice": 7,
+    "party_join_request_approve": 23,
+    "party_join_request_reject": 7,
+    "party_quick_join": 18,
+    "party_quick_join:queued": 4,
+    "party_quick_join_cancel": 2,
+    "party_for_you": 9,
+    "party_for_you:cached": 2,
+    "party_search": 5,
+    "party_search:message": 5,
+}
+
+SIGNAL_QUERY_BUDGETS = {
+    "handle_member_change": 7,
+    "broadcast_party_update": 3,
+}
+
+
+# 호스트/멤버 둘이 있는 파티 하나와 외부 사용자를 공유하는 기본 픽스처임.
+class PartyFixtureTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.game = make_game()
+        cls.host = make_user(1)
+        cls.member = make_user(2)
+        cls.outsider = make_user(3)
+        cls.party = Party.objects.create(host=cls.host, game=cls.game, mode="랭크", max_members=5)
+        PartyMember.objects.create(party=cls.party, user=cls.host)
+        PartyMember.objects.create(party=cls.party, user=cls.member)
+        cls.message = ChatMessage.objects.create(party=cls.party, user=cls.member, content="hi", sender_name="nick2")
+
+    def setUp(self):
+        # 캐시와 이름/게임 디렉터리는 테스트 트랜잭션 롤백 뒤에도 남으므로 이전 테스트의 id가 섞이지 않게 비움.
+        cache.clear()
+        directory.reset()
+        catalog.reset()
+        # 매치메이커 티커 스레드는 테스트 트랜잭션 밖의 DB 연결을 쓰므로 띄우지 않음. 필요한 테스트는 place_changed를 직접 부름.
+        ticker = mock.patch.object(matchmaking, "_ensure_ticker")
+        ticker.start()
+        self.addCleanup(ticker.stop)
+
+    def call(self, name, user, method="get", data=None, **kwargs):
+        self.client.force_login(user)
+        return self.send(name, method=method, data=data, **kwargs)
+
+    # 로그인된 클라이언트로 요청하고 on_commit 콜백까지 실행함.
+    def send(self, name, method="get", data=None, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.client, method)(reverse(name, kwargs=kwargs), data or {})
+        self.assertLess(response.status_code, 400)
+        return response
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYERS, MATCHMAKING_RESYNC_SECONDS=3600)
+class PartyQueryBudgetTests(QueryBudgetMixin, PartyFixtureTestCase):
+    def setUp(self):
+        super().setUp()
+        # 예산은 평상시 워커 상태 기준으로 잼: 매치메이커 인덱스, 검색 색인, 이름 디렉터리, 로비 카운터가 이미 채워져 있음.
+        # setUpTestData의 파티는 on_commit 없이 만들어졌으므로 색인/인덱스를 여기서 채움.
+        matchmaking.resync()
+        recommendations.reset_snapshot()
+        search.index_party(self.party)
+        directory.get_names([self.host.pk, self.member.pk, self.outsider.pk])
+        counters.reconcile(broadcast=False)
+
+    def request(self, name, user, method="get", budget_key=None, data=None, **kwargs):
+        budget_key = budget_key or name
+        self.client.force_login(user)
+        with self.assertQueryBudget(VIEW_QUERY_BUDGETS[budget_key], budget_key):
+            return self.send(name, method=method, data=data, **kwargs)
+
+    def make_approval_party(self):
+        approval_host = make_user(10)
+        with self.captureOnCommitCallbacks(execute=True):
+            party = Party.objects.create(
+                host=approval_host, game=self.game, mode="내전", join_policy=Party.JoinPolicy.APPROVAL
+            )
+        PartyMember.objects.create(party=party, user=approval_host)
+        join_request = PartyJoinRequest.objects.create(party=party, user=self.outsider)
+        return approval_host, party, join_request
+
+    def test_every_party_url_has_a_budget(self):
+        names = {pattern.name for pattern in party_urls.urlpatterns}
+        budgeted = {key.split(":")[0] for key in VIEW_QUERY_BUDGETS}
+        self.assertEqual(names - budgeted, set())
+
+    def test_party_list(self):
+        response = self.request("party_list", self.member)
+        self.assertContains(response, '<span data-role="host">nick1</span>', html=False)
+
+    def test_party_create(self):
+        self.request("party_create", self.outsider)
+        self.request(
+            "party_create",
+            self.outsider,
+            method="post",
+            budget_key="party_create:post",
+            data={"game": self.game.pk, "mode": "일반", "description": "", "max_members": 5, "join_policy": "INSTANT"},
+        )
+
+    def test_party_detail(self):
+        # 대기자/신청자가 늘어도 이름은 디렉터리에서 한 번에 찾으므로 예산이 그대로여야 함.
+        waiting, applicant = make_user(20), make_user(21)
+        directory.get_names([waiting.pk, applicant.pk])
+        PartyWaitlist.objects.create(party=self.party, user=waiting)
+        PartyJoinRequest.objects.create(party=self.party, user=applicant)
+
+        response = self.request("party_detail", self.member, pk=self.party.pk)
+        self.assertContains(response, "1. nick20")
+        self.assertNotContains(response, "nick21")
+        response = self.request("party_detail", self.host, budget_key="party_detail:host", pk=self.party.pk)
+        self.assertContains(response, "nick21")
+
+    def test_party_join(self):
+        self.request("party_join", self.outsider, method="post", pk=self.party.pk)
+
+    def test_party_join_approval(self):
+        _, party, join_request = self.make_approval_party()
+        join_request.delete()
+        self.request("party_join", self.outsider, method="post", budget_key="party_join:approval", pk=party.pk)
+
+    def test_party_join_request_cancel(self):
+        _, party, _ = self.make_approval_party()
+        self.request("party_join_request_cancel", self.outsider, method="post", pk=party.pk)
+
+    def test_party_leave(self):
+        self.request("party_leave", self.member, method="post", pk=self.party.pk)
+
+    def test_party_settings_update(self):
+        self.request(
+            "party_settings_update",
+            self.host,
+            method="post",
+            data={"mode": "칼바람", "description": "설명", "max_members": 6},
+            party_id=self.party.pk,
+        )
+
+    def test_party_kick(self):
+        self.request("party_kick", self.host, method="post", party_id=self.party.pk, user_id=self.member.pk)
+
+    def test_party_transfer_host(self):
+        self.request("party_transfer_host", self.host, method="post", party_id=self.party.pk, user_id=self.member.pk)
+
+    def test_party_pin_and_unpin_notice(self):
+        self.request("party_pin_notice", self.host, method="post", party_id=self.party.pk, message_id=self.message.pk)
+        self.request("party_unpin_notice", self.host, method="post", party_id=self.party.pk)
+
+    def test_party_join_request_approve(self):
+        approval_host, party, join_request = self.make_approval_party()
+        self.request(
+            "party_join_request_approve",
+            approval_host,
+            method="post",
+            party_id=party.pk,
+            request_id=join_request.pk,
+        )
+
+    def test_party_join_request_reject(self):
+        approval_host, party, join_request = self.make_approval_party()
+        self.request(
+            "party_join_request_reject",
+            approval_host,
+            method="post",
+            party_id=party.pk,
+            request_id=join_request.pk,
+        )
+
+    def test_party_quick_join(self):
+        self.request("party_quick_join", self.outsider, method="post")
+
+    def test_party_quick_join_queued(self):
+        self.outsider.main_games.set([make_game("valorant", "Valorant")])
+        self.request("party_quick_join", self.outsider, method="post", budget_key="party_quick_join:queued")
+
+    def test_party_quick_join_cancel(self):
+        matchmaking.enqueue(self.outsider.pk, set(), False)
+        self.request("party_quick_join_cancel", self.outsider, method="post")
+
+    def test_party_for_you(self):
+        self.request("party_for_you", self.outsider)
+        self.request("party_for_you", self.outsider, budget_key="party_for_you:cached")
+
+    def test_party_search(self):
+        self.request("party_search", self.member, data={"q": "랭크"})
+        self.request("party_search", self.member, budget_key="party_search:message", data={"q": "hi", "type": "message"})
+
+    def test_handle_member_change_signal(self):
+        party = Party.objects.get(pk=self.party.pk)
+        with self.assertQueryBudget(SIGNAL_QUERY_BUDGETS["handle_member_change"], "handle_member_change"):
+            with self.captureOnCommitCallbacks(execute=True):
+                PartyMember.objects.create(party=party, user=self.outsider)
+
+    def test_broadcast_party_update_signal(self):
+        party = Party.objects.get(pk=self.party.pk)
+        party.description = "변경"
+        with self.assertQueryBudget(SIGNAL_QUERY_BUDGETS["broadcast_party_update"], "broadcast_party_update"):
+            with self.captureOnCommitCallbacks(execute=True):
+                party.save(update_fields=["description"])
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYERS, MATCHMAKING_RESYNC_SECONDS=3600)
+class QuickJoinTests(PartyFixtureTestCase):
+    def setUp(self):
+        super().setUp()
+        # 매치메이커 인덱스와 대기표는 프로세스 메모리에 있으므로 현재 DB 기준으로 다시 만들고 비움.
+        matchmaking.resync()
+        matchmaking._tickets.clear()
+        matchmaking._changed.clear()
+        matchmaking._wakeup.clear()
+
+    def test_joins_an_open_party_of_a_main_game(self):
+        self.call("party_quick_join", self.outsider, method="post")
+        self.assertTrue(PartyMember.objects.filter(party=self.party, user=self.outsider, is_active=True).exists())
+
+    def test_queues_until_a_party_opens(self):
+        other_game = make_game("valorant", "Valorant")
+        self.outsider.main_games.set([other_game])
+        response = self.call("party_quick_join", self.outsider, method="post")
+        self.assertEqual(response.json()["status"], "queued")
+
+        # 맞는 게임의 파티가 열려도 파티를 저장한 요청은 인덱스만 갱신하고 티커 스레드를 깨움.
+        new_host = make_user(20)
+        with mock.patch.object(matchmaking, "reserve_seat") as reserve_seat:
+            with self.captureOnCommitCallbacks(execute=True):
+                party = Party.objects.create(host=new_host, game=other_game, mode="경쟁")
+                PartyMember.objects.create(party=party, user=new_host)
+        reserve_seat.assert_not_called()
+        self.assertEqual(list(matchmaking._changed), [party.pk])
+        self.assertTrue(matchmaking._wakeup.is_set())
+
+        # 티커 스레드 차례에 대기표가 자리를 잡음.
+        matchmaking.place_changed()
+        self.assertTrue(PartyMember.objects.filter(party=party, user=self.outsider, is_active=True).exists())
+        self.assertFalse(matchmaking.is_queued(self.outsider.pk))
+        self.assertEqual(list(matchmaking._changed), [])
+
+    def test_cancel_leaves_the_queue(self):
+        matchmaking.enqueue(self.outsider.pk, set(), False)
+        response = self.call("party_quick_join_cancel", self.outsider, method="post")
+        self.assertTrue(response.json()["cancelled"])
+        self.assertFalse(matchmaking.is_queued(self.outsider.pk))
+
+    def test_cancel_handled_by_another_worker_stops_placement(self):
+        other_game = make_game("valorant", "Valorant")
+        matchmaking.enqueue(self.outsider.pk, {other_game.pk}, False)
+        # 다른 워커의 취소는 이 워커 메모리의 대기표는 건드리지 못하고 공유 캐시 키만 지움.
+        cache.delete(matchmaking.TICKET_CACHE_KEY.format(user_id=self.outsider.pk))
+
+        new_host = make_user(20)
+        with self.captureOnCommitCallbacks(execute=True):
+            party = Party.objects.create(host=new_host, game=other_game, mode="경쟁")
+            PartyMember.objects.create(party=party, user=new_host)
+        matchmaking.place_changed()
+        self.assertFalse(PartyMember.objects.filter(party=party, user=self.outsider).exists())
+        self.assertNotIn(self.outsider.pk, matchmaking._tickets)
+
+    def test_requeue_on_another_worker_supersedes_the_old_ticket(self):
+        other_game = make_game("valorant", "Valorant")
+        matchmaking.enqueue(self.outsider.pk, {other_game.pk}, False)
+        stale = matchmaking._tickets[self.outsider.pk]
+        cache.set(matchmaking.TICKET_CACHE_KEY.format(user_id=self.outsider.pk), "other-worker")
+        self.assertFalse(stale.is_active())
+        self.assertTrue(matchmaking.is_queued(self.outsider.pk))
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYERS)
+class RecommendationTests(PartyFixtureTestCase):
+    def setUp(self):
+        super().setUp()
+        recommendations.reset_snapshot()
+
+    def test_main_games_first_and_joined_parties_excluded(self):
+        other_game = make_game("valorant", "Valorant")
+        self.outsider.main_games.set([other_game])
+        other_host = make_user(20)
+        other = Party.objects.create(host=other_host, game=other_game, mode="경쟁", max_members=5)
+        PartyMember.objects.create(party=other, user=other_host)
+        mic_party = Party.objects.create(host=other_host, game=other_game, mode="보이스", mic_required=True)
+        PartyMember.objects.create(party=mic_party, user=other_host)
+
+        ids = [card["id"] for card in self.call("party_for_you", self.outsider).json()["parties"]]
+        # 주 게임 파티가 먼저 오고, 마이크를 끈 사용자에게 마이크 필수 파티는 나오지 않음.
+        self.assertEqual(ids, [other.pk, self.party.pk])
+
+        # 이미 참여 중인 파티는 빠짐. (멤버 변경 시 결과 캐시가 무효화됨)
+        with self.captureOnCommitCallbacks(execute=True):
+            PartyMember.objects.create(party=other, user=self.outsider)
+        ids = [card["id"] for card in self.call("party_for_you", self.outsider).json()["parties"]]
+        self.assertNotIn(other.pk, ids)
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYERS)
+class PartySearchTests(PartyFixtureTestCase):
+    def test_party_postings_follow_description_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            party = Party.objects.create(host=self.outsider, game=self.game, mode="칼바람 나락", description="즐겜 하실 분")
+        response = self.call("party_search", self.member, data={"q": "칼바람"})
+        self.assertEqual([card["id"] for card in response.json()["results"]], [party.pk])
+
+        # 설명이 바뀌면 이전 n-gram은 더 이상 걸리지 않음.
+        with self.captureOnCommitCallbacks(execute=True):
+            party.description = "빡겜만"
+            party.save(update_fields=["description"])
+        self.assertEqual(search.search_ids(SearchPosting.Kind.PARTY, "즐겜"), [])
+        self.assertEqual(search.search_ids(SearchPosting.Kind.PARTY, "빡겜"), [party.pk])
+
+    def test_closed_parties_leave_party_search(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            left = Party.objects.create(host=self.outsider, game=self.game, mode="칼바람 나락")
+            PartyMember.objects.create(party=left, user=self.outsider)
+            idle = Party.objects.create(host=self.member, game=self.game, mode="칼바람 내전")
+            ChatMessage.objects.create(party=idle, user=self.member, content="칼바람 고고", sender_name="nick2")
+        self.assertEqual(search.search_ids(SearchPosting.Kind.PARTY, "칼바람"), [idle.pk, left.pk])
+
+        # 마지막 멤버가 나가서 닫힌 파티와 스케줄러가 닫은 파티 모두 검색에서 빠짐.
+        self.call("party_leave", self.outsider, method="post", pk=left.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule_party_teardown(idle)
+        self.assertEqual(search.search_ids(SearchPosting.Kind.PARTY, "칼바람"), [])
+        self.assertEqual(self.call("party_search", self.member, data={"q": "칼바람"}).json()["results"], [])
+        # 채팅은 참여자 검색용이라 남음.
+        self.assertEqual(search.search_ids(SearchPosting.Kind.MESSAGE, "칼바람"), [ChatMessage.objects.get(party=idle).pk])
+
+    def test_message_search_pages_within_joined_parties(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for index in range(3):
+                ChatMessage.objects.create(party=self.party, user=self.member, content=f"오늘 내전 {index}판", sender_name="nick2")
+            other = Party.objects.create(host=self.outsider, game=self.game, mode="일반")
+            ChatMessage.objects.create(party=other, user=self.outsider, content="오늘 내전 구해요", sender_name="nick3")
+
+        query = {"q": "내전", "type": "message", "limit": 2}
+        first = self.call("party_search", self.member, data=query).json()
+        second = self.call("party_search", self.member, data={**query, "cursor": first["next_cursor"]}).json()
+        contents = [message["content"] for message in first["results"] + second["results"]]
+        self.assertEqual(contents, ["오늘 내전 2판", "오늘 내전 1판", "오늘 내전 0판"])
+        self.assertIsNone(second["next_cursor"])
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYERS)
+class LobbyCounterTests(PartyFixtureTestCase):
+    def setUp(self):
+        super().setUp()
+        # setUpTestData의 파티는 on_commit 없이 만들어졌으므로 DB 기준 재계산으로 카운터를 채움.
+        counters.reconcile(broadcast=False)
+
+    def counts(self):
+        return {entry["id"]: entry for entry in counters.get_counts()}[self.game.pk]
+
+    def test_counters_follow_member_changes(self):
+        self.assertEqual((self.counts()["open"], self.counts()["full"], self.counts()["seats"]), (1, 0, 3))
+        with self.captureOnCommitCallbacks(execute=True):
+            for index in (30, 31, 32):
+                PartyMember.objects.create(party=self.party, user=make_user(index))
+        self.assertEqual((self.counts()["open"], self.counts()["full"], self.counts()["seats"]), (0, 1, 0))
+
+        # 증분 갱신 결과가 DB 기준 재계산과 같아야 함.
+        self.assertEqual(counters.read(), counters.reconcile(broadcast=False))
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYERS)
+class PlayerStatsTests(PartyFixtureTestCase):
+    def snapshot(self):
+        return list(
+            PlayerGameStats.objects.order_by("user_id").values_list(
+                "user_id", "joined_count", "hosted_count", "party_size_total"
+            )
+        )
+
+    def test_transfer_resize_and_succession_match_rebuild(self):
+        self.call("party_transfer_host", self.host, method="post", party_id=self.party.pk, user_id=self.member.pk)
+        self.call(
+            "party_settings_update",
+            self.member,
+            method="post",
+            data={"mode": "랭크", "description": "", "max_members": 8},
+            party_id=self.party.pk,
+        )
+        self.assertEqual(
+            self.snapshot(), [(self.host.pk, 1, 0, 8), (self.member.pk, 1, 1, 8)]
+        )
+
+        # 방장이 나가면 남은 멤버에게 자동 위임되고, 개최 수도 함께 넘어감.
+        self.call("party_leave", self.member, method="post", pk=self.party.pk)
+        self.assertEqual(
+            self.snapshot(), [(self.host.pk, 1, 1, 8), (self.member.pk, 1, 0, 8)]
+        )
+
+        # 증분 갱신 결과가 DB 기준 재계산과 같아야 함.
+        before = self.snapshot()
+        stats.rebuild()
+        self.assertEqual(self.snapshot(), before)
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYERS)
+class PartyTeardownTests(TestCase):
+    def setUp(self):
+        self.game = make_game()
+        self.host = make_user(1)
+        self.party = Party.objects.create(
+            host=self.host, game=self.game, mode="내전", join_policy=Party.JoinPolicy.APPROVAL
+        )
+        PartyMember.objects.create(party=self.party, user=self.host)
+        guests = [make_user(index) for index in range(2, 7)]
+        for guest in guests:
+            BlackList.objects.create(party=self.party, user=guest)
+        PartyJoinRequest.objects.create(party=self.party, user=guests[0])
+        PartyWaitlist.objects.create(party=self.party, user=guests[1])
+        self.message = ChatMessage.objects.create(party=self.party, user=self.host, content="공지")
+        self.party.pinned_message = self.message
+        self.party.save(update_fields=["pinned_message"])
+        search.index_party(self.party)
+
+    def test_only_pending_closed_parties_are_reaped(self):
+        other = Party.objects.create(host=make_user(9), game=self.game, mode="일반")
+        BlackList.objects.create(party=other, user=self.host)
+
+        self.assertEqual(reap_pending_parties()["parties"], 0)
+        schedule_party_teardown(self.party)
+        totals = reap_pending_parties(pause=0)
+
+        self.assertEqual(totals["parties"], 1)
+        self.assertEqual((totals["blacklist"], totals["join_requests"], totals["waitlist"]), (5, 1, 1))
+        self.party.refresh_from_db()
+        self.assertFalse(self.party.teardown_pending)
+        self.assertEqual(self.party.status, Party.Status.CLOSED)
+        self.assertTrue(BlackList.objects.filter(party=other).exists())
+        # 다시 돌려도 이미 정리한 파티는 대상이 아님.
+        self.assertEqual(reap_pending_parties()["parties"], 0)
+
+    def test_deletes_in_chunks(self):
+        self.assertTrue(SearchPosting.objects.filter(party_id=self.party.pk).exists())
+        schedule_party_teardown(self.party)
+        chunks = []
+        reap_pending_parties(chunk_size=2, pause=0, on_chunk=lambda party_id, key, count: chunks.append((key, count)))
+
+        self.assertEqual([count for key, count in chunks if key == "blacklist"], [2, 2, 1])
+        self.assertFalse(BlackList.objects.filter(party=self.party).exists())
+        self.assertFalse(SearchPosting.objects.filter(party_id=self.party.pk).exists())
+
+    def test_keeps_chat_and_member_history_for_archivers(self):
+        schedule_party_teardown(self.party)
+        reap_pending_parties(pause=0)
+
+        # 고정 공지는 먼저 풀리지만 메시지/참여 이력은 아카이브 커맨드가 옮길 때까지 남음.
+        self.party.refresh_from_db()
+        self.assertIsNone(self.party.pinned_message_id)
+        self.assertTrue(ChatMessage.objects.filter(pk=self.message.pk).exists())
+        self.assertTrue(PartyMember.objects.filter(party=self.party, user=self.host).exists())
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYERS)
+class PartyArchiveTests(TestCase):
+    def setUp(self):
+        self.game = make_game()
+        self.host = make_user(1)
+        self.player = make_user(2)
+        self.old = self.make_party("지난 판", closed_days=60)
+        PartyMember.objects.filter(party=self.old, user=self.player).update(is_active=False)
+        BlackList.objects.create(party=self.old, user=make_user(3))
+        self.chatty = self.make_party("채팅 남음", closed_days=60)
+        ChatMessage.objects.create(party=self.chatty, user=self.host, content="아직 아카이브 전")
+        self.recent = self.make_party("최근 종료", closed_days=1)
+        self.open = Party.objects.create(host=self.host, game=self.game, mode="모집 중")
+
+    def make_party(self, mode, closed_days):
+        party = Party.objects.create(host=self.host, game=self.game, mode=mode, max_members=4)
+        PartyMember.objects.create(party=party, user=self.host)
+        PartyMember.objects.create(party=party, user=self.player)
+        closed_at = timezone.now() - timedelta(days=closed_days)
+        Party.objects.filter(pk=party.pk).update(status=Party.Status.CLOSED, closed_at=closed_at)
+        return party
+
+    def history(self):
+        matches = history.match_page(self.player, limit=10)[0]
+        return [(match.id, match.joined_at, match.is_active, match.party_id, match.party.mode, match.party.game_id) for match in matches]
+
+    def test_moves_closed_parties_field_for_field(self):
+        party_row = Party.objects.filter(pk=self.old.pk).values(*ARCHIVED_PARTY_FIELDS).get()
+        member_rows = list(PartyMember.objects.filter(party=self.old).order_by("pk").values(*ARCHIVED_MEMBER_FIELDS))
+        stats_before = list(PlayerGameStats.objects.order_by("pk").values())
+        history_before = self.history()
+
+        self.assertEqual(archive_closed_parties(days=30), {"parties": 1, "members": 2})
+
+        self.assertEqual(ArchivedParty.objects.filter(pk=self.old.pk).values(*ARCHIVED_PARTY_FIELDS).get(), party_row)
+        self.assertEqual(
+            list(ArchivedPartyMember.objects.filter(party_id=self.old.pk).order_by("pk").values(*ARCHIVED_MEMBER_FIELDS)),
+            member_rows,
+        )
+        self.assertFalse(Party.objects.filter(pk=self.old.pk).exists())
+        self.assertFalse(PartyMember.objects.filter(party_id=self.old.pk).exists())
+        self.assertFalse(BlackList.objects.filter(party_id=self.old.pk).exists())
+        # 채팅이 남았거나 보존 기간이 안 된 파티, 진행 중인 파티는 그대로 둠.
+        self.assertEqual(
+            set(Party.objects.values_list("pk", flat=True)), {self.chatty.pk, self.recent.pk, self.open.pk}
+        )
+        self.assertEqual(list(PlayerGameStats.objects.order_by("pk").values()), stats_before)
+        self.assertEqual(self.history(), history_before)
+
+    def test_rerun_is_a_no_op(self):
+        archive_closed_parties(days=30)
+        self.assertEqual(archive_closed_parties(days=30), {"parties": 0, "members": 0})
+        self.assertEqual(ArchivedPartyMember.objects.count(), 2)
+
+@override_settings(
+    CHANNEL_LAYERS=IN_MEMORY_LAYERS,
+    PARTY_JOIN_REQUEST_TTL_SECONDS=600,
+    PARTY_WAITLIST_TTL_SECONDS=600,
+    PARTY_IDLE_SECONDS=3600,
+    PARTY_EMPTY_GRACE_SECONDS=300,
+    PARTY_SCHEDULER_BATCH_SIZE=2,
+)
+class PartySchedulerTests(TestCase):
+    def setUp(self):
+        directory.reset()
+        self.game = make_game()
+        self.host = make_user(1)
+        self.party = Party.objects.create(
+            host=self.host, game=self.game, mode="내전", max_members=2, join_policy=Party.JoinPolicy.APPROVAL
+        )
+        PartyMember.objects.create(party=self.party, user=self.host)
+        self.now = timezone.now()
+
+    def age(self, queryset, field, seconds):
+        queryset.update(**{field: self.now - timedelta(seconds=seconds)})
+
+    def test_timer_wheel_fires_on_deadline_only(self):
+        wheel = scheduler.TimerWheel(1, 8, 1000)
+        wheel.schedule("a", 1003.5)
+        wheel.schedule("b", 1020)
+        wheel.schedule("c", 1005)
+        wheel.cancel("c")
+        self.assertEqual(wheel.advance(1003), [])
+        self.assertEqual(wheel.advance(1004), ["a"])
+        # 칸 수보다 먼 마감은 한 바퀴 이상 건너뛰어도 정확히 한 번만 꺼내짐.
+        self.assertEqual(wheel.advance(1019), [])
+        self.assertEqual(wheel.advance(1100), ["b"])
+        self.assertEqual(len(wheel), 0)
+
+    def test_expires_stale_entries_with_one_broadcast_per_party(self):
+        stale = [make_user(index) for index in (2, 3, 4)]
+        fresh = make_user(5)
+        for user in stale[:2] + [fresh]:
+            PartyJoinRequest.objects.create(party=self.party, user=user)
+        PartyWaitlist.objects.create(party=self.party, user=stale[2])
+        self.age(PartyJoinRequest.objects.exclude(user=fresh), "requested_at", 700)
+        self.age(PartyWaitlist.objects.all(), "queued_at", 700)
+        ChatMessage.objects.create(party=self.party, user=self.host, content="hi")
+
+        with mock.patch.object(scheduler, "group_send_sync") as send:
+            totals = scheduler.PartyScheduler(now=self.now).run_once(self.now)
+
+        self.assertEqual(totals, {"join_requests": 2, "waitlist": 1, "parties": 0})
+        statuses = dict(PartyJoinRequest.objects.values_list("user_id", "status"))
+        self.assertEqual(statuses[stale[0].pk], PartyJoinRequest.Status.EXPIRED)
+        self.assertEqual(statuses[fresh.pk], PartyJoinRequest.Status.PENDING)
+        self.assertFalse(PartyWaitlist.objects.exists())
+
+        send.assert_called_once()
+        group, event = send.call_args.args
+        self.assertEqual(group, f"chat_{self.party.pk}")
+        self.assertEqual(sorted(event["request_user_ids"]), [stale[0].pk, stale[1].pk])
+        self.assertEqual((event["pending_count"], event["waitlist_user_ids"]), (1, [stale[2].pk]))
+        self.assertEqual(event["waitlist"], {"count": 0, "entries": []})
+
+    def test_reschedules_entries_renewed_after_loading(self):
+        join_request = PartyJoinRequest.objects.create(party=self.party, user=make_user(2))
+        self.age(PartyJoinRequest.objects.all(), "requested_at", 500)
+        party_scheduler = scheduler.PartyScheduler(now=self.now)
+        party_scheduler.load(self.now, full=True)
+
+        # 휠에 올라간 뒤 다시 신청해 기준 시각이 바뀌었으면 원래 마감에는 만료되지 않음.
+        PartyJoinRequest.objects.filter(pk=join_request.pk).update(requested_at=self.now)
+        later = self.now + timedelta(seconds=200)
+        self.assertEqual(party_scheduler.run_once(later)["join_requests"], 0)
+        self.assertEqual(party_scheduler.run_once(later + timedelta(seconds=500))["join_requests"], 1)
+
+    def test_closes_idle_and_empty_parties(self):
+        busy = Party.objects.create(host=make_user(2), game=self.game, mode="일반")
+        PartyMember.objects.create(party=busy, user=busy.host)
+        empty = Party.objects.create(host=make_user(3), game=self.game, mode="일반", current_member_count=0)
+        self.age(Party.objects.all(), "created_at", 4000)
+        self.age(PartyMember.objects.all(), "joined_at", 4000)
+        ChatMessage.objects.create(party=busy, user=busy.host, content="아직 있음")
+        self.age(Party.objects.filter(pk=empty.pk), "created_at", 400)
+
+        with mock.patch.object(scheduler, "group_send_sync"):
+            totals = scheduler.PartyScheduler(now=self.now).run_once(self.now)
+
+        self.assertEqual(totals["parties"], 2)
+        closed = set(Party.objects.filter(status=Party.Status.CLOSED, teardown_pending=True).values_list("pk", flat=True))
+        self.assertEqual(closed, {self.party.pk, empty.pk})
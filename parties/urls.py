@@ -5,6 +5,10 @@ from . import views
 urlpatterns = [
     path("parties/", views.PartyListView.as_view(), name="party_list"),
     path("parties/create/", views.PartyCreateView.as_view(), name="party_create"),
+    path("parties/search/", views.PartySearchView.as_view(), name="party_search"),
+    path("parties/for-you/", views.PartyForYouView.as_view(), name="party_for_you"),
+    path("parties/quick-join/", views.QuickJoinView.as_view(), name="party_quick_join"),
+    path("parties/quick-join/cancel/", views.QuickJoinCancelView.as_view(), name="party_quick_join_cancel"),
     path("parties/<int:pk>/", views.PartyDetailView.as_view(), name="party_detail"),
     path("parties/<int:pk>/join/", views.PartyJoinView.as_view(), name="party_join"),
     path("parties/<int:pk>/join/cancel/", views.CancelJoinRequestView.as_view(), name="party_join_request_cancel"),
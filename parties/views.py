@@ -1,7 +1,6 @@
 from urllib.parse import quote
 
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.db import transaction
 from django.http import JsonResponse
@@ -9,15 +8,18 @@ from django.shortcuts import get_object_or_404, redirect
 from django.utils import timezone
 from django.views.generic import CreateView, DetailView, ListView, View
 
+from accounts import catalog, directory
 from accounts.mixins import VerifiedEmailRequiredMixin
+from core.mixins import ReplicaReadMixin
+from core.realtime import group_send_sync
+from core.tracing import traced
+from chat.archive import party_chat_history
 from chat.models import ChatMessage
+from . import counters, matchmaking, recommendations, search, stats
 from .forms import PartyForm
 from .mixins import NotInBlackListMixin
 from .models import BlackList, Party, PartyJoinRequest, PartyMember, PartyWaitlist
-
-
-def _display_name(user):
-    return user.nickname if user.nickname else user.username
+from .teardown import schedule_party_teardown
 
 
 def _waitlist_rank(party, user_id):
@@ -27,20 +29,21 @@ def _waitlist_rank(party, user_id):
     return None
 
 
+@traced("party.broadcast_member_snapshot")
 def _broadcast_member_snapshot(party):
-    channel_layer = get_channel_layer()
-
-    active_members = party.members.filter(is_active=True).select_related("user").order_by("joined_at")
+    # 멤버 목록은 user_id만 읽고 이름은 디렉터리에서 한 번에 찾음.
+    member_ids = list(party.members.filter(is_active=True).order_by("joined_at").values_list("user_id", flat=True))
+    names = directory.get_names(member_ids)
     members_data = [
         {
-            "id": member.user.id,
-            "nickname": _display_name(member.user),
-            "is_host": member.user_id == party.host_id,
+            "id": user_id,
+            "nickname": names.get(user_id, ""),
+            "is_host": user_id == party.host_id,
         }
-        for member in active_members
+        for user_id in member_ids
     ]
 
-    async_to_sync(channel_layer.group_send)(
+    group_send_sync(
         f"chat_{party.id}",
         {
             "type": "member_list_update",
@@ -48,7 +51,7 @@ def _broadcast_member_snapshot(party):
         },
     )
 
-    async_to_sync(channel_layer.group_send)(
+    group_send_sync(
         f"chat_{party.id}",
         {
             "type": "count_update",
@@ -57,33 +60,34 @@ def _broadcast_member_snapshot(party):
     )
 
 
+@traced("party.broadcast_waitlist_update")
 def _broadcast_waitlist_update(party):
-    channel_layer = get_channel_layer()
-    wait_entries = list(party.waitlist_entries.select_related("user").order_by("queued_at"))
+    wait_user_ids = list(party.waitlist_entries.order_by("queued_at").values_list("user_id", flat=True))
+    names = directory.get_names(wait_user_ids)
 
     data = [
         {
-            "user_id": entry.user_id,
-            "nickname": _display_name(entry.user),
+            "user_id": user_id,
+            "nickname": names.get(user_id, ""),
             "rank": idx,
         }
-        for idx, entry in enumerate(wait_entries, start=1)
+        for idx, user_id in enumerate(wait_user_ids, start=1)
     ]
 
-    async_to_sync(channel_layer.group_send)(
+    group_send_sync(
         f"chat_{party.id}",
         {
             "type": "waitlist_update",
-            "count": len(wait_entries),
+            "count": len(wait_user_ids),
             "entries": data,
         },
     )
 
 
+@traced("party.broadcast_join_request_update")
 def _broadcast_join_request_update(party, action, join_request):
-    channel_layer = get_channel_layer()
 
-    async_to_sync(channel_layer.group_send)(
+    group_send_sync(
         f"chat_{party.id}",
         {
             "type": "join_request_update",
@@ -92,17 +96,17 @@ def _broadcast_join_request_update(party, action, join_request):
             "request": {
                 "id": join_request.id,
                 "user_id": join_request.user_id,
-                "nickname": _display_name(join_request.user),
+                "nickname": directory.get_name(join_request.user_id),
                 "status": join_request.status,
             },
         },
     )
 
 
+@traced("party.broadcast_join_request_result")
 def _broadcast_join_request_result(party, join_request):
-    channel_layer = get_channel_layer()
 
-    async_to_sync(channel_layer.group_send)(
+    group_send_sync(
         f"chat_{party.id}",
         {
             "type": "join_request_result",
@@ -113,10 +117,10 @@ def _broadcast_join_request_result(party, join_request):
     )
 
 
+@traced("party.broadcast_join_request_result_custom")
 def _broadcast_join_request_result_custom(party, user_id, status, message):
-    channel_layer = get_channel_layer()
 
-    async_to_sync(channel_layer.group_send)(
+    group_send_sync(
         f"chat_{party.id}",
         {
             "type": "join_request_result",
@@ -131,14 +135,12 @@ def _pinned_notice_payload(party):
     if not party.pinned_message_id:
         return None
 
-    pinned = ChatMessage.objects.select_related("user").filter(pk=party.pinned_message_id, party=party).first()
+    pinned = ChatMessage.objects.filter(pk=party.pinned_message_id, party=party).first()
     if not pinned:
         return None
 
-    if pinned.user:
-        sender_name = pinned.sender_name or _display_name(pinned.user)
-    else:
-        sender_name = pinned.sender_name or "시스템"
+    # 보낸 사람 이름은 저장 시점 스냅샷(sender_name)을 우선 쓰고, 예전 메시지만 디렉터리에서 찾음.
+    sender_name = pinned.sender_name or (directory.get_name(pinned.user_id) if pinned.user_id else "") or "시스템"
     return {
         "message_id": pinned.id,
         "content": pinned.content,
@@ -146,10 +148,10 @@ def _pinned_notice_payload(party):
     }
 
 
+@traced("party.broadcast_pinned_notice_update")
 def _broadcast_pinned_notice_update(party):
-    channel_layer = get_channel_layer()
     payload = _pinned_notice_payload(party)
-    async_to_sync(channel_layer.group_send)(
+    group_send_sync(
         f"chat_{party.id}",
         {
             "type": "pinned_notice_update",
@@ -158,34 +160,35 @@ def _broadcast_pinned_notice_update(party):
     )
 
 
+@traced("party.promote_waitlist_entries")
 def _promote_waitlist_entries(party):
     promoted_users = []
 
     with transaction.atomic():
         locked_party = get_object_or_404(Party.objects.select_for_update(), pk=party.pk)
         while locked_party.status != Party.Status.CLOSED and locked_party.current_member_count < locked_party.max_members:
-            entry = locked_party.waitlist_entries.select_related("user").order_by("queued_at").first()
+            entry = locked_party.waitlist_entries.order_by("queued_at").first()
             if not entry:
                 break
 
-            target_user = entry.user
+            target_user_id = entry.user_id
 
-            if BlackList.objects.filter(party=locked_party, user=target_user).exists():
+            if BlackList.objects.filter(party=locked_party, user_id=target_user_id).exists():
                 entry.delete()
                 continue
 
-            if PartyMember.objects.filter(party=locked_party, user=target_user, is_active=True).exists():
+            if PartyMember.objects.filter(party=locked_party, user_id=target_user_id, is_active=True).exists():
                 entry.delete()
                 continue
 
-            membership = PartyMember.objects.filter(party=locked_party, user=target_user).first()
+            membership = PartyMember.objects.filter(party=locked_party, user_id=target_user_id).first()
             if membership:
                 membership.is_active = True
                 membership.save(update_fields=["is_active"])
             else:
-                PartyMember.objects.create(party=locked_party, user=target_user, is_active=True)
+                PartyMember.objects.create(party=locked_party, user_id=target_user_id, is_active=True)
 
-            promoted_users.append({"id": target_user.id, "name": _display_name(target_user)})
+            promoted_users.append({"id": target_user_id, "name": directory.get_name(target_user_id)})
             entry.delete()
 
             locked_party.refresh_from_db(fields=["current_member_count", "max_members", "status"])
@@ -193,9 +196,8 @@ def _promote_waitlist_entries(party):
     party.refresh_from_db()
 
     if promoted_users:
-        channel_layer = get_channel_layer()
         for promoted_user in promoted_users:
-            async_to_sync(channel_layer.group_send)(
+            group_send_sync(
                 f"chat_{party.id}",
                 {
                     "type": "system_message",
@@ -212,22 +214,23 @@ def _promote_waitlist_entries(party):
     _broadcast_waitlist_update(party)
 
 
-class PartyListView(LoginRequiredMixin, ListView):
+class PartyListView(ReplicaReadMixin, LoginRequiredMixin, ListView):
     model = Party
     template_name = "parties/party_list.html"
     context_object_name = "parties"
 
     def get_queryset(self):
-        return (
-            Party.objects.exclude(status=Party.Status.CLOSED)
-            .select_related("game", "host")
-            .order_by("-created_at")
-        )
+        return Party.objects.exclude(status=Party.Status.CLOSED).order_by("-created_at")
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
         parties = list(context.get("parties", []))
+        # 카드의 게임은 JOIN 대신 카탈로그의 Game을, 방장 이름은 디렉터리에서 찾아 붙여 씀.
+        catalog.attach(parties)
+        host_names = directory.get_names(party.host_id for party in parties)
+        for party in parties:
+            party.host_name = host_names.get(party.host_id, "")
         party_ids = [party.id for party in parties]
         joined_party_ids = set()
 
@@ -242,6 +245,7 @@ class PartyListView(LoginRequiredMixin, ListView):
 
         context["parties"] = parties
         context["joined_party_ids"] = joined_party_ids
+        context["game_counts"] = counters.get_counts()
         return context
 
 
@@ -266,12 +270,13 @@ class PartyCreateView(LoginRequiredMixin, VerifiedEmailRequiredMixin, CreateView
         return redirect("party_detail", pk=self.object.pk)
 
 
-class PartyDetailView(LoginRequiredMixin, VerifiedEmailRequiredMixin, NotInBlackListMixin, DetailView):
+class PartyDetailView(ReplicaReadMixin, LoginRequiredMixin, VerifiedEmailRequiredMixin, NotInBlackListMixin, DetailView):
     model = Party
     template_name = "parties/party_detail.html"
 
     def get(self, request, *args, **kwargs):
         self.object = self.get_object()
+        catalog.attach([self.object])
 
         context = self.get_context_data(object=self.object)
         return self.render_to_response(context)
@@ -281,29 +286,40 @@ class PartyDetailView(LoginRequiredMixin, VerifiedEmailRequiredMixin, NotInBlack
         user = self.request.user
         party = self.object
 
-        active_members = party.members.filter(is_active=True).select_related("user")
-        waitlist_entries = list(party.waitlist_entries.select_related("user").order_by("queued_at"))
+        # 멤버/대기열/신청 목록은 user_id만 읽고 이름은 디렉터리에서 한 번에 찾음. (브로드캐스트와 같은 모양)
+        member_ids = list(party.members.filter(is_active=True).values_list("user_id", flat=True))
+        wait_user_ids = list(party.waitlist_entries.order_by("queued_at").values_list("user_id", flat=True))
+        pending_rows = []
+        if user.is_authenticated and party.host_id == user.id:
+            pending_rows = list(
+                party.join_requests.filter(status=PartyJoinRequest.Status.PENDING).values_list("id", "user_id")
+            )
+        names = directory.get_names([*member_ids, *wait_user_ids, *(user_id for _, user_id in pending_rows)])
+
+        active_members = [{"user_id": user_id, "nickname": names.get(user_id, "")} for user_id in member_ids]
+        waitlist_entries = [{"user_id": user_id, "nickname": names.get(user_id, "")} for user_id in wait_user_ids]
+        pending_requests = [
+            {"id": request_id, "user_id": user_id, "nickname": names.get(user_id, "")}
+            for request_id, user_id in pending_rows
+        ]
 
         context["active_members"] = active_members
-        context["chat_messages"] = party.messages.select_related("user").order_by("created_at")[:50]
+        context["chat_messages"] = party_chat_history(party, limit=50)
         context["join_policy_approval"] = party.join_policy == Party.JoinPolicy.APPROVAL
         context["waitlist_count"] = len(waitlist_entries)
         context["pinned_notice"] = _pinned_notice_payload(party)
 
         if user.is_authenticated:
-            context["is_member"] = active_members.filter(user=user).exists()
+            context["is_member"] = user.id in member_ids
             context["is_host"] = party.host_id == user.id
             context["my_join_request_status"] = (
                 party.join_requests.filter(user=user).order_by("-requested_at").values_list("status", flat=True).first() or ""
             )
-            context["my_waitlist_rank"] = _waitlist_rank(party, user.id)
-
-            if context["is_host"]:
-                context["pending_requests"] = party.join_requests.filter(
-                    status=PartyJoinRequest.Status.PENDING
-                ).select_related("user")
-            else:
-                context["pending_requests"] = []
+            context["my_waitlist_rank"] = next(
+                (rank for rank, user_id in enumerate(wait_user_ids, start=1) if user_id == user.id),
+                None,
+            )
+            context["pending_requests"] = pending_requests
             context["waitlist_entries"] = waitlist_entries
         else:
             context["is_member"] = False
@@ -323,7 +339,7 @@ class PartyJoinView(LoginRequiredMixin, VerifiedEmailRequiredMixin, NotInBlackLi
         if party.status == Party.Status.CLOSED:
             return redirect("party_list")
 
-        membership = PartyMember.objects.filter(party=party, user=request.user).first()
+        membership = PartyMember.objects.select_related("party", "user").filter(party=party, user=request.user).first()
         if membership and membership.is_active:
             return redirect("party_detail", pk=pk)
 
@@ -340,10 +356,12 @@ class PartyJoinView(LoginRequiredMixin, VerifiedEmailRequiredMixin, NotInBlackLi
 
             was_pending = join_request.status == PartyJoinRequest.Status.PENDING
             if join_request.status != PartyJoinRequest.Status.PENDING:
+                # 다시 신청하면 만료 기준 시각도 새로 잡음. (PARTY_JOIN_REQUEST_TTL_SECONDS)
                 join_request.status = PartyJoinRequest.Status.PENDING
+                join_request.requested_at = timezone.now()
                 join_request.decided_at = None
                 join_request.decided_by = None
-                join_request.save(update_fields=["status", "decided_at", "decided_by"])
+                join_request.save(update_fields=["status", "requested_at", "decided_at", "decided_by"])
             if created or not was_pending:
                 _broadcast_join_request_update(party, "created", join_request)
             return redirect(f"/parties/{pk}/?requested=1")
@@ -366,7 +384,7 @@ class PartyJoinView(LoginRequiredMixin, VerifiedEmailRequiredMixin, NotInBlackLi
             ).update(
                 status=PartyJoinRequest.Status.CANCELLED,
                 decided_at=timezone.now(),
-                decided_by=party.host,
+                decided_by_id=party.host_id,
             )
 
             deleted, _ = PartyWaitlist.objects.filter(party=party, user=request.user).delete()
@@ -387,20 +405,17 @@ class PartyLeaveView(LoginRequiredMixin, VerifiedEmailRequiredMixin, View):
         party = get_object_or_404(Party, pk=pk)
         membership_changed = False
 
-        if party.host == request.user:
-            membership = PartyMember.objects.filter(party=party, user=request.user).first()
+        if party.host_id == request.user.id:
+            membership = PartyMember.objects.select_related("party", "user").filter(party=party, user=request.user).first()
             if membership:
                 membership.is_active = False
                 membership.save()
                 membership_changed = True
             else:
-                party.status = Party.Status.CLOSED
-                party.save()
-                party.members.all().delete()
-                party.messages.all().delete()
-                party.blacklist.all().delete()
+                # 하위 데이터 대량 삭제는 리퍼(reap_closed_parties)가 청크 단위로 처리함.
+                schedule_party_teardown(party)
         else:
-            membership = PartyMember.objects.filter(party=party, user=request.user).first()
+            membership = PartyMember.objects.select_related("party", "user").filter(party=party, user=request.user).first()
             if membership and membership.is_active:
                 membership.is_active = False
                 membership.save()
@@ -425,22 +440,21 @@ class KickMemberView(LoginRequiredMixin, VerifiedEmailRequiredMixin, View):
         if party.host_id != request.user.id:
             return redirect("party_detail", pk=party_id)
 
-        party_member = get_object_or_404(PartyMember, party=party, user_id=user_id)
-        kicked_user_name = _display_name(party_member.user)
+        party_member = get_object_or_404(PartyMember.objects.select_related("party"), party=party, user_id=user_id)
+        kicked_user_name = directory.get_name(user_id)
 
         party_member.is_active = False
         party_member._kicked = True
         party_member.save()
 
-        BlackList.objects.get_or_create(party=party, user=party_member.user)
+        BlackList.objects.get_or_create(party=party, user_id=user_id)
         PartyWaitlist.objects.filter(party=party, user_id=user_id).delete()
 
         party.refresh_from_db()
         if party.status != Party.Status.CLOSED:
             _promote_waitlist_entries(party)
 
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
+        group_send_sync(
             f"chat_{party.id}",
             {
                 "type": "user_kicked",
@@ -462,7 +476,7 @@ class TransferHostView(LoginRequiredMixin, VerifiedEmailRequiredMixin, View):
             if party.host_id != request.user.id:
                 return redirect("party_detail", pk=party_id)
 
-            target_member = PartyMember.objects.select_related("user").filter(
+            target_member = PartyMember.objects.filter(
                 party=party,
                 user_id=user_id,
                 is_active=True,
@@ -471,14 +485,14 @@ class TransferHostView(LoginRequiredMixin, VerifiedEmailRequiredMixin, View):
             if not target_member or target_member.user_id == party.host_id:
                 return redirect("party_detail", pk=party_id)
 
-            party.host = target_member.user
+            party.host_id = target_member.user_id
             party.save(update_fields=["host"])
+            stats.host_changed(party, request.user.id)
 
-        transferred_user_name = _display_name(target_member.user)
+        transferred_user_name = directory.get_name(target_member.user_id)
         _broadcast_member_snapshot(party)
 
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
+        group_send_sync(
             f"chat_{party.id}",
             {
                 "type": "system_message",
@@ -556,6 +570,7 @@ class PartySettingsUpdateView(LoginRequiredMixin, VerifiedEmailRequiredMixin, Vi
                 update_fields.append("mic_required")
                 changed_labels.append("마이크 필수")
 
+            previous_max_members = locked_party.max_members
             if locked_party.max_members != max_members:
                 locked_party.max_members = max_members
                 update_fields.append("max_members")
@@ -570,12 +585,13 @@ class PartySettingsUpdateView(LoginRequiredMixin, VerifiedEmailRequiredMixin, Vi
 
             if update_fields:
                 locked_party.save(update_fields=update_fields)
+            if changed_max:
+                stats.party_resized(locked_party, previous_max_members)
 
         party.refresh_from_db()
 
         if changed_labels:
-            channel_layer = get_channel_layer()
-            async_to_sync(channel_layer.group_send)(
+            group_send_sync(
                 f"chat_{party.id}",
                 {
                     "type": "system_message",
@@ -611,7 +627,7 @@ class CancelJoinRequestView(LoginRequiredMixin, VerifiedEmailRequiredMixin, View
         with transaction.atomic():
             party = get_object_or_404(Party.objects.select_for_update(), pk=pk)
 
-            join_request = PartyJoinRequest.objects.select_for_update().select_related("user").filter(
+            join_request = PartyJoinRequest.objects.select_for_update().filter(
                 party=party,
                 user=request.user,
                 status=PartyJoinRequest.Status.PENDING,
@@ -680,7 +696,7 @@ class ApproveJoinRequestView(LoginRequiredMixin, VerifiedEmailRequiredMixin, Vie
                 return redirect("party_detail", pk=party_id)
 
             join_request = get_object_or_404(
-                PartyJoinRequest.objects.select_for_update().select_related("user"),
+                PartyJoinRequest.objects.select_for_update(),
                 pk=request_id,
                 party=party,
             )
@@ -694,7 +710,7 @@ class ApproveJoinRequestView(LoginRequiredMixin, VerifiedEmailRequiredMixin, Vie
                 join_request.decided_by = request.user
                 join_request.save(update_fields=["status", "decided_at", "decided_by"])
 
-                PartyWaitlist.objects.get_or_create(party=party, user=join_request.user)
+                PartyWaitlist.objects.get_or_create(party=party, user_id=join_request.user_id)
 
                 _broadcast_join_request_update(party, "queued", join_request)
                 _broadcast_waitlist_update(party)
@@ -714,11 +730,11 @@ class ApproveJoinRequestView(LoginRequiredMixin, VerifiedEmailRequiredMixin, Vie
 
             PartyMember.objects.update_or_create(
                 party=party,
-                user=join_request.user,
+                user_id=join_request.user_id,
                 defaults={"is_active": True},
             )
 
-            PartyWaitlist.objects.filter(party=party, user=join_request.user).delete()
+            PartyWaitlist.objects.filter(party=party, user_id=join_request.user_id).delete()
 
         _broadcast_join_request_update(party, "approved", join_request)
         _broadcast_join_request_result(party, join_request)
@@ -733,7 +749,7 @@ class RejectJoinRequestView(LoginRequiredMixin, VerifiedEmailRequiredMixin, View
             return redirect("party_detail", pk=party_id)
 
         join_request = get_object_or_404(
-            PartyJoinRequest.objects.select_related("user"),
+            PartyJoinRequest.objects,
             pk=request_id,
             party=party,
         )
@@ -748,3 +764,47 @@ class RejectJoinRequestView(LoginRequiredMixin, VerifiedEmailRequiredMixin, View
             _broadcast_join_request_result(party, join_request)
 
         return redirect("party_detail", pk=party_id)
+
+
+# 로비의 빠른 참가 버튼임. 맞는 파티가 있으면 바로 입장시키고, 없으면 대기열에 올려 두었다가
+# 조건에 맞는 파티가 열리면 로비 소켓(user_{id} 그룹)으로 입장 결과를 알려 줌.
+class QuickJoinView(LoginRequiredMixin, VerifiedEmailRequiredMixin, View):
+    def post(self, request):
+        party = matchmaking.quick_join(request.user)
+        if party is None:
+            return JsonResponse({"ok": True, "status": "queued"})
+        return JsonResponse({"ok": True, "status": "joined", "party_id": party.id, "url": f"/parties/{party.id}/"})
+
+
+class QuickJoinCancelView(LoginRequiredMixin, View):
+    def post(self, request):
+        return JsonResponse({"ok": True, "cancelled": matchmaking.cancel(request.user.id)})
+
+
+
+class PartyForYouView(LoginRequiredMixin, View):
+    def get(self, request):
+        return JsonResponse({"ok": True, "parties": recommendations.for_user(request.user)})
+
+
+# 파티(type=party) 또는 내가 참여했던 파티의 채팅(type=message) 검색임. cursor는 이전 응답의 next_cursor.
+class PartySearchView(LoginRequiredMixin, View):
+    def get(self, request):
+        query = request.GET.get("q", "").strip()
+        kind = request.GET.get("type", "party")
+        if kind not in ("party", "message"):
+            return JsonResponse({"ok": False, "error": "알 수 없는 검색 대상입니다."}, status=400)
+        if len(query) < settings.SEARCH_MIN_QUERY_LENGTH:
+            return JsonResponse({"ok": False, "error": "검색어가 너무 짧습니다."}, status=400)
+        try:
+            cursor = int(request.GET["cursor"]) if request.GET.get("cursor") else None
+            limit = min(int(request.GET.get("limit", settings.SEARCH_PAGE_SIZE)), settings.SEARCH_MAX_PAGE_SIZE)
+        except ValueError:
+            return JsonResponse({"ok": False, "error": "잘못된 페이지 요청입니다."}, status=400)
+        limit = max(limit, 1)
+
+        if kind == "message":
+            results, next_cursor = search.search_messages(request.user, query, before=cursor, limit=limit)
+        else:
+            results, next_cursor = search.search_parties(query, before=cursor, limit=limit)
+        return JsonResponse({"ok": True, "results": results, "next_cursor": next_cursor})
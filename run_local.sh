@@ -18,5 +18,10 @@ set -a
 . ".env.local"
 set +a
 
+# 인증 메일은 대기열(OutboundEmail)에만 쌓이므로 발송 워커를 함께 띄우고, 서버가 끝나면 같이 종료함.
+python manage.py send_queued_email --loop &
+MAIL_WORKER_PID=$!
+trap 'kill "$MAIL_WORKER_PID" 2>/dev/null || true' EXIT
+
 HOST_PORT="${1:-127.0.0.1:8000}"
 python manage.py runserver "$HOST_PORT"
@@ -0,0 +1,10 @@
+from django.db.backends.mysql import base as mysql_base
+
+from ..pool import PooledDatabaseWrapperMixin
+
+
+# 프로세스 단위 연결 풀을 사용하는 MySQL 백엔드임.
+# ENGINE = "websocket_project.db_backends.mysql_pool" 로 지정하고 CONN_MAX_AGE는 0으로 둠.
+class DatabaseWrapper(PooledDatabaseWrapperMixin, mysql_base.DatabaseWrapper):
+    def pool_health_check(self, connection):
+        connection.ping()
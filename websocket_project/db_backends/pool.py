@@ -0,0 +1,222 @@
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_OPTIONS = {
+    "MAX_SIZE": 10,
+    # 반납 후 이 시간(초) 이상 쓰이지 않은 연결은 닫음.
+    "MAX_IDLE": 300,
+    # 풀이 가득 찼을 때 빈 연결을 기다리는 최대 시간(초)
+    "TIMEOUT": 10,
+    # 마지막 사용 후 이 시간(초)이 지난 연결은 빌려주기 전에 ping으로 확인함.
+    "HEALTH_CHECK_INTERVAL": 30,
+}
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+# 스레드 간에 공유되는 DB-API 연결 풀임.
+# database_sync_to_async 실행 스레드 수와 관계없이 열려 있는 연결 수를 MAX_SIZE로 제한함.
+class ConnectionPool:
+    def __init__(self, max_size, max_idle, timeout, health_check_interval, name="default"):
+        self.name = name
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+
+        self._idle = deque()  # (connection, 반납 시각)
+        self._size = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            "created": 0,
+            "closed": 0,
+            "checkouts": 0,
+            "waits": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "timeouts": 0,
+            "health_check_failures": 0,
+            "evicted_idle": 0,
+        }
+
+    def _close_quietly(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            logger.debug("pool %s: error while closing connection", self.name, exc_info=True)
+
+    # 오래 쉰 연결을 닫음. 호출자는 _cond를 잡고 있어야 하며, 닫을 연결 목록을 반환함.
+    def _evict_idle_locked(self, now):
+        expired = []
+        # 가장 오래 반납된 연결이 왼쪽에 있으므로 왼쪽부터 확인함.
+        while self._idle and now - self._idle[0][1] > self.max_idle:
+            expired.append(self._idle.popleft()[0])
+            self._size -= 1
+            self._stats["evicted_idle"] += 1
+            self._stats["closed"] += 1
+        return expired
+
+    def acquire(self, connect, health_check=None):
+        started = time.monotonic()
+        waited = False
+
+        while True:
+            expired = []
+            connection = None
+            returned_at = None
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    expired.extend(self._evict_idle_locked(now))
+                    if self._idle:
+                        # 최근에 반납된 연결(오른쪽)을 우선 사용해 오래된 연결이 자연스럽게 만료되게 함.
+                        connection, returned_at = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+
+                    remaining = self.timeout - (now - started)
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(f"connection pool '{self.name}' exhausted ({self.max_size})")
+                    if not waited:
+                        waited = True
+                        self._stats["waits"] += 1
+                    self._cond.wait(remaining)
+
+            for stale in expired:
+                self._close_quietly(stale)
+
+            if connection is None:
+                try:
+                    connection = connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._stats["created"] += 1
+            elif health_check and time.monotonic() - returned_at > self.health_check_interval:
+                try:
+                    health_check(connection)
+                except Exception:
+                    # 끊어진 연결은 버리고 다시 시도함.
+                    self._discard(connection, health_failure=True)
+                    continue
+
+            wait_seconds = time.monotonic() - started
+            with self._cond:
+                self._stats["checkouts"] += 1
+                if waited:
+                    self._stats["wait_seconds_total"] += wait_seconds
+                    self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], wait_seconds)
+            return connection
+
+    def release(self, connection, discard=False):
+        if discard:
+            self._discard(connection)
+            return
+
+        with self._cond:
+            expired = self._evict_idle_locked(time.monotonic())
+            self._idle.append((connection, time.monotonic()))
+            self._cond.notify()
+        for stale in expired:
+            self._close_quietly(stale)
+
+    def _discard(self, connection, health_failure=False):
+        self._close_quietly(connection)
+        with self._cond:
+            self._size -= 1
+            self._stats["closed"] += 1
+            if health_failure:
+                self._stats["health_check_failures"] += 1
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update(
+                {
+                    "name": self.name,
+                    "max_size": self.max_size,
+                    "size": self._size,
+                    "idle": len(self._idle),
+                    "in_use": self._size - len(self._idle),
+                }
+            )
+        return stats
+
+    def close_all(self):
+        with self._cond:
+            idle = [connection for connection, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._stats["closed"] += len(idle)
+        for connection in idle:
+            self._close_quietly(connection)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, options):
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is None:
+            merged = {**DEFAULT_POOL_OPTIONS, **(options or {})}
+            pool = _pools[alias] = ConnectionPool(
+                max_size=merged["MAX_SIZE"],
+                max_idle=merged["MAX_IDLE"],
+                timeout=merged["TIMEOUT"],
+                health_check_interval=merged["HEALTH_CHECK_INTERVAL"],
+                name=alias,
+            )
+        return pool
+
+
+# 메트릭 수집용으로 현재 프로세스의 모든 풀 상태를 반환함.
+def pool_stats():
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [pool.stats() for pool in pools]
+
+
+# Django DatabaseWrapper에 섞어 쓰는 믹스인임.
+# 연결을 새로 열거나 닫는 대신 풀에서 빌리고 반납함.
+class PooledDatabaseWrapperMixin:
+    def pool_health_check(self, connection):
+        pass
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict.get("POOL"))
+
+    def get_new_connection(self, conn_params):
+        parent = super()
+        return self.pool.acquire(
+            lambda: parent.get_new_connection(conn_params),
+            health_check=self.pool_health_check,
+        )
+
+    def _close(self):
+        if self.connection is None:
+            return
+
+        # 트랜잭션 도중 닫히면 래퍼가 연결을 계속 참조하므로 풀에 돌려주지 않고 버림.
+        discard = self.in_atomic_block or self.errors_occurred
+        if not discard and not self.autocommit:
+            try:
+                self.connection.rollback()
+            except Exception:
+                discard = True
+        self.pool.release(self.connection, discard=discard)
@@ -0,0 +1,61 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+# 현재 실행 흐름에서 읽기 쿼리를 보낼 DB alias임. None이면 primary(default)를 사용함.
+# ContextVar라서 database_sync_to_async 스레드로도 값이 그대로 전달됨.
+_read_alias = ContextVar("db_read_alias", default=None)
+
+PIN_CACHE_KEY = "db_primary_pin:{user_id}"
+
+
+def replica_alias():
+    alias = getattr(settings, "DB_REPLICA_ALIAS", "replica")
+    return alias if alias in settings.DATABASES else None
+
+
+# 사용자가 방금 쓰기를 했다면 일정 시간 동안 읽기도 primary로 고정함. (read-your-writes)
+def pin_primary(user_id):
+    if user_id and replica_alias():
+        cache.set(PIN_CACHE_KEY.format(user_id=user_id), 1, timeout=settings.DB_PRIMARY_PIN_SECONDS)
+
+
+def is_pinned(user_id):
+    if not user_id:
+        return False
+    return bool(cache.get(PIN_CACHE_KEY.format(user_id=user_id)))
+
+
+# with 블록 안의 읽기 쿼리를 replica로 보냄.
+# replica가 설정되지 않았거나 사용자가 primary에 고정되어 있으면 아무 것도 바꾸지 않음.
+@contextmanager
+def replica_reads(user_id=None):
+    alias = replica_alias()
+    if not alias or is_pinned(user_id):
+        yield DEFAULT_DB_ALIAS
+        return
+
+    token = _read_alias.set(alias)
+    try:
+        yield alias
+    finally:
+        _read_alias.reset(token)
+
+
+# replica_reads 블록 안에서만 읽기를 replica로 보내는 라우터임.
+# 쓰기/마이그레이션은 항상 primary에서만 수행함.
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != replica_alias()
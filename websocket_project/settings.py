@@ -80,6 +80,10 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware',
+    'core.middleware.TracingMiddleware',
+    'core.middleware.ProfilerMiddleware',
+    'core.middleware.PrimaryPinMiddleware',
+    'core.middleware.RequestMetricsMiddleware',
 
 ]
 
@@ -123,6 +127,151 @@ DATABASES = {
     }
 }
 
+# Daphne의 database_sync_to_async 스레드마다 연결을 붙잡지 않도록 프로세스 단위 연결 풀을 사용함.
+# DB_POOL_SIZE=0이면 풀 없이 기존 CONN_MAX_AGE 방식으로 동작함.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+if DB_POOL_SIZE > 0:
+    DATABASES["default"].update({
+        'ENGINE': 'websocket_project.db_backends.mysql_pool',
+        # 요청/이벤트가 끝날 때마다 연결을 풀에 반납하도록 0으로 둠.
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'MAX_SIZE': DB_POOL_SIZE,
+            'MAX_IDLE': int(os.getenv("DB_POOL_MAX_IDLE", "300")),
+            'TIMEOUT': float(os.getenv("DB_POOL_TIMEOUT", "10")),
+            'HEALTH_CHECK_INTERVAL': int(os.getenv("DB_POOL_HEALTH_CHECK_INTERVAL", "30")),
+        },
+    })
+
+# 읽기 전용 replica. DB_REPLICA_HOST가 있을 때만 등록되며,
+# 로비/상세/프로필/채팅 스냅샷 읽기가 websocket_project.db_router를 통해 이 alias로 라우팅됨.
+DB_REPLICA_ALIAS = "replica"
+DB_PRIMARY_PIN_SECONDS = int(os.getenv("DB_PRIMARY_PIN_SECONDS", "5"))
+if os.getenv("DB_REPLICA_HOST"):
+    DATABASES[DB_REPLICA_ALIAS] = {
+        **DATABASES["default"],
+        'NAME': os.getenv('DB_REPLICA_NAME', DATABASES["default"]["NAME"]),
+        'USER': os.getenv('DB_REPLICA_USER', DATABASES["default"]["USER"]),
+        'PASSWORD': os.getenv('DB_REPLICA_PASSWORD', DATABASES["default"]["PASSWORD"]),
+        'HOST': os.getenv('DB_REPLICA_HOST'),
+        'PORT': os.getenv('DB_REPLICA_PORT', DATABASES["default"]["PORT"]),
+        # 테스트에서는 별도 DB를 만들지 않고 default를 그대로 바라봄.
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ["websocket_project.db_router.ReplicaRouter"]
+
+# 종료 파티 하위 데이터 정리(reap_closed_parties) 청크 크기와 청크 사이 대기 시간
+PARTY_TEARDOWN_CHUNK_SIZE = int(os.getenv("PARTY_TEARDOWN_CHUNK_SIZE", "500"))
+PARTY_TEARDOWN_PAUSE = float(os.getenv("PARTY_TEARDOWN_PAUSE", "0.05"))
+
+# 종료 파티 채팅 아카이브(archive_chat_history) 저장 위치와 DB 보존 기간
+CHAT_ARCHIVE_DIR = Path(os.getenv("CHAT_ARCHIVE_DIR", str(BASE_DIR / "chat_archive")))
+CHAT_ARCHIVE_RETENTION_DAYS = int(os.getenv("CHAT_ARCHIVE_RETENTION_DAYS", "30"))
+CHAT_ARCHIVE_BATCH_SIZE = int(os.getenv("CHAT_ARCHIVE_BATCH_SIZE", "1000"))
+
+# 종료 파티를 콜드 테이블(archive_closed_parties)로 옮기기까지의 일수. 채팅 보존 기간 이상이어야 함.
+PARTY_ARCHIVE_AFTER_DAYS = int(os.getenv("PARTY_ARCHIVE_AFTER_DAYS", "45"))
+
+# 채팅 금칙어 파일(한 줄에 하나, #은 주석)과 금칙어 변경 확인 주기(초)
+MODERATION_TERMS_FILE = os.getenv("MODERATION_TERMS_FILE", "")
+MODERATION_RELOAD_INTERVAL = float(os.getenv("MODERATION_RELOAD_INTERVAL", "5"))
+
+# 채팅 도배 탐지. local은 워커별 LRU(SPAM_MAX_USERS명), cache는 Django 캐시(Redis)로 워커 간 공유함.
+# SPAM_WINDOW_SECONDS 안에 비슷한 메시지가 SPAM_DUPLICATE_LIMIT개를 넘거나
+# SPAM_FLOOD_WINDOW_SECONDS 안에 SPAM_FLOOD_LIMIT개를 넘으면 SPAM_ACTION(reject/shadow)으로 처리함.
+SPAM_BACKEND = os.getenv("SPAM_BACKEND", "local")
+SPAM_ACTION = os.getenv("SPAM_ACTION", "shadow")
+SPAM_WINDOW_SECONDS = float(os.getenv("SPAM_WINDOW_SECONDS", "60"))
+SPAM_DUPLICATE_LIMIT = int(os.getenv("SPAM_DUPLICATE_LIMIT", "3"))
+SPAM_SIMHASH_DISTANCE = int(os.getenv("SPAM_SIMHASH_DISTANCE", "10"))
+SPAM_MIN_LENGTH = int(os.getenv("SPAM_MIN_LENGTH", "8"))
+SPAM_FLOOD_WINDOW_SECONDS = float(os.getenv("SPAM_FLOOD_WINDOW_SECONDS", "10"))
+SPAM_FLOOD_LIMIT = int(os.getenv("SPAM_FLOOD_LIMIT", "12"))
+SPAM_HISTORY_SIZE = int(os.getenv("SPAM_HISTORY_SIZE", "16"))
+SPAM_MAX_USERS = int(os.getenv("SPAM_MAX_USERS", "50000"))
+
+# 앞단 리버스 프록시 수. 0이면 REMOTE_ADDR을, N이면 X-Forwarded-For의 오른쪽에서 N번째 주소를 클라이언트 IP로 봄. (core.http.client_ip)
+TRUSTED_PROXY_COUNT = int(os.getenv("TRUSTED_PROXY_COUNT") or "0")
+
+# 내부 메트릭 엔드포인트(/internal/metrics/). 토큰 또는 허용 IP가 맞거나 스태프 로그인이어야 응답함.
+# 허용 IP는 기본으로 비어 있고, TRUSTED_PROXY_COUNT로 구한 클라이언트 IP와 비교하므로 프록시 뒤라면 프록시 수를 반드시 맞춰야 함.
+METRICS_ENABLED = _env_bool("METRICS_ENABLED", True)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+METRICS_ALLOWED_IPS = _env_list("METRICS_ALLOWED_IPS")
+
+# 스팬 트레이싱. 0이면 비활성화되며, 샘플링된 스팬은 TRACE_DIR에 JSONL로 기록됨.
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+TRACE_DIR = Path(os.getenv("TRACE_DIR", str(BASE_DIR / "traces")))
+# 스팬은 메모리에 모았다가 별도 스레드가 이 주기(초)마다 파일에 씀. 버퍼가 가득 차면 새 스팬은 버림.
+TRACE_FLUSH_SECONDS = float(os.getenv("TRACE_FLUSH_SECONDS", "1"))
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "10000"))
+
+# 스태프 전용 프로파일러 결과 저장 위치와 샘플링 간격(초), 소켓 명령으로 여는 샘플링 구간 최대 길이(초)
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", str(BASE_DIR / "profiles")))
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+PROFILE_WINDOW_MAX_SECONDS = int(os.getenv("PROFILE_WINDOW_MAX_SECONDS", "60"))
+
+# 빠른 참가 인덱스를 DB에서 다시 읽는 주기(초)와 대기표 유지 시간(초)
+MATCHMAKING_RESYNC_SECONDS = float(os.getenv("MATCHMAKING_RESYNC_SECONDS", "5"))
+MATCHMAKING_TICKET_TTL = int(os.getenv("MATCHMAKING_TICKET_TTL", "300"))
+
+# 로비 추천 피드. 결과 개수, 사용자별 결과/게임 친화도 캐시 시간(초), OPEN 파티 스냅샷 재생성 주기(초), 점수 가중치
+RECOMMEND_LIMIT = int(os.getenv("RECOMMEND_LIMIT", "20"))
+RECOMMEND_CACHE_TTL = int(os.getenv("RECOMMEND_CACHE_TTL", "30"))
+RECOMMEND_AFFINITY_TTL = int(os.getenv("RECOMMEND_AFFINITY_TTL", "600"))
+RECOMMEND_SNAPSHOT_SECONDS = float(os.getenv("RECOMMEND_SNAPSHOT_SECONDS", "10"))
+RECOMMEND_GAME_WEIGHT = float(os.getenv("RECOMMEND_GAME_WEIGHT", "3.0"))
+RECOMMEND_MIC_WEIGHT = float(os.getenv("RECOMMEND_MIC_WEIGHT", "0.5"))
+RECOMMEND_FILL_WEIGHT = float(os.getenv("RECOMMEND_FILL_WEIGHT", "1.0"))
+RECOMMEND_HOST_WEIGHT = float(os.getenv("RECOMMEND_HOST_WEIGHT", "0.5"))
+
+# 파티/채팅 검색. 최소 검색어 길이, 기본/최대 페이지 크기, 문서 하나에서 색인할 최대 n-gram 수,
+# 관리자 검색이 색인에서 가져올 최대 결과 수, 한 번에 집계할 최신 문서 id 구간 크기
+SEARCH_MIN_QUERY_LENGTH = int(os.getenv("SEARCH_MIN_QUERY_LENGTH", "2"))
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", "20"))
+SEARCH_MAX_PAGE_SIZE = int(os.getenv("SEARCH_MAX_PAGE_SIZE", "100"))
+SEARCH_MAX_TERMS_PER_DOC = int(os.getenv("SEARCH_MAX_TERMS_PER_DOC", "512"))
+SEARCH_ADMIN_LIMIT = int(os.getenv("SEARCH_ADMIN_LIMIT", "1000"))
+SEARCH_WINDOW = int(os.getenv("SEARCH_WINDOW", "4096"))
+
+# 로비 게임별 모집 현황 카운터를 DB 기준으로 다시 맞추는 주기(초). reconcile_lobby_counters --loop가 사용함.
+LOBBY_COUNTERS_RECONCILE_SECONDS = int(os.getenv("LOBBY_COUNTERS_RECONCILE_SECONDS", "60"))
+
+# 사용자 표시 이름 디렉터리. 워커별 LRU 크기와 LRU 항목 유지 시간(초), 공유 캐시 유지 시간(초)
+DISPLAY_NAME_LRU_SIZE = int(os.getenv("DISPLAY_NAME_LRU_SIZE", "20000"))
+DISPLAY_NAME_LOCAL_TTL = int(os.getenv("DISPLAY_NAME_LOCAL_TTL", "30"))
+DISPLAY_NAME_CACHE_TTL = int(os.getenv("DISPLAY_NAME_CACHE_TTL", "86400"))
+
+# 가입 화면 닉네임/전화번호 중복 확인. Bloom filter 최소 용량과 오탐률, 워커 간 변경 로그 유지 시간(초)과
+# 다시 만들기 전까지 따라잡을 최대 변경 수, IP별 요청 제한(구간 길이(초)당 횟수)
+AVAILABILITY_MIN_CAPACITY = int(os.getenv("AVAILABILITY_MIN_CAPACITY", "10000"))
+AVAILABILITY_ERROR_RATE = float(os.getenv("AVAILABILITY_ERROR_RATE", "0.01"))
+AVAILABILITY_LOG_TTL = int(os.getenv("AVAILABILITY_LOG_TTL", "3600"))
+AVAILABILITY_LOG_MAX = int(os.getenv("AVAILABILITY_LOG_MAX", "1000"))
+AVAILABILITY_RATE_WINDOW_SECONDS = int(os.getenv("AVAILABILITY_RATE_WINDOW_SECONDS", "60"))
+AVAILABILITY_RATE_LIMIT = int(os.getenv("AVAILABILITY_RATE_LIMIT", "60"))
+
+# 게임 카탈로그 캐시 버전을 확인하는 주기(초). 관리자가 게임을 바꾸면 각 워커에 이 시간 안에 반영됨.
+GAME_CATALOG_CHECK_SECONDS = float(os.getenv("GAME_CATALOG_CHECK_SECONDS", "5"))
+
+# 파티 만료 스케줄러(run_party_scheduler). 참가 신청/대기열 유지 시간(초), 활동 없는 파티와 빈 파티를 닫기까지의 시간(초).
+# 0이면 해당 만료를 끔. 타이머 휠 칸 길이(초)와 칸 수, 새 항목을 읽어 오는 주기(초), 전체를 다시 읽는 주기(초), 한 번에 처리할 수
+PARTY_JOIN_REQUEST_TTL_SECONDS = int(os.getenv("PARTY_JOIN_REQUEST_TTL_SECONDS", "1800"))
+PARTY_WAITLIST_TTL_SECONDS = int(os.getenv("PARTY_WAITLIST_TTL_SECONDS", "3600"))
+PARTY_IDLE_SECONDS = int(os.getenv("PARTY_IDLE_SECONDS", "7200"))
+PARTY_EMPTY_GRACE_SECONDS = int(os.getenv("PARTY_EMPTY_GRACE_SECONDS", "300"))
+PARTY_SCHEDULER_TICK_SECONDS = float(os.getenv("PARTY_SCHEDULER_TICK_SECONDS", "1"))
+PARTY_SCHEDULER_WHEEL_SLOTS = int(os.getenv("PARTY_SCHEDULER_WHEEL_SLOTS", "4096"))
+PARTY_SCHEDULER_POLL_SECONDS = float(os.getenv("PARTY_SCHEDULER_POLL_SECONDS", "5"))
+PARTY_SCHEDULER_RESYNC_SECONDS = float(os.getenv("PARTY_SCHEDULER_RESYNC_SECONDS", "600"))
+PARTY_SCHEDULER_BATCH_SIZE = int(os.getenv("PARTY_SCHEDULER_BATCH_SIZE", "500"))
+
+# 소켓별 송신 대기열 정책. 쌓아 둘 채팅 프레임 수, 대기열 최대 길이, 한 프레임이 나가지 못한 채 버틸 시간(초)
+WS_OUTBOUND_CHAT_CAP = int(os.getenv("WS_OUTBOUND_CHAT_CAP", "50"))
+WS_OUTBOUND_MAX_FRAMES = int(os.getenv("WS_OUTBOUND_MAX_FRAMES", "200"))
+WS_OUTBOUND_MAX_LAG_SECONDS = float(os.getenv("WS_OUTBOUND_MAX_LAG_SECONDS", "20"))
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -213,6 +362,43 @@ else:
         }
     }
 
+# 채널 레이어 샤딩. "이름=URL" 목록(URL이 memory면 프로세스 내 InMemory 샤드)과 그룹 고정("패턴=샤드") 목록임.
+# 예: CHANNEL_LAYER_SHARDS=a=redis://r1:6379/0,b=redis://r2:6379/0,lobby=redis://r3:6379/0
+#     CHANNEL_LAYER_PINS=lobby=lobby,chat_42=b
+CHANNEL_LAYER_SHARDS = dict(item.split("=", 1) for item in _env_list("CHANNEL_LAYER_SHARDS", ""))
+CHANNEL_LAYER_PINS = dict(item.split("=", 1) for item in _env_list("CHANNEL_LAYER_PINS", ""))
+if CHANNEL_LAYER_SHARDS:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "core.layers.ShardedChannelLayer",
+            "CONFIG": {
+                "shards": {
+                    name: (
+                        {"BACKEND": "channels.layers.InMemoryChannelLayer"}
+                        if url == "memory"
+                        else {"BACKEND": "channels_redis.core.RedisChannelLayer", "CONFIG": {"hosts": [url]}}
+                    )
+                    for name, url in CHANNEL_LAYER_SHARDS.items()
+                },
+                "pins": CHANNEL_LAYER_PINS,
+            },
+        }
+    }
+
+# 워커마다 그룹을 한 번만 구독하고 로컬 소켓에는 메모리로 나눠 주는 멀티플렉스 레이어(core.layers)를 씀.
+# 기존 레이어는 내부 레이어가 되며, 내부 그룹 크기가 소켓 수가 아니라 워커 수에 비례하게 됨. (이벤트당 Redis 메시지 수는 같음)
+# 워커의 모든 그룹 메시지가 inbox 하나로 들어오므로 inbox 용량은 소켓 채널 용량과 따로 잡음.
+if _env_bool("CHANNEL_LAYER_MULTIPLEX", False):
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "core.layers.GroupMultiplexChannelLayer",
+            "CONFIG": {
+                "inner": CHANNEL_LAYERS["default"],
+                "inbox_capacity": int(os.getenv("CHANNEL_LAYER_INBOX_CAPACITY", "10000")),
+            },
+        }
+    }
+
 if not DEBUG:
     SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
     USE_X_FORWARDED_HOST = True
@@ -220,7 +406,17 @@ if not DEBUG:
     CSRF_COOKIE_SECURE = True
 
 AUTH_USER_MODEL = "accounts.User"
-EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+# 요청은 메일을 대기열(OutboundEmail)에만 넣고, send_queued_email 워커가 EMAIL_DELIVERY_BACKEND로 실제 발송함.
+EMAIL_BACKEND = os.getenv("EMAIL_BACKEND", "accounts.mail.OutboxBackend")
+EMAIL_DELIVERY_BACKEND = os.getenv("EMAIL_DELIVERY_BACKEND", "django.core.mail.backends.console.EmailBackend")
+# 메일 대기열 워커. 한 번에 보낼 수, 최대 시도 횟수, 첫 재시도 간격(초, 이후 두 배씩)과 최대 간격(초),
+# 가져간 메일을 다른 워커가 건드리지 않는 시간(초), 대기열이 비었을 때 다시 확인하는 간격(초)
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "50"))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "6"))
+EMAIL_OUTBOX_RETRY_SECONDS = int(os.getenv("EMAIL_OUTBOX_RETRY_SECONDS", "30"))
+EMAIL_OUTBOX_MAX_RETRY_SECONDS = int(os.getenv("EMAIL_OUTBOX_MAX_RETRY_SECONDS", "3600"))
+EMAIL_OUTBOX_LEASE_SECONDS = int(os.getenv("EMAIL_OUTBOX_LEASE_SECONDS", "300"))
+EMAIL_OUTBOX_POLL_SECONDS = float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", "2"))
 
 AUTHENTICATION_BACKENDS = [
     'django.contrib.auth.backends.ModelBackend',
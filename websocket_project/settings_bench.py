@@ -0,0 +1,31 @@
+# 로컬 벤치마크(bench_* 커맨드) 실행용 설정임.
+# MySQL/Redis 없이 SQLite + InMemoryChannelLayer로 동작하며, 커맨드가 테스트 DB를 따로 만들어 사용함.
+# 예: DJANGO_SETTINGS_MODULE=websocket_project.settings_bench python manage.py bench_realtime
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, DB_REPLICA_ALIAS
+
+# replica는 같은 SQLite 파일을 가리키는 두 번째 alias라서, 로컬에서도 replica 라우팅 경로를 그대로 타면서 결과는 같게 나옴.
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'bench.sqlite3',
+    },
+    DB_REPLICA_ALIAS: {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'bench.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+CHANNEL_LAYERS = {
+    "default": {
+        "BACKEND": "channels.layers.InMemoryChannelLayer"
+    }
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
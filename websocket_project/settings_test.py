@@ -0,0 +1,35 @@
+# 테스트 실행용 설정임. MySQL/Redis 없이 SQLite + InMemoryChannelLayer로 동작함.
+# replica alias를 default의 테스트 미러(TEST_REPLICA_ALIAS)로 함께 등록해 두고, 읽기 라우팅은 꺼 둠.
+# 라우팅/primary 고정 테스트만 DB_REPLICA_ALIAS를 켜고 두 alias를 선언해 사용함.
+# (다른 TestCase는 default 트랜잭션 안에서 돌기 때문에 미러 연결로 읽으면 커밋 전 데이터가 보이지 않음)
+# 예: DJANGO_SETTINGS_MODULE=websocket_project.settings_test python manage.py test
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR
+
+TEST_REPLICA_ALIAS = "replica"
+DB_REPLICA_ALIAS = ""
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'test.sqlite3',
+    },
+    TEST_REPLICA_ALIAS: {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'test.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+CHANNEL_LAYERS = {
+    "default": {
+        "BACKEND": "channels.layers.InMemoryChannelLayer"
+    }
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}